@@ -1,16 +1,15 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 import os
 import threading
 
 from config import Config
-from utils.rabbitmq_handler import rabbitmq_handler
-from tasks.stt_processor import start_stt_worker
-from tasks.feedback_analyzer import start_feedback_worker
 from extensions import db, jwt, migrate
-from routes.detect_face import face_bp
+
+# App worker di-cache per proses (lihat get_worker_app)
+_worker_app = None
+_worker_app_lock = threading.Lock()
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
@@ -28,15 +27,47 @@ def create_app():
     from routes.auth import auth_bp
     from routes.interview import interview_bp
     from routes.dashboard import dashboard_bp
+    from routes.detect_face import face_bp
+    from routes.events import events_bp
+    from utils.catalog_cache import install_catalog_invalidation
+    from utils.query_budget import install_query_counter
+    install_catalog_invalidation()
+    install_query_counter()
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(interview_bp, url_prefix='/api/interview')
     
     app.register_blueprint(face_bp, url_prefix='/api/face')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
     
     return app
 
+def create_worker_app():
+    """Lightweight app for queue workers: config + SQLAlchemy only.
+
+    No CORS, JWT, migrations or blueprints, so importing it does not pull in
+    the HTTP routes (face_recognition, RabbitMQ publisher, ...).
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+        Config.SQLALCHEMY_ENGINE_OPTIONS,
+        pool_size=Config.WORKER_DB_POOL_SIZE,
+        max_overflow=0,
+    )
+    db.init_app(app)
+    return app
+
+def get_worker_app():
+    """Return the per-process worker app, building it (and its engine/pool) once"""
+    global _worker_app
+    if _worker_app is None:
+        with _worker_app_lock:
+            if _worker_app is None:
+                _worker_app = create_worker_app()
+    return _worker_app
+
 if __name__ == '__main__':
     app = create_app()
     with app.app_context():
@@ -0,0 +1,352 @@
+"""Consumer asyncio untuk queue feedback_analysis dan session_feedback.
+
+Pekerjaan feedback hampir semuanya menunggu network (chat completion), jadi
+satu proses menjaga banyak request tetap in-flight, dibatasi oleh
+FEEDBACK_CONCURRENCY. Prefetch = concurrency, dan pesan baru di-ack setelah
+hasilnya ter-commit ke database. Pesan session_feedback (satu completion
+besar per sesi) memakai analyze_session_feedback dari consumer.py di thread
+pool kecil sendiri, jadi tidak menahan event loop.
+
+Dijalankan oleh supervisor.py (--feedback-mode async, default), atau sendiri:
+
+    python async_consumer.py --concurrency 32
+
+Untuk testing lokal, arahkan OPENAI_API_BASE ke stub server:
+
+    python utils/stub_completion_server.py --port 8089 --delay 2
+    OPENAI_API_BASE=http://localhost:8089/v1 python async_consumer.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import aio_pika
+import aiohttp
+import dotenv
+
+from app import get_worker_app
+from config import Config
+from extensions import db
+from models.answer import Answer
+from models.question import Question
+from tasks.feedback_analyzer import (
+    FEEDBACK_MODEL, FEEDBACK_MAX_TOKENS, FEEDBACK_TEMPERATURE, FEEDBACK_RESPONSE_FORMAT, REPAIR_MAX_TOKENS,
+    build_feedback_messages, parse_feedback_with_repair_async, apply_feedback_to_answer,
+    log_feedback_tokens,
+)
+from tasks.analytics import update_score_rollups
+from tasks.jobs import (
+    begin_job, complete_job, fail_job,
+    retry_queue_name, retry_queue_arguments, dead_letter_queue_name, retry_delay_ms,
+)
+from utils.events import publish_event, answer_scores, TokenStreamer
+from utils.metrics import metrics
+from utils.llm import completion_cache_key, get_completion_cache
+from utils.rabbitmq_handler import QUEUE_ARGUMENTS, SESSION_FEEDBACK_DEBOUNCE_QUEUE
+from consumer import analyze_session_feedback
+
+dotenv.load_dotenv()
+
+FEEDBACK_QUEUE = 'feedback_analysis'
+SESSION_FEEDBACK_QUEUE = 'session_feedback'
+SESSION_FEEDBACK_THREADS = 2
+
+
+class CompletionError(Exception):
+    pass
+
+
+class AsyncFeedbackWorker:
+    def __init__(self, concurrency=None, api_base=None):
+        self.concurrency = concurrency or Config.FEEDBACK_CONCURRENCY
+        self.api_base = (api_base or Config.OPENAI_API_BASE).rstrip('/')
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        # Query DB tetap sinkron (SQLAlchemy), dijalankan di thread sebanyak pool koneksi
+        self.db_executor = ThreadPoolExecutor(max_workers=Config.WORKER_DB_POOL_SIZE,
+                                              thread_name_prefix='feedback-db')
+        # Session feedback memanggil LLM secara sinkron; thread terpisah supaya pool DB tidak tertahan
+        self.session_executor = ThreadPoolExecutor(max_workers=SESSION_FEEDBACK_THREADS,
+                                                   thread_name_prefix='session-feedback')
+        self.app = get_worker_app()
+        self.http = None
+        self.connection = None
+        self.channel = None
+        self.in_flight = set()
+        self.stopping = asyncio.Event()
+
+    # --- DB (dijalankan di db_executor) ---
+
+    def _load_inputs(self, answer_id):
+        with self.app.app_context():
+            answer = Answer.query.get(answer_id)
+            if not answer or not answer.transcript_text:
+                print(f"❌ Answer {answer_id} not found or no transcript")
+                return None
+            question = Question.query.get(answer.question_id)
+            if not question:
+                print(f"❌ Question for answer {answer_id} not found")
+                return None
+            return question.question_text, answer.transcript_text, answer.session_id
+
+    def _save_feedback(self, answer_id, feedback_text, data):
+        with self.app.app_context():
+            answer = Answer.query.get(answer_id)
+            if not answer:
+                return False
+            apply_feedback_to_answer(answer, feedback_text, data)
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            print(f"✅ Feedback saved to database for answer {answer_id}")
+            publish_event(answer_id, answer.session_id, 'feedback_done', **answer_scores(answer))
+            update_score_rollups([answer_id])
+            return True
+
+    def _begin_job(self, answer_id, message_id):
+        with self.app.app_context():
+            return begin_job(answer_id, 'feedback', message_id)
+
+    def _finish_job(self, answer_id, error, dead=False):
+        with self.app.app_context():
+            if error is None:
+                complete_job(answer_id, 'feedback')
+            else:
+                fail_job(answer_id, 'feedback', error, dead=dead)
+
+    async def _run_db(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.db_executor, fn, *args)
+
+    # --- LLM ---
+
+    async def create_completion(self, messages, max_tokens=FEEDBACK_MAX_TOKENS,
+                                temperature=FEEDBACK_TEMPERATURE, on_delta=None):
+        params = {
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'response_format': FEEDBACK_RESPONSE_FORMAT,
+        }
+        # Key sama dengan chat_completion() sinkron, jadi cache Redis dipakai bersama
+        key = completion_cache_key(FEEDBACK_MODEL, messages, **params)
+        streamed = []
+
+        async def create():
+            content = await self._request_completion(messages, params, on_delta)
+            streamed.append(True)
+            return content
+
+        content = await get_completion_cache().get_or_create_async(key, create)
+        if on_delta and not streamed:
+            # Cache hit / hasil request identik yang sedang jalan: kirim sekaligus
+            on_delta(content)
+        return content
+
+    async def repair_completion(self, messages):
+        return await self.create_completion(messages, max_tokens=REPAIR_MAX_TOKENS, temperature=0)
+
+    async def _request_completion(self, messages, params, on_delta=None):
+        payload = {'model': FEEDBACK_MODEL, 'messages': messages, **params}
+        if on_delta:
+            payload['stream'] = True
+        headers = {'Authorization': f"Bearer {Config.OPENAI_API_KEY}"}
+        async with self.http.post(f"{self.api_base}/chat/completions",
+                                  json=payload, headers=headers) as resp:
+            if resp.status != 200:
+                raise CompletionError(f"completion failed with HTTP {resp.status}: {await resp.text()}")
+            if not on_delta:
+                data = await resp.json()
+                return data['choices'][0]['message']['content']
+
+            # Stream SSE dari API: baris "data: {...}" sampai "data: [DONE]"
+            parts = []
+            start = time.perf_counter()
+            async for line in resp.content:
+                line = line.strip()
+                if not line.startswith(b'data:'):
+                    continue
+                chunk = line[5:].strip()
+                if chunk == b'[DONE]':
+                    break
+                delta = json.loads(chunk)['choices'][0]['delta'].get('content')
+                if delta:
+                    if not parts:
+                        metrics.record_timing('llm.first_token_seconds', time.perf_counter() - start)
+                    parts.append(delta)
+                    on_delta(delta)
+        return ''.join(parts)
+
+    # --- message handling ---
+
+    async def analyze_answer_feedback(self, answer_id):
+        inputs = await self._run_db(self._load_inputs, answer_id)
+        if inputs is None:
+            return False
+        question_text, transcript_text, session_id = inputs
+
+        publish_event(answer_id, session_id, 'feedback_started')
+        messages = build_feedback_messages(question_text, transcript_text)
+        # Publish Redis di event loop cukup singkat dan dibatasi EVENTS_TOKEN_FLUSH_MS per jawaban
+        streamer = TokenStreamer(answer_id, session_id)
+        start = time.perf_counter()
+        feedback_text = await self.create_completion(messages, on_delta=streamer)
+        streamer.flush()
+        metrics.record_timing('feedback.completion_seconds', time.perf_counter() - start)
+        log_feedback_tokens(answer_id, messages, feedback_text)
+
+        data = await parse_feedback_with_repair_async(feedback_text, self.repair_completion)
+        return await self._run_db(self._save_feedback, answer_id, feedback_text, data)
+
+    async def _retry_or_dead_letter(self, message, attempt):
+        """Async twin of tasks.jobs.retry_or_dead_letter; returns True when dead-lettered"""
+        if attempt is not None and attempt < Config.JOB_MAX_ATTEMPTS:
+            routing_key = retry_queue_name(FEEDBACK_QUEUE, attempt)
+            print(f"🔁 Retrying {FEEDBACK_QUEUE} message in {retry_delay_ms(attempt) / 1000:.0f}s "
+                  f"(attempt {attempt})")
+        else:
+            routing_key = dead_letter_queue_name(FEEDBACK_QUEUE)
+            print(f"☠️ Moving {FEEDBACK_QUEUE} message to {routing_key}")
+        await self.channel.default_exchange.publish(
+            aio_pika.Message(message.body, message_id=message.message_id,
+                             delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
+            routing_key=routing_key)
+        return routing_key == dead_letter_queue_name(FEEDBACK_QUEUE)
+
+    async def handle_message(self, message):
+        async with self.semaphore:
+            try:
+                try:
+                    answer_id = json.loads(message.body).get('answer_id')
+                except (ValueError, AttributeError) as e:
+                    # Pesan rusak tidak akan pernah berhasil; langsung ke DLQ
+                    print(f"❌ Invalid message on {FEEDBACK_QUEUE}: {e}")
+                    await self._retry_or_dead_letter(message, attempt=None)
+                    await message.ack()
+                    return
+                if not answer_id:
+                    await message.ack()
+                    return
+
+                attempt = await self._run_db(self._begin_job, answer_id, message.message_id)
+                if attempt is None:
+                    print(f"⏭️ Feedback for answer {answer_id} already done or in progress, skipping")
+                    await message.ack()
+                    return
+
+                print(f"⚙️ Processing feedback for answer {answer_id} (attempt {attempt})")
+                error = None
+                try:
+                    if await self.analyze_answer_feedback(answer_id):
+                        metrics.increment('feedback.completed')
+                    else:
+                        error = "feedback processing failed"
+                except Exception as e:
+                    traceback.print_exc()
+                    error = f"{type(e).__name__}: {e}"
+
+                if error is None:
+                    await self._run_db(self._finish_job, answer_id, None)
+                else:
+                    metrics.increment('feedback.failed')
+                    print(f"❌ Feedback processing failed for answer {answer_id}: {error}")
+                    dead = await self._retry_or_dead_letter(message, attempt)
+                    await self._run_db(self._finish_job, answer_id, error, dead)
+                # Ack baru setelah commit (atau setelah pesan dipindah ke delay queue / DLQ)
+                await message.ack()
+            except Exception as e:
+                print(f"❌ Error in async feedback handler: {e}")
+                traceback.print_exc()
+                metrics.increment('feedback.errors')
+                await message.nack(requeue=True)
+
+    async def handle_session_message(self, message):
+        try:
+            print(f"📥 [{SESSION_FEEDBACK_QUEUE}] Received: {message.body}")
+            data = json.loads(message.body)
+            session_id = data.get('session_id')
+            if session_id:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self.session_executor, analyze_session_feedback, session_id,
+                                           data.get('timestamp'), data.get('force', False), message.message_id)
+            await message.ack()
+        except Exception as e:
+            print(f"❌ Error in session feedback handler: {e}")
+            traceback.print_exc()
+            await message.nack(requeue=False)
+
+    def _track(self, coro):
+        task = asyncio.create_task(coro)
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+
+    async def on_message(self, message):
+        self._track(self.handle_message(message))
+
+    async def on_session_message(self, message):
+        self._track(self.handle_session_message(message))
+
+    async def run(self):
+        timeout = aiohttp.ClientTimeout(total=Config.OPENAI_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self.http = aiohttp.ClientSession(timeout=timeout, connector=connector)
+        self.connection = await aio_pika.connect_robust(os.getenv('RABBITMQ_URL'), heartbeat=600)
+        try:
+            channel = self.channel = await self.connection.channel()
+            await channel.set_qos(prefetch_count=self.concurrency)
+            queue = await channel.declare_queue(FEEDBACK_QUEUE, durable=True)
+            for attempt in range(1, Config.JOB_MAX_ATTEMPTS):
+                await channel.declare_queue(retry_queue_name(FEEDBACK_QUEUE, attempt), durable=True,
+                                            arguments=retry_queue_arguments(FEEDBACK_QUEUE, attempt))
+            await channel.declare_queue(dead_letter_queue_name(FEEDBACK_QUEUE), durable=True)
+            session_queue = await channel.declare_queue(SESSION_FEEDBACK_QUEUE, durable=True)
+            await channel.declare_queue(SESSION_FEEDBACK_DEBOUNCE_QUEUE, durable=True,
+                                        arguments=QUEUE_ARGUMENTS[SESSION_FEEDBACK_DEBOUNCE_QUEUE])
+            consumer_tag = await queue.consume(self.on_message)
+            session_consumer_tag = await session_queue.consume(self.on_session_message)
+
+            print(f" [*] Async feedback worker: {self.concurrency} completions in flight max. "
+                  f"To exit press CTRL+C")
+            await self.stopping.wait()
+
+            # Berhenti ambil pesan baru, selesaikan yang sedang jalan
+            await queue.cancel(consumer_tag)
+            await session_queue.cancel(session_consumer_tag)
+            if self.in_flight:
+                print(f"⏳ Waiting for {len(self.in_flight)} in-flight message(s)...")
+                await asyncio.gather(*self.in_flight, return_exceptions=True)
+        finally:
+            await self.connection.close()
+            await self.http.close()
+            self.db_executor.shutdown(wait=True)
+            self.session_executor.shutdown(wait=True)
+            metrics.log_summary(prefix="[feedback] ")
+            print("👋 Async feedback worker stopped")
+
+    def stop(self):
+        self.stopping.set()
+
+
+async def main_async(concurrency=None):
+    worker = AsyncFeedbackWorker(concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Async feedback_analysis + session_feedback consumer")
+    parser.add_argument('--concurrency', type=int, default=Config.FEEDBACK_CONCURRENCY,
+                        help="max chat completions in flight (also the prefetch count)")
+    args = parser.parse_args(argv)
+    asyncio.run(main_async(args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark biaya parse + decode per frame untuk endpoint detect-face.
+
+Membandingkan format request yang diterima /api/face/detect-face:
+JSON base64 (lama), body image/jpeg mentah dan multipart. Yang diukur hanya
+bagian di proses web (read_frame) ditambah cv2.imdecode di worker, tanpa
+HOG, jadi angkanya murni overhead ingestion. Tanpa argumen dipakai frame
+sintetis 640x480; lebih representatif kalau diberi snapshot webcam asli.
+
+    cd backend
+    python benchmarks/face_ingest.py snapshot.jpg --frames 500
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes.detect_face import read_frame  # noqa: E402
+from tasks.face_detection import REDUCED_GRAYSCALE_FLAGS  # noqa: E402
+
+
+def synthetic_frame(width=640, height=480, quality=90):
+    rng = np.random.default_rng(0)
+    # Gradien + noise halus: ukuran JPEG mirip frame webcam, bukan noise murni
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    img += rng.normal(0, 8, img.shape)
+    ok, encoded = cv2.imencode('.jpg', img.clip(0, 255).astype(np.uint8),
+                               [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes()
+
+
+def request_variants(jpeg):
+    data_url = 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()
+    return {
+        'json-base64': lambda: dict(data=json.dumps({'image': data_url, 'mode': 'presence'}),
+                                    content_type='application/json'),
+        'raw-jpeg': lambda: dict(data=jpeg, content_type='image/jpeg',
+                                 query_string={'mode': 'presence'}),
+        'multipart': lambda: dict(data={'image': (io.BytesIO(jpeg), 'frame.jpg'), 'mode': 'presence'},
+                                  content_type='multipart/form-data'),
+    }
+
+
+def time_per_frame(fn, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Face frame ingestion benchmark (parse + decode)")
+    parser.add_argument('file', nargs='?', help="JPEG frame to use instead of a synthetic one")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--reduction', type=int, default=2, choices=sorted(REDUCED_GRAYSCALE_FLAGS))
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, 'rb') as f:
+            jpeg = f.read()
+    else:
+        jpeg = synthetic_frame()
+    app = Flask(__name__)
+
+    print(f"frame={len(jpeg) / 1024:.1f} KiB frames={args.frames}")
+    print(f"{'format':>12} {'wire KiB':>9} {'parse ms':>9} {'+decode ms':>11} {'+reduced ms':>12}")
+    for name, make_request in request_variants(jpeg).items():
+        wire = len(make_request()['data']) if name != 'multipart' else len(jpeg)
+
+        def parse():
+            with app.test_request_context('/api/face/detect-face', method='POST', **make_request()):
+                return read_frame()[0]
+
+        def parse_decode(flag):
+            return lambda: cv2.imdecode(np.frombuffer(parse(), np.uint8), flag)
+
+        # Waktu membangun request test ikut terukur di ketiga format, jadi yang dibandingkan selisihnya
+        parse_ms = time_per_frame(parse, args.frames)
+        full_ms = time_per_frame(parse_decode(cv2.IMREAD_COLOR), args.frames)
+        reduced_ms = time_per_frame(parse_decode(REDUCED_GRAYSCALE_FLAGS[args.reduction]), args.frames)
+        print(f"{name:>12} {wire / 1024:>9.1f} {parse_ms:>9.3f} {full_ms:>11.3f} {reduced_ms:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark biaya HOG per frame untuk mode full vs presence.
+
+Menjalankan analyze_face di proses ini (tanpa pool) untuk mode full dan
+beberapa kombinasi FACE_PRESENCE_REDUCTION:FACE_PRESENCE_UPSAMPLE. Biaya
+HOG ditentukan jumlah piksel yang di-scan, bukan isi gambar, jadi frame
+sintetis sudah cukup untuk mengukur waktu; untuk cek deteksi beri snapshot
+webcam asli. Kolom min face = perkiraan wajah terkecil yang masih
+terdeteksi di frame asli (window HOG dlib 80px).
+
+    cd backend
+    python benchmarks/face_presence.py snapshot.jpg --frames 50 --configs 2:0,4:1
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.face_ingest import synthetic_frame, time_per_frame  # noqa: E402
+from config import Config  # noqa: E402
+from tasks import face_detection  # noqa: E402
+
+HOG_WINDOW_PX = 80
+
+
+def parse_config(value):
+    reduction, upsample = (int(part) for part in value.split(':'))
+    if reduction not in face_detection.REDUCED_GRAYSCALE_FLAGS:
+        raise argparse.ArgumentTypeError(f"reduction must be one of {sorted(face_detection.REDUCED_GRAYSCALE_FLAGS)}")
+    return reduction, upsample
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Face detection cost per frame (full vs presence)")
+    parser.add_argument('file', nargs='?', help="JPEG frame to use instead of a synthetic one")
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--configs', default='2:1,2:0,4:1,4:0',
+                        type=lambda value: [parse_config(item) for item in value.split(',')],
+                        help="presence settings to compare as reduction:upsample pairs")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, 'rb') as f:
+            jpeg = f.read()
+    else:
+        jpeg = synthetic_frame()
+    face_detection._init_worker()
+
+    full_ms = time_per_frame(lambda: face_detection.analyze_face(jpeg, 'full'), args.frames)
+    faces = face_detection.analyze_face(jpeg, 'full')['face_count']
+    print(f"frame={len(jpeg) / 1024:.1f} KiB frames={args.frames}")
+    print(f"{'mode':>16} {'ms/frame':>9} {'vs full':>8} {'min face':>9} {'faces':>6}")
+    print(f"{'full':>16} {full_ms:>9.2f} {1:>7.2f}x {HOG_WINDOW_PX // 2:>7}px {faces:>6}")
+
+    for reduction, upsample in args.configs:
+        Config.FACE_PRESENCE_REDUCTION = reduction
+        Config.FACE_PRESENCE_UPSAMPLE = upsample
+        presence_ms = time_per_frame(lambda: face_detection.detect_presence(jpeg), args.frames)
+        faces = face_detection.detect_presence(jpeg)['face_count']
+        min_face = HOG_WINDOW_PX * reduction // 2 ** upsample
+        name = f"presence {reduction}:{upsample}"
+        print(f"{name:>16} {presence_ms:>9.2f} {presence_ms / full_ms:>7.2f}x {min_face:>7}px {faces:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark throughput STT batch vs sekuensial di CPU.
+
+Mentranskrip N jawaban dengan batch size 1, 4 dan 8 lalu mencetak
+jawaban per menit. Tanpa argumen file, dipakai audio sintetis (noise
+berwarna) supaya bisa jalan di mesin mana pun; hasil paling representatif
+kalau diberi beberapa rekaman jawaban asli.
+
+    cd backend
+    python benchmarks/stt_batch.py uploads/*.webm --answers 16 --sizes 1 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio import SAMPLE_RATE, preprocess_audio  # noqa: E402
+from tasks.batch_stt import transcribe_batch  # noqa: E402
+
+
+def synthetic_answer(seconds, seed):
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal(seconds * SAMPLE_RATE).astype(np.float32)
+    return (np.cumsum(noise) / SAMPLE_RATE * 4).astype(np.float32).clip(-1, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Whisper batch-size throughput benchmark (CPU)")
+    parser.add_argument('files', nargs='*', help="answer recordings to cycle through")
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--language', default='id')
+    parser.add_argument('--answers', type=int, default=16, help="answers per run")
+    parser.add_argument('--seconds', type=int, default=45, help="synthetic answer length")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--threads', type=int, default=0, help="torch threads (0 = default)")
+    args = parser.parse_args(argv)
+
+    import torch
+    import whisper
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = whisper.load_model(args.model, device='cpu')
+
+    if args.files:
+        sources = [np.asarray(preprocess_audio(path)) for path in args.files]
+    else:
+        sources = [synthetic_answer(args.seconds, seed) for seed in range(4)]
+    audios = [sources[i % len(sources)] for i in range(args.answers)]
+    total_audio = sum(len(a) for a in audios) / SAMPLE_RATE
+
+    # Warm-up supaya alokasi pertama tidak ikut terukur
+    transcribe_batch(model, audios[:1], args.language)
+
+    print(f"model={args.model} answers={args.answers} audio={total_audio:.0f}s "
+          f"threads={torch.get_num_threads()}")
+    print(f"{'batch':>5} {'seconds':>9} {'answers/min':>12} {'speedup':>8}")
+    baseline = None
+    for size in args.sizes:
+        start = time.perf_counter()
+        for i in range(0, len(audios), size):
+            group = audios[i:i + size]
+            # Window semua jawaban di grup digabung; `size` window per pass encoder/decoder
+            transcribe_batch(model, group, args.language, max_batch_windows=size)
+        elapsed = time.perf_counter() - start
+        per_minute = len(audios) / elapsed * 60
+        baseline = baseline or per_minute
+        print(f"{size:>5} {elapsed:>9.1f} {per_minute:>12.1f} {per_minute / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
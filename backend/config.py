@@ -13,16 +13,98 @@ class Config:
         'pool_pre_ping': True,
         'pool_recycle': 300,
     }
+    # Pool per proses worker; satu pesan hanya butuh satu koneksi
+    WORKER_DB_POOL_SIZE = int(os.getenv('WORKER_DB_POOL_SIZE', 2))
+    # true = endpoint yang melewati @query_budget melempar error (untuk test), false = hanya log
+    QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'false').lower() == 'true'
     RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
     RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", 5672))
     RABBITMQ_USER = os.getenv("RABBITMQ_USER")
     RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD")
     RABBITMQ_VHOST = os.getenv("RABBITMQ_VHOST", "/")
+    # Batas tunggu confirm broker untuk publish dari request HTTP (detik)
+    RABBITMQ_CONFIRM_TIMEOUT = float(os.getenv("RABBITMQ_CONFIRM_TIMEOUT", 5))
+    # Retry pesan gagal lewat delay queue (backoff eksponensial), lalu ke <queue>.dead
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+    JOB_RETRY_BASE_MS = int(os.getenv('JOB_RETRY_BASE_MS', 5000))
+    JOB_RETRY_MAX_MS = int(os.getenv('JOB_RETRY_MAX_MS', 300000))
+    # Job 'running' lebih lama dari ini dianggap worker-nya mati dan boleh diambil alih
+    JOB_RUNNING_TIMEOUT = int(os.getenv('JOB_RUNNING_TIMEOUT', 900))
 
     
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-string')
 
 
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
+    OPENAI_TIMEOUT = int(os.getenv('OPENAI_TIMEOUT', 60))
+    # Budget token input per panggilan (dibatasi lagi oleh context window model)
+    FEEDBACK_MAX_INPUT_TOKENS = int(os.getenv('FEEDBACK_MAX_INPUT_TOKENS', 3000))
+    POLISH_MAX_INPUT_TOKENS = int(os.getenv('POLISH_MAX_INPUT_TOKENS', 2000))  # per chunk
+    # 'answer' = satu completion per jawaban; 'session' = satu completion untuk semua jawaban satu sesi
+    FEEDBACK_BATCH_MODE = os.getenv('FEEDBACK_BATCH_MODE', 'answer')
+    # Mode session: analisis jalan saat sesi selesai, atau setelah tidak ada jawaban baru selama ini
+    FEEDBACK_SESSION_DEBOUNCE_SECONDS = int(os.getenv('FEEDBACK_SESSION_DEBOUNCE_SECONDS', 120))
+    FEEDBACK_SESSION_MAX_INPUT_TOKENS = int(os.getenv('FEEDBACK_SESSION_MAX_INPUT_TOKENS', 12000))
+    FEEDBACK_CONCURRENCY = int(os.getenv('FEEDBACK_CONCURRENCY', 16))
+    # Cache completion LLM (0 = nonaktif)
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 2048))
+    LLM_CACHE_REDIS = os.getenv('LLM_CACHE_REDIS', 'false').lower() == 'true'
+    # Cache katalog role/pertanyaan (detik); Redis opsional supaya invalidasi terlihat di semua proses
+    CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 3600))
+    CATALOG_CACHE_REDIS = os.getenv('CATALOG_CACHE_REDIS', 'false').lower() == 'true'
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # Upload chunked: kirim job transkripsi bertahap setiap kelipatan ukuran ini
+    STT_INCREMENTAL_STEP_BYTES = int(os.getenv('STT_INCREMENTAL_STEP_BYTES', 512 * 1024))
+
+    # STT (consumer): whisper | faster-whisper | openai
+    STT_BACKEND = os.getenv('STT_BACKEND', 'whisper')
+    STT_DEVICE = os.getenv('STT_DEVICE', 'cpu')
+    STT_COMPUTE_TYPE = os.getenv('STT_COMPUTE_TYPE', 'int8')  # faster-whisper
+    WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+    WHISPER_LANGUAGE = os.getenv('WHISPER_LANGUAGE', 'id')
+    WHISPER_WARMUP = os.getenv('WHISPER_WARMUP', 'true').lower() == 'true'
+    # Cache transkrip per hash audio: sqlite | redis | none
+    TRANSCRIPT_CACHE_BACKEND = os.getenv('TRANSCRIPT_CACHE_BACKEND', 'sqlite')
+    TRANSCRIPT_CACHE_PATH = os.getenv('TRANSCRIPT_CACHE_PATH', 'cache/transcripts.sqlite3')
+    TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv('TRANSCRIPT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    TRANSCRIPT_CACHE_TTL = int(os.getenv('TRANSCRIPT_CACHE_TTL', 30 * 24 * 3600))
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    # Relay event progres ke endpoint SSE: 'redis' (pub/sub) atau 'none'
+    EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'none')
+    EVENTS_TOKEN_FLUSH_MS = int(os.getenv('EVENTS_TOKEN_FLUSH_MS', 100))
+    EVENTS_STREAM_TIMEOUT = int(os.getenv('EVENTS_STREAM_TIMEOUT', 600))  # detik per koneksi SSE
+    STT_SILENCE_THRESHOLD_DB = float(os.getenv('STT_SILENCE_THRESHOLD_DB', -45))
+
+    # Deteksi wajah (process pool di proses web); lebih dari workers + queue -> HTTP 429
+    FACE_WORKERS = int(os.getenv('FACE_WORKERS', 2))
+    FACE_QUEUE_SIZE = int(os.getenv('FACE_QUEUE_SIZE', 4))
+    FACE_TIMEOUT = int(os.getenv('FACE_TIMEOUT', 10))
+    # mode=presence/identity: decode di 1/n resolusi (1, 2, 4, 8) lalu HOG dengan upsample.
+    # Wajah terkecil yang terdeteksi ~80px * n / 2^upsample di frame asli: default 2 tanpa
+    # upsample = ~160px (wajah kandidat di depan webcam 640x480). Untuk kamera yang jauh pakai
+    # upsample 1 (~80px), dengan biaya ~3x (lihat benchmarks/face_presence.py)
+    FACE_PRESENCE_REDUCTION = int(os.getenv('FACE_PRESENCE_REDUCTION', 2))
+    FACE_PRESENCE_UPSAMPLE = int(os.getenv('FACE_PRESENCE_UPSAMPLE', 0))
+    # mode=identity: encoding referensi per sesi; 'memory' (per proses) atau 'redis'
+    FACE_STORE_BACKEND = os.getenv('FACE_STORE_BACKEND', 'memory')
+    FACE_STORE_MAX_SESSIONS = int(os.getenv('FACE_STORE_MAX_SESSIONS', 1000))
+    FACE_STORE_TTL = int(os.getenv('FACE_STORE_TTL', 3 * 3600))
+    FACE_MATCH_TOLERANCE = float(os.getenv('FACE_MATCH_TOLERANCE', 0.6))  # jarak euclidean, default face_recognition
+    FACE_REFERENCE_SAMPLES = int(os.getenv('FACE_REFERENCE_SAMPLES', 5))
+    # Kotak wajah yang overlap-nya (IoU) setinggi ini dengan cek sebelumnya dianggap tidak berubah
+    FACE_TRACK_IOU = float(os.getenv('FACE_TRACK_IOU', 0.5))
+
+    # Worker pool (supervisor.py)
+    STT_WORKERS = int(os.getenv('STT_WORKERS', os.cpu_count() or 1))
+    FEEDBACK_WORKERS = int(os.getenv('FEEDBACK_WORKERS', 1))
+    # 'async' = async_consumer (banyak completion in-flight per proses); 'sync' = consumer.run_worker
+    FEEDBACK_WORKER_MODE = os.getenv('FEEDBACK_WORKER_MODE', 'async')
+    STT_TORCH_THREADS = int(os.getenv('STT_TORCH_THREADS', 0))  # 0 = cores / STT_WORKERS
+    STT_BATCH_SIZE = int(os.getenv('STT_BATCH_SIZE', 1))  # >1 = mode batch
+    STT_BATCH_WAIT_MS = int(os.getenv('STT_BATCH_WAIT_MS', 500))
+    STT_BATCH_MAX_WINDOWS = int(os.getenv('STT_BATCH_MAX_WINDOWS', 16))
+    # 'queued' = STT dan feedback lewat queue terpisah; 'fused' = satu worker STT -> polish -> feedback
+    PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'queued')
@@ -2,125 +2,341 @@ import pika
 import json
 import time
 import os
+import signal
 import threading
 import traceback
-import whisper
+from datetime import datetime
+from types import SimpleNamespace
 from config import Config
 from extensions import db
 from models.answer import Answer
 from models.question import Question
+from models.session import InterviewSession
 import dotenv
 
 import openai
-from app import create_app
+from app import get_worker_app
+from utils.metrics import metrics
+from utils.llm import chat_completion, stream_chat_completion
+from utils.events import publish_event, answer_scores, TokenStreamer
+from utils.rabbitmq_handler import (
+    rabbitmq_handler, publish_session_feedback, QUEUE_ARGUMENTS, SESSION_FEEDBACK_DEBOUNCE_QUEUE
+)
+from tasks.incremental_stt import transcribe_incremental, transcribe_final, cleanup_partial, load_partial
+from tasks.stt_backends import get_stt_backend
+from tasks.pipeline import load_checkpoint, save_checkpoint, clear_checkpoint
+from tasks.jobs import begin_job, complete_job, fail_job, retry_or_dead_letter, declare_job_queues
+from tasks.analytics import update_score_rollups
+from utils.audio import preprocess_audio, file_sha256
+from utils.transcript_cache import get_transcript_cache, transcript_cache_key
+from tasks.feedback_analyzer import (
+    FEEDBACK_MODEL, FEEDBACK_MAX_TOKENS, FEEDBACK_TEMPERATURE, FEEDBACK_RESPONSE_FORMAT,
+    build_feedback_messages, parse_feedback_with_repair, repair_feedback, apply_feedback_to_answer,
+    log_feedback_tokens, build_session_feedback_messages, parse_session_feedback,
+)
+from utils.prompt_budget import (
+    count_tokens, count_message_tokens, input_budget, output_limit,
+    split_to_token_chunks, log_token_usage,
+)
 dotenv.load_dotenv()
+
+def check_audio_file(answer, answer_id):
+    """Validate that the answer has a non-empty media file on disk"""
+    if not answer or not answer.audio_file_path:
+        print(f"❌ Answer {answer_id} not found or no audio file")
+        return False
+
+    print(f"📂 Audio file path: {answer.audio_file_path}")
+    if not os.path.exists(answer.audio_file_path):
+        print(f"❌ Audio file not found: {answer.audio_file_path}")
+        return False
+
+    file_size = os.path.getsize(answer.audio_file_path)
+    print(f"🔊 Audio file size: {file_size} bytes")
+    if file_size == 0:
+        print(f"❌ Audio file is empty")
+        return False
+    return True
+
+
+POLISH_MODEL = "gpt-4o"
+POLISH_SYSTEM_PROMPT = ("Anda adalah asisten yang merapikan"
+                        " hasil transkrip audio tanpa mengubah makna atau materi yang dibahas, "
+                        "pastikan hanya merapikan kata yang berantakan.")
+
+
+def polish_transcript(transcript_text, answer_id=None):
+    """Tidy the raw transcript with GPT.
+
+    Returns the text unchanged when polishing is disabled (no API key) and
+    None when the GPT call fails, so callers can avoid caching an unpolished
+    transcript as if it were the polished one.
+
+    Long transcripts are polished in chunks that fit the input budget, with
+    max_tokens sized to each chunk so the output is never cut off. The text
+    is not compressed here: that only happens for the feedback prompt.
+    """
+    try:
+        if Config.OPENAI_API_KEY:  
+            print("✨ Polishing transcript with GPT...")
+            chunk_budget = input_budget(POLISH_MODEL, Config.POLISH_MAX_INPUT_TOKENS, output_limit(POLISH_MODEL))
+            chunks = split_to_token_chunks(transcript_text, POLISH_MODEL, chunk_budget)
+
+            polished_chunks, tokens_in, tokens_out = [], 0, 0
+            for chunk in chunks:
+                messages = [
+                    {"role": "system", "content": POLISH_SYSTEM_PROMPT},
+                    {"role": "user", "content": chunk}
+                ]
+                chunk_tokens = count_tokens(chunk, POLISH_MODEL)
+                polished = chat_completion(
+                    POLISH_MODEL,
+                    messages,
+                    # Hasil rapi kurang lebih sepanjang input; beri ruang sedikit
+                    max_tokens=min(output_limit(POLISH_MODEL), chunk_tokens + chunk_tokens // 4 + 50),
+                    temperature=0.2
+                ).strip()
+                polished_chunks.append(polished)
+                tokens_in += count_message_tokens(messages, POLISH_MODEL)
+                tokens_out += count_tokens(polished, POLISH_MODEL)
+
+            log_token_usage('polish', f"answer {answer_id}", POLISH_MODEL, tokens_in, tokens_out)
+            polished_text = ' '.join(polished_chunks)
+            print(f"📝 Polished transcript: {polished_text[:100]}...")
+            return polished_text
+    except Exception as e:
+        print(f"⚠️ Skipping GPT polish due to error: {e}")
+        metrics.increment('polish.failures')
+        return None
+    return transcript_text
+
+
+def answer_cache_key(answer, backend):
+    """Content-addressed transcript cache key for an answer's media file"""
+    if not answer.audio_sha256:
+        # Upload lama / jalur lain yang belum menyimpan hash
+        answer.audio_sha256 = file_sha256(answer.audio_file_path)
+    return transcript_cache_key(answer.audio_sha256, backend.name, backend.model_name, backend.language)
+
+
+def get_cached_transcript(cache_key):
+    try:
+        with metrics.timer('stt.cache_lookup_seconds'):
+            cached = get_transcript_cache().get(cache_key)
+    except Exception as e:
+        print(f"⚠️ Transcript cache unavailable: {e}")
+        return None
+    metrics.increment('stt.cache_hits' if cached else 'stt.cache_misses')
+    return cached
+
+
+def store_cached_transcript(cache_key, transcript_text, polished_text):
+    backend = get_stt_backend()
+    try:
+        get_transcript_cache().set(cache_key, {
+            'raw': transcript_text,
+            'polished': polished_text,
+            'model': f"{backend.name}/{backend.model_name}",
+            'language': backend.language,
+        })
+    except Exception as e:
+        print(f"⚠️ Failed to store transcript in cache: {e}")
+
+
+def save_transcript(answer, transcript_text, polished_text=None, cache_key=None):
+    """Polish (unless already polished), commit the transcript and trigger feedback analysis.
+
+    Must be called inside an app context with `answer` attached to the session.
+    """
+    answer_id = answer.id
+    print(f"📝 STT transcript: {transcript_text[:100]}...")
+
+    if polished_text is None:
+        polished_text = polish_transcript(transcript_text, answer_id)
+        if polished_text is None:
+            # Polish gagal: simpan transkrip mentah, tapi jangan di-cache supaya upload berikutnya dicoba lagi
+            polished_text = transcript_text
+        elif cache_key:
+            store_cached_transcript(cache_key, transcript_text, polished_text)
+    answer.transcript_text = polished_text
+
+    # === STEP 3: Simpan ke database ===
+    try:
+        print("💾 Committing transcript to database...")
+        db.session.commit()
+        print(f"✅ Transcript saved to database for answer {answer_id}")
+        publish_event(answer_id, answer.session_id, 'transcript_ready')
+        cleanup_partial(answer.audio_file_path)
+        
+        # 🔥 Trigger feedback analysis setelah STT selesai
+        if Config.FEEDBACK_BATCH_MODE == 'session':
+            print(f"🚀 Scheduling session feedback for session {answer.session_id}")
+            trigger_session_feedback(answer.session_id)
+        else:
+            print(f"🚀 Triggering feedback analysis for answer {answer_id}")
+            trigger_feedback_analysis(answer_id)
+        
+        return True
+    except Exception as e:
+        print(f"❌ Error saving transcript to database: {e}")
+        traceback.print_exc()
+        db.session.rollback()
+        return False
+
+
 def process_audio_to_text(answer_id):
     """Process audio file to text using local Whisper (optionally polish with GPT)"""
     try:
         print(f"🔍 Starting STT processing for answer {answer_id}")
-        app = create_app()
+        app = get_worker_app()
         with app.app_context():
             print(f"🔎 Querying Answer with id: {answer_id}")
             answer = Answer.query.get(answer_id)
             print(f"🔎 Query result: {answer}")
-            if not answer or not answer.audio_file_path:
-                print(f"❌ Answer {answer_id} not found or no audio file")
+            if not check_audio_file(answer, answer_id):
                 return False
+            publish_event(answer_id, answer.session_id, 'stt_started')
 
-            print(f"📂 Audio file path: {answer.audio_file_path}")
-            if not os.path.exists(answer.audio_file_path):
-                print(f"❌ Audio file not found: {answer.audio_file_path}")
-                return False
-
-            file_size = os.path.getsize(answer.audio_file_path)
-            print(f"🔊 Audio file size: {file_size} bytes")
-            if file_size == 0:
-                print(f"❌ Audio file is empty")
-                return False
+            backend = get_stt_backend()
+            cache_key = answer_cache_key(answer, backend)
+            cached = get_cached_transcript(cache_key)
+            if cached:
+                print(f"⚡ Transcript cache hit for answer {answer_id}")
+                return save_transcript(answer, cached['raw'], polished_text=cached['polished'])
 
-            print("🔄 Loading local Whisper model...")
-            model = whisper.load_model("base")  
+            print(f"🔄 Running transcription with '{backend.name}' backend...")
+            # Upload chunked: pakai hasil transkripsi bertahap, cukup transkrip sisa ekornya
+            transcript_text = transcribe_final(backend, answer.audio_file_path)
+            metrics.increment('stt.transcriptions')
 
-            print("🔄 Running transcription locally...")
-            result = model.transcribe(answer.audio_file_path, fp16=False, language='id',temperature=0)
-            transcript_text = result["text"]
+            return save_transcript(answer, transcript_text, cache_key=cache_key)
 
-            print(f"📝 Local Whisper transcript: {transcript_text[:100]}...")
-            answer.transcript_text = transcript_text
+    except Exception as e:
+        print(f"❌ Error processing audio for answer {answer_id}: {str(e)}")
+        traceback.print_exc()
+        return False
 
-            try:
-                if Config.OPENAI_API_KEY:  
-                    openai.api_key = Config.OPENAI_API_KEY
-                    print("✨ Polishing transcript with GPT...")
-                    response = openai.ChatCompletion.create(
-                        model="gpt-4o",
-                        messages=[
-                            {"role": "system", "content": "Anda adalah asisten yang merapikan"
-                            " hasil transkrip audio tanpa mengubah makna atau materi yang dibahas, "
-                            "pastikan hanya merapikan kata yang berantakan."},
-
-                            {"role": "user", "content": transcript_text}
-                        ],
-                        max_tokens=1000,
-                        temperature=0.2
-                    )
-                    polished_text = response.choices[0].message.content.strip()
-                    print(f"📝 Polished transcript: {polished_text[:100]}...")
-                    answer.transcript_text = polished_text
-            except Exception as e:
-                print(f"⚠️ Skipping GPT polish due to error: {e}")
+def run_fused_pipeline(answer_id, transcript_text=None):
+    """STT -> polish -> feedback in one worker, with one DB read and one DB write.
 
-            # === STEP 3: Simpan ke database ===
+    Used when PIPELINE_MODE=fused. Each stage checkpoints its output next to the
+    audio file so a redelivered message resumes after the last finished stage.
+    transcript_text can be passed in by the batch worker, which has already
+    transcribed the audio.
+    """
+    try:
+        print(f"🔍 Starting fused pipeline for answer {answer_id}")
+        app = get_worker_app()
+        backend = get_stt_backend()
+        with app.app_context():
+            row = (db.session.query(Answer, Question.question_text)
+                   .join(Question, Answer.question_id == Question.id)
+                   .filter(Answer.id == answer_id)
+                   .first())
+            answer, question_text = row if row else (None, None)
+            if not check_audio_file(answer, answer_id):
+                return False
+            audio_path = answer.audio_file_path
+            cache_key = answer_cache_key(answer, backend)
+            audio_sha256 = answer.audio_sha256
+            session_id = answer.session_id
+        publish_event(answer_id, session_id, 'stt_started')
+
+        # Stage di luar app context: koneksi DB tidak ditahan selama Whisper / GPT
+        state = load_checkpoint(audio_path)
+        if 'polished' not in state:
+            cached = get_cached_transcript(cache_key)
+            if cached:
+                print(f"⚡ Transcript cache hit for answer {answer_id}")
+                state['raw'], state['polished'] = cached['raw'], cached['polished']
+            else:
+                if 'raw' not in state:
+                    if transcript_text is None:
+                        print(f"🔄 Running transcription with '{backend.name}' backend...")
+                        with metrics.timer('pipeline.stt_seconds'):
+                            transcript_text = transcribe_final(backend, audio_path)
+                        metrics.increment('stt.transcriptions')
+                    state['raw'] = transcript_text
+                    save_checkpoint(audio_path, state)
+                print(f"📝 STT transcript: {state['raw'][:100]}...")
+                with metrics.timer('pipeline.polish_seconds'):
+                    polished = polish_transcript(state['raw'], answer_id)
+                if polished is not None:
+                    store_cached_transcript(cache_key, state['raw'], polished)
+                # Polish gagal: lanjut dengan transkrip mentah, tanpa masuk cache
+                state['polished'] = polished if polished is not None else state['raw']
+            save_checkpoint(audio_path, state)
+        publish_event(answer_id, session_id, 'transcript_ready')
+
+        if 'feedback' not in state:
+            print(f"🔄 Sending to OpenAI GPT API...")
+            publish_event(answer_id, session_id, 'feedback_started')
+            messages = build_feedback_messages(question_text, state['polished'])
+            streamer = TokenStreamer(answer_id, session_id)
+            with metrics.timer('pipeline.feedback_seconds'):
+                state['feedback'] = stream_chat_completion(
+                    FEEDBACK_MODEL,
+                    messages,
+                    streamer,
+                    max_tokens=FEEDBACK_MAX_TOKENS,
+                    temperature=FEEDBACK_TEMPERATURE,
+                    response_format=FEEDBACK_RESPONSE_FORMAT
+                )
+            streamer.flush()
+            log_feedback_tokens(answer_id, messages, state['feedback'])
+            save_checkpoint(audio_path, state)
+
+        # Parsing ke objek sementara, lalu satu UPDATE tanpa load ulang Answer
+        result = SimpleNamespace(feedback=None, summary=None, clarity_score=None, structure_score=None,
+                                 keyword_score=None, confidence_score=None)
+        apply_feedback_to_answer(result, state['feedback'],
+                                 parse_feedback_with_repair(state['feedback'], repair_feedback))
+        with app.app_context():
+            Answer.query.filter_by(id=answer_id).update({
+                'audio_sha256': audio_sha256,
+                'transcript_text': state['polished'],
+                'feedback': result.feedback,
+                'summary': result.summary,
+                'clarity_score': result.clarity_score,
+                'structure_score': result.structure_score,
+                'keyword_score': result.keyword_score,
+                'confidence_score': result.confidence_score,
+            }, synchronize_session=False)
             try:
-                print("💾 Committing transcript to database...")
                 db.session.commit()
-                print(f"✅ Transcript saved to database for answer {answer_id}")
-                
-                # 🔥 Trigger feedback analysis setelah STT selesai
-                print(f"🚀 Triggering feedback analysis for answer {answer_id}")
-                trigger_feedback_analysis(answer_id)
-                
-                return True
-            except Exception as e:
-                print(f"❌ Error saving transcript to database: {e}")
-                traceback.print_exc()
+            except Exception:
                 db.session.rollback()
-                return False
+                raise
+            update_score_rollups([answer_id])
+        print(f"✅ Transcript and feedback saved to database for answer {answer_id}")
+        publish_event(answer_id, session_id, 'feedback_done', **answer_scores(result))
 
+        cleanup_partial(audio_path)
+        clear_checkpoint(audio_path)
+        return True
     except Exception as e:
-        print(f"❌ Error processing audio for answer {answer_id}: {str(e)}")
+        print(f"❌ Error in fused pipeline for answer {answer_id}: {str(e)}")
         traceback.print_exc()
         return False
 
-def trigger_feedback_analysis(answer_id):
-    """Trigger feedback analysis via RabbitMQ"""
-    try:
-        url = os.getenv('RABBITMQ_URL')
-        parameters = pika.URLParameters(url)
-        parameters.heartbeat = 600
-        parameters.blocked_connection_timeout = 300
 
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
+def stt_job_stage():
+    """Job stage recorded for stt_processing messages in the current pipeline mode"""
+    return 'pipeline' if Config.PIPELINE_MODE == 'fused' else 'stt'
 
-        # Pastikan queue ada
-        channel.queue_declare(queue='feedback_analysis', durable=True)
 
-        # Kirim pesan
+def trigger_feedback_analysis(answer_id):
+    """Trigger feedback analysis via RabbitMQ"""
+    try:
         message = {
             'answer_id': answer_id,
             'timestamp': int(time.time())
         }
-        
-        channel.basic_publish(
-            exchange='',
-            routing_key='feedback_analysis',
-            body=json.dumps(message),
-            properties=pika.BasicProperties(delivery_mode=2)  # Make message persistent
-        )
-        
+
+        # Pakai koneksi publisher persisten; tunggu confirm broker sebelum pesan STT di-ack
+        rabbitmq_handler.publish_message('feedback_analysis', message, wait_for_confirm=True)
+
         print(f"✅ Feedback analysis triggered for answer {answer_id}")
-        connection.close()
         return True
         
     except Exception as e:
@@ -130,30 +346,232 @@ def trigger_feedback_analysis(answer_id):
 
 
 
-def callback_stt(ch, method, properties, body):
+def finish_job_message(ch, method, queue, body, message_id, answer_id, stage, attempt, error=None):
+    """Record the job outcome, route failures to the delay queue / DLQ, then ack"""
+    app = get_worker_app()
+    with app.app_context():
+        if error is None:
+            complete_job(answer_id, stage)
+        else:
+            dead = retry_or_dead_letter(ch, queue, body, message_id, attempt)
+            fail_job(answer_id, stage, error, dead=dead)
+            if dead:
+                publish_event(answer_id, None, 'failed', stage=stage)
+    ch.basic_ack(delivery_tag=method.delivery_tag)
+
+
+def handle_job_message(ch, method, properties, body, queue, stage, process):
+    """Run process(answer_id) at most once per (answer, stage), with bounded retries"""
+    message_id = properties.message_id
     try:
-        print(f"📥 [stt_processing] Received: {body}")
         data = json.loads(body)
         answer_id = data.get('answer_id')
-        if answer_id:
-            print(f"⚙️ Processing STT for answer {answer_id}")
-            success = process_audio_to_text(answer_id)
-            if success:
-                print(f"✅ STT processing completed for answer {answer_id}")
-            else:
-                print(f"❌ STT processing failed for answer {answer_id}")
+    except (ValueError, AttributeError) as e:
+        # Pesan rusak tidak akan pernah berhasil; langsung ke DLQ
+        print(f"❌ Invalid message on {queue}: {e}")
+        retry_or_dead_letter(ch, queue, body, message_id, attempt=None)
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+        return
+    if not answer_id:
         ch.basic_ack(delivery_tag=method.delivery_tag)
-        print(f"✅ [stt_processing] Message acknowledged")
+        return
+
+    try:
+        with get_worker_app().app_context():
+            attempt = begin_job(answer_id, stage, message_id)
     except Exception as e:
-        print(f"❌ Error in STT callback: {e}")
+        # Database tidak tersedia: kembalikan ke queue, belum ada attempt yang tercatat
+        print(f"❌ Could not start {stage} job for answer {answer_id}: {e}")
         traceback.print_exc()
         ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        return
+
+    if attempt is None:
+        print(f"⏭️ {stage} for answer {answer_id} already done or in progress, skipping")
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+        return
+
+    print(f"⚙️ Processing {stage} for answer {answer_id} (attempt {attempt})")
+    error = None
+    try:
+        if process(answer_id):
+            print(f"✅ {stage} processing completed for answer {answer_id}")
+        else:
+            error = f"{stage} processing failed"
+            print(f"❌ {stage} processing failed for answer {answer_id}")
+    except Exception as e:
+        traceback.print_exc()
+        error = f"{type(e).__name__}: {e}"
+
+    try:
+        finish_job_message(ch, method, queue, body, message_id, answer_id, stage, attempt, error)
+        print(f"✅ [{queue}] Message acknowledged")
+    except Exception as e:
+        print(f"❌ Error finishing {stage} job for answer {answer_id}: {e}")
+        traceback.print_exc()
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+
+
+def trigger_session_feedback(session_id, force=False):
+    """Schedule batch feedback for a session.
+
+    Normally the message goes through the debounce queue and only runs after
+    FEEDBACK_SESSION_DEBOUNCE_SECONDS without new answers; force=True (session
+    completed) runs it right away.
+    """
+    try:
+        publish_session_feedback(session_id, force)
+        return True
+    except Exception as e:
+        print(f"❌ Error triggering session feedback: {e}")
+        traceback.print_exc()
+        return False
+
+
+def analyze_session_feedback(session_id, requested_at=None, force=False, message_id=None):
+    """Analyze every answer of a session that has a transcript but no feedback in one completion.
+
+    Answers the batch response does not cover fall back to the per-answer
+    feedback_analysis queue.
+    """
+    app = get_worker_app()
+    with app.app_context():
+        session = InterviewSession.query.get(session_id)
+        if not session:
+            print(f"❌ Session {session_id} not found")
+            return
+        rows = (db.session.query(Answer.id, Answer.created_at, Answer.transcript_text,
+                                 Answer.feedback, Question.question_text)
+                .join(Question, Answer.question_id == Question.id)
+                .filter(Answer.session_id == session_id)
+                .order_by(Answer.id)
+                .all())
+
+        if not force and session.status != 'completed':
+            # Debounce: masih ada jawaban yang lebih baru / STT belum selesai -> pesan berikutnya yang jalan
+            newest = max((row.created_at for row in rows if row.created_at), default=None)
+            if requested_at and newest and newest > datetime.utcfromtimestamp(requested_at):
+                print(f"⏭️ Session {session_id} got new answers, waiting for the next debounce")
+                return
+            if any(row.transcript_text is None for row in rows):
+                print(f"⏭️ Session {session_id} still has answers in STT, waiting")
+                return
+
+        pending = [row for row in rows if row.transcript_text and not row.feedback]
+        # Klaim per jawaban lewat processing_jobs supaya tidak dianalisis dua kali
+        items = [(row.id, row.question_text, row.transcript_text) for row in pending
+                 if begin_job(row.id, 'feedback', message_id) is not None]
+    if not items:
+        return
+
+    answer_ids = [answer_id for answer_id, _, _ in items]
+    print(f"🔍 Session feedback for session {session_id}: {len(items)} answer(s)")
+    results, session_summary = {}, None
+    try:
+        messages, max_tokens = build_session_feedback_messages(items)
+        with metrics.timer('feedback.session_seconds'):
+            feedback_text = chat_completion(
+                FEEDBACK_MODEL,
+                messages,
+                max_tokens=max_tokens,
+                temperature=FEEDBACK_TEMPERATURE,
+                response_format=FEEDBACK_RESPONSE_FORMAT
+            )
+        log_token_usage('session_feedback', f"session {session_id}", FEEDBACK_MODEL,
+                        count_message_tokens(messages, FEEDBACK_MODEL),
+                        count_tokens(feedback_text, FEEDBACK_MODEL))
+        results, session_summary = parse_session_feedback(feedback_text, answer_ids)
+    except Exception as e:
+        print(f"❌ Session feedback failed for session {session_id}: {e}")
+        traceback.print_exc()
+
+    with app.app_context():
+        for answer in Answer.query.filter(Answer.id.in_(list(results))).all():
+            apply_feedback_to_answer(answer, feedback_text, results[answer.id])
+        if session_summary:
+            InterviewSession.query.filter_by(id=session_id).update(
+                {'feedback_summary': session_summary}, synchronize_session=False)
+        db.session.commit()
+        if results:
+            update_score_rollups(results)
+        for answer_id in answer_ids:
+            if answer_id in results:
+                complete_job(answer_id, 'feedback')
+            else:
+                fail_job(answer_id, 'feedback', "missing from session feedback response")
+    for answer_id, data in results.items():
+        publish_event(answer_id, session_id, 'feedback_done', summary=data['summary'],
+                      clarity_score=data['clarity'], structure_score=data['structure'],
+                      keyword_score=data['keyword'], confidence_score=data['confidence'])
+    print(f"✅ Session feedback saved for {len(results)}/{len(answer_ids)} answer(s) in session {session_id}")
+
+    for answer_id in answer_ids:
+        if answer_id not in results:
+            print(f"↩️ Falling back to per-answer feedback for answer {answer_id}")
+            trigger_feedback_analysis(answer_id)
+
+
+def callback_session_feedback(ch, method, properties, body):
+    try:
+        print(f"📥 [session_feedback] Received: {body}")
+        data = json.loads(body)
+        session_id = data.get('session_id')
+        if session_id:
+            analyze_session_feedback(session_id, data.get('timestamp'), data.get('force', False),
+                                     properties.message_id)
+            metrics.log_summary(prefix="[session-feedback] ")
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+    except Exception as e:
+        print(f"❌ Error in session feedback callback: {e}")
+        traceback.print_exc()
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
+
+def callback_stt(ch, method, properties, body):
+    print(f"📥 [stt_processing] Received: {body}")
+    if Config.PIPELINE_MODE == 'fused':
+        handle_job_message(ch, method, properties, body, 'stt_processing', 'pipeline', run_fused_pipeline)
+    else:
+        handle_job_message(ch, method, properties, body, 'stt_processing', 'stt', process_audio_to_text)
+    metrics.log_summary(prefix="[stt] ")
+
+
+def process_audio_incremental(answer_id):
+    """Transcribe the part of a chunked upload that has arrived so far"""
+    try:
+        app = get_worker_app()
+        with app.app_context():
+            answer = Answer.query.get(answer_id)
+            if not answer or not answer.audio_file_path or not os.path.exists(answer.audio_file_path):
+                return False
+            audio_path = answer.audio_file_path
+
+        # Transkripsi di luar app context: koneksi DB langsung kembali ke pool
+        return transcribe_incremental(get_stt_backend(), audio_path)
+    except Exception as e:
+        print(f"❌ Error in incremental STT for answer {answer_id}: {str(e)}")
+        traceback.print_exc()
+        return False
+
+
+def callback_stt_incremental(ch, method, properties, body):
+    try:
+        data = json.loads(body)
+        answer_id = data.get('answer_id')
+        if answer_id and process_audio_incremental(answer_id):
+            print(f"📝 Partial transcript updated for answer {answer_id}")
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+    except Exception as e:
+        print(f"❌ Error in incremental STT callback: {e}")
+        traceback.print_exc()
+        # Progres parsial tidak kritis; pass final tetap mentranskrip sisanya
+        ch.basic_ack(delivery_tag=method.delivery_tag)
 
 
 def analyze_answer_feedback(answer_id):
     try:
         print(f"🔍 Starting feedback analysis for answer {answer_id}")
-        app = create_app()
+        app = get_worker_app()
         with app.app_context():
             answer = Answer.query.get(answer_id)
             if not answer or not answer.transcript_text:
@@ -169,72 +587,28 @@ def analyze_answer_feedback(answer_id):
             print(f"❓ Question: {question.question_text}")
             print(f"💬 Transcript: {answer.transcript_text[:100]}...")
 
-            prompt = f"""
-            Berikut adalah jawaban dari kandidat terhadap pertanyaan interview:
-
-            "Pertanyaan: {question.question_text}"
-
-            "Jawaban: {answer.transcript_text}"
-
-            Tolong berikan ringkasan jawaban tersebut dan evaluasi sederhana dalam format berikut:
-            - Ringkasan: [ringkasan singkat]
-            - Evaluasi:
-              - Kejelasan: [1-10]
-              - Struktur: [1-10]
-              - Kata kunci: [1-10]
-            - Saran: [saran perbaikan singkat]
-            """
-
-            openai.api_key = Config.OPENAI_API_KEY
             print(f"🔄 Sending to OpenAI GPT API...")
-
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Anda adalah asisten yang memberikan feedback untuk interview."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
+            publish_event(answer_id, answer.session_id, 'feedback_started')
+
+            # Redelivery / transkrip identik dilayani dari cache completion;
+            # token di-stream ke client lewat relay event (SSE)
+            messages = build_feedback_messages(question.question_text, answer.transcript_text)
+            streamer = TokenStreamer(answer_id, answer.session_id)
+            feedback_text = stream_chat_completion(
+                FEEDBACK_MODEL,
+                messages,
+                streamer,
+                max_tokens=FEEDBACK_MAX_TOKENS,
+                temperature=FEEDBACK_TEMPERATURE,
+                response_format=FEEDBACK_RESPONSE_FORMAT
             )
-
-            feedback_text = response.choices[0].message.content
+            streamer.flush()
+            log_feedback_tokens(answer_id, messages, feedback_text)
             print(f"💬 AI Feedback response: {feedback_text}")
 
-            # 🔥 PENTING: Parsing feedback untuk ekstrak data
-            answer.feedback = feedback_text
-            
-            # Parsing sederhana untuk ekstrak ringkasan dan skor
-            lines = feedback_text.split('\n')
-            for line in lines:
-                if line.startswith('- Ringkasan:'):
-                    answer.summary = line.replace('- Ringkasan:', '').strip()
-                elif 'Kejelasan:' in line and 'Kejelasan: [1-10]' not in line:
-                    # Coba ekstrak angka dari line seperti "Kejelasan: 8"
-                    import re
-                    clarity_match = re.search(r'Kejelasan:\s*(\d+)', line)
-                    if clarity_match:
-                        answer.clarity_score = int(clarity_match.group(1))
-                elif 'Struktur:' in line and 'Struktur: [1-10]' not in line:
-                    import re
-                    structure_match = re.search(r'Struktur:\s*(\d+)', line)
-                    if structure_match:
-                        answer.structure_score = int(structure_match.group(1))
-                elif 'Kata kunci:' in line and 'Kata kunci: [1-10]' not in line:
-                    import re
-                    confidence_match = re.search(r'Kata kunci:\s*(\d+)', line)
-                    if confidence_match:
-                        answer.confidence_score = int(confidence_match.group(1))
-
-            # Jika parsing gagal, gunakan nilai default
-            if not answer.summary:
-                answer.summary = "Ringkasan jawaban..."
-            if not answer.clarity_score:
-                answer.clarity_score = 7
-            if not answer.structure_score:
-                answer.structure_score = 6
-            if not answer.confidence_score:
-                answer.confidence_score = 8
+            # 🔥 PENTING: Validasi JSON feedback (satu kali repair kalau formatnya rusak)
+            data = parse_feedback_with_repair(feedback_text, repair_feedback)
+            apply_feedback_to_answer(answer, feedback_text, data)
 
             try:
                 db.session.commit()
@@ -242,7 +616,10 @@ def analyze_answer_feedback(answer_id):
                 print(f"📊 Summary: {answer.summary}")
                 print(f"📊 Clarity Score: {answer.clarity_score}")
                 print(f"📊 Structure Score: {answer.structure_score}")
+                print(f"📊 Keyword Score: {answer.keyword_score}")
                 print(f"📊 Confidence Score: {answer.confidence_score}")
+                publish_event(answer_id, answer.session_id, 'feedback_done', **answer_scores(answer))
+                update_score_rollups([answer_id])
                 return True
             except Exception as e:
                 print(f"❌ Error saving feedback to database: {e}")
@@ -255,48 +632,257 @@ def analyze_answer_feedback(answer_id):
         return False
 
 def callback_feedback(ch, method, properties, body):
-    try:
-        print(f"📥 [feedback_analysis] Received: {body}")
-        data = json.loads(body)
-        answer_id = data.get('answer_id')
-        if answer_id:
-            print(f"⚙️ Processing feedback for answer {answer_id}")
-            success = analyze_answer_feedback(answer_id)
-            if success:
-                print(f"✅ Feedback processing completed for answer {answer_id}")
-            else:
-                print(f"❌ Feedback processing failed for answer {answer_id}")
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        print(f"✅ [feedback_analysis] Message acknowledged")
-    except Exception as e:
-        print(f"❌ Error in feedback callback: {e}")
-        traceback.print_exc()
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-
-def main():
-    url = LOADOTENV_RABBITMQ_URL = os.getenv('RABBITMQ_URL')
+    print(f"📥 [feedback_analysis] Received: {body}")
+    handle_job_message(ch, method, properties, body, 'feedback_analysis', 'feedback', analyze_answer_feedback)
+    metrics.log_summary(prefix="[feedback] ")
+
+QUEUE_CALLBACKS = {
+    'stt_processing': callback_stt,
+    'stt_incremental': callback_stt_incremental,
+    'feedback_analysis': callback_feedback,
+    'session_feedback': callback_session_feedback,
+}
+# Queue dengan job tracking + delay queue retry + DLQ (stt_incremental best-effort)
+JOB_QUEUES = {'stt_processing', 'feedback_analysis'}
+
+
+def set_torch_threads(num_threads):
+    """Pin the number of intra-op torch threads for this process (used by Whisper)"""
+    if not num_threads:
+        return
+    import torch
+    torch.set_num_threads(num_threads)
+    print(f"🧵 torch threads set to {num_threads}")
+
+
+def _connection_parameters():
+    url = os.getenv('RABBITMQ_URL')
     parameters = pika.URLParameters(url)
     parameters.heartbeat = 600
     parameters.blocked_connection_timeout = 300
+    return parameters
+
 
-    connection = pika.BlockingConnection(parameters)
+def _prepare_worker(queues, torch_threads=None):
+    # Bangun app + engine DB sekali per proses, dipakai ulang untuk semua pesan
+    get_worker_app()
+
+    # Load model sebelum mulai consume, bukan di pesan pertama
+    if 'stt_processing' in queues or 'stt_incremental' in queues:
+        set_torch_threads(torch_threads)
+        backend = get_stt_backend(num_threads=torch_threads)
+        if Config.WHISPER_WARMUP:
+            backend.warm_up()
+
+
+def run_worker(queues=None, torch_threads=None):
+    """Consume the given queues on one connection until SIGTERM/SIGINT.
+
+    Each worker process has its own connection and, when it handles
+    stt_processing, its own preloaded STT backend.
+    """
+    queues = queues or list(QUEUE_CALLBACKS)
+    _prepare_worker(queues, torch_threads)
+
+    connection = pika.BlockingConnection(_connection_parameters())
     channel = connection.channel()
 
-    channel.queue_declare(queue='stt_processing', durable=True)
-    channel.queue_declare(queue='feedback_analysis', durable=True)
+    for queue in queues:
+        if queue in JOB_QUEUES:
+            declare_job_queues(channel, queue)
+        else:
+            channel.queue_declare(queue=queue, durable=True)
+        if queue == 'session_feedback':
+            channel.queue_declare(queue=SESSION_FEEDBACK_DEBOUNCE_QUEUE, durable=True,
+                                  arguments=QUEUE_ARGUMENTS[SESSION_FEEDBACK_DEBOUNCE_QUEUE])
 
     channel.basic_qos(prefetch_count=1)
-    channel.basic_consume(queue='stt_processing', on_message_callback=callback_stt)
-    channel.basic_consume(queue='feedback_analysis', on_message_callback=callback_feedback)
+    for queue in queues:
+        channel.basic_consume(queue=queue, on_message_callback=QUEUE_CALLBACKS[queue])
+
+    def handle_shutdown(signum, frame):
+        # Pesan yang sedang diproses diselesaikan dulu (dan di-ack) sebelum berhenti
+        print(f"🛑 Signal {signum} received, stopping after current message...")
+        connection.add_callback_threadsafe(channel.stop_consuming)
 
-    print(" [*] Waiting for messages. To exit press CTRL+C")
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+
+    print(f" [*] [pid {os.getpid()}] Waiting for messages on {', '.join(queues)}. To exit press CTRL+C")
     try:
         channel.start_consuming()
-    except KeyboardInterrupt:
-        print("Interrupted")
-        channel.stop_consuming()
     finally:
-        connection.close()
+        if connection.is_open:
+            connection.close()
+        print(f"👋 [pid {os.getpid()}] Worker stopped")
+
+
+def process_stt_batch(channel, batch):
+    """Transcribe a batch of stt_processing messages in one Whisper pass and ack each one"""
+    app = get_worker_app()
+    backend = get_stt_backend()
+    queue = 'stt_processing'
+    stage = stt_job_stage()
+    fused = stage == 'pipeline'
+    process = run_fused_pipeline if fused else process_audio_to_text
+    items = []  # (method, body, message_id, answer_id, attempt, cache_key, audio)
+
+    def finish(method, body, message_id, answer_id, attempt, error=None):
+        try:
+            finish_job_message(channel, method, queue, body, message_id, answer_id, stage, attempt, error)
+        except Exception as e:
+            print(f"❌ Error finishing STT job for answer {answer_id}: {e}")
+            traceback.print_exc()
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+
+    for method, properties, body in batch:
+        message_id = properties.message_id
+        try:
+            answer_id = json.loads(body).get('answer_id')
+        except (ValueError, AttributeError) as e:
+            print(f"❌ Invalid message on {queue}: {e}")
+            retry_or_dead_letter(channel, queue, body, message_id, attempt=None)
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            continue
+        if not answer_id:
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            continue
+
+        try:
+            with app.app_context():
+                attempt = begin_job(answer_id, stage, message_id)
+        except Exception as e:
+            print(f"❌ Could not start STT job for answer {answer_id}: {e}")
+            traceback.print_exc()
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            continue
+        if attempt is None:
+            print(f"⏭️ {stage} for answer {answer_id} already done or in progress, skipping")
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            continue
+
+        try:
+            with app.app_context():
+                answer = Answer.query.get(answer_id)
+                if not check_audio_file(answer, answer_id):
+                    finish(method, body, message_id, answer_id, attempt, "audio file not available")
+                    continue
+                audio_path = answer.audio_file_path
+
+                cache_key = answer_cache_key(answer, backend)
+                cached = get_cached_transcript(cache_key)
+                if cached and not fused:
+                    print(f"⚡ Transcript cache hit for answer {answer_id}")
+                    saved = save_transcript(answer, cached['raw'], polished_text=cached['polished'])
+                    finish(method, body, message_id, answer_id, attempt,
+                           None if saved else "saving cached transcript failed")
+                    continue
+
+            if cached or load_partial(audio_path) is not None \
+                    or (fused and 'raw' in load_checkpoint(audio_path)):
+                # Transkrip sudah ada (cache / parsial / checkpoint); tidak perlu ikut batch
+                saved = process(answer_id)
+                finish(method, body, message_id, answer_id, attempt, None if saved else f"{stage} processing failed")
+                continue
+
+            items.append((method, body, message_id, answer_id, attempt, cache_key, preprocess_audio(audio_path)))
+        except Exception as e:
+            print(f"❌ Error preparing STT batch item: {e}")
+            traceback.print_exc()
+            finish(method, body, message_id, answer_id, attempt, f"{type(e).__name__}: {e}")
+
+    if not items:
+        return
+
+    print(f"🔄 Running batched transcription for {len(items)} answer(s)...")
+    try:
+        results = backend.transcribe_batch([item[-1] for item in items])
+        metrics.increment('stt.transcriptions', len(items))
+    except Exception as e:
+        print(f"❌ Batched transcription failed: {e}")
+        traceback.print_exc()
+        for method, body, message_id, answer_id, attempt, _, _ in items:
+            finish(method, body, message_id, answer_id, attempt, f"{type(e).__name__}: {e}")
+        return
+
+    for (method, body, message_id, answer_id, attempt, cache_key, _), result in zip(items, results):
+        transcript_text = result['text']
+        if fused:
+            saved = run_fused_pipeline(answer_id, transcript_text)
+            finish(method, body, message_id, answer_id, attempt, None if saved else "pipeline failed")
+            continue
+        error = None
+        try:
+            with app.app_context():
+                answer = Answer.query.get(answer_id)
+                if answer and save_transcript(answer, transcript_text, cache_key=cache_key):
+                    print(f"✅ STT processing completed for answer {answer_id}")
+                else:
+                    error = "saving transcript failed"
+                    print(f"❌ STT processing failed for answer {answer_id}")
+        except Exception as e:
+            print(f"❌ Error saving batched transcript for answer {answer_id}: {e}")
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+        finish(method, body, message_id, answer_id, attempt, error)
+
+    metrics.log_summary(prefix="[stt-batch] ")
+
+
+def run_batch_stt_worker(batch_size=None, max_wait_ms=None, torch_threads=None):
+    """STT worker that collects up to batch_size messages (or waits max_wait_ms) per Whisper pass"""
+    batch_size = batch_size or Config.STT_BATCH_SIZE
+    max_wait = (Config.STT_BATCH_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+    _prepare_worker(['stt_processing', 'stt_incremental'], torch_threads)
+
+    connection = pika.BlockingConnection(_connection_parameters())
+    channel = connection.channel()
+    declare_job_queues(channel, 'stt_processing')
+    channel.queue_declare(queue='stt_incremental', durable=True)
+
+    # Prefetch = ukuran batch, jadi buffer tidak pernah lebih dari satu batch
+    channel.basic_qos(prefetch_count=batch_size)
+    buffer = []
+    channel.basic_consume(queue='stt_processing',
+                          on_message_callback=lambda ch, method, props, body: buffer.append((method, props, body)))
+    channel.basic_consume(queue='stt_incremental', on_message_callback=callback_stt_incremental)
+
+    stopping = []
+
+    def handle_shutdown(signum, frame):
+        print(f"🛑 Signal {signum} received, stopping after current batch...")
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+
+    print(f" [*] [pid {os.getpid()}] Batch STT worker (batch={batch_size}, wait={max_wait * 1000:.0f}ms). "
+          f"To exit press CTRL+C")
+    try:
+        while not stopping:
+            connection.process_data_events(time_limit=1)
+            if not buffer:
+                continue
+
+            deadline = time.monotonic() + max_wait
+            while len(buffer) < batch_size and not stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                connection.process_data_events(time_limit=remaining)
+
+            batch = buffer[:batch_size]
+            del buffer[:batch_size]
+            process_stt_batch(channel, batch)
+    finally:
+        # Pesan di buffer yang belum diproses otomatis di-requeue broker saat koneksi ditutup
+        if connection.is_open:
+            connection.close()
+        print(f"👋 [pid {os.getpid()}] Batch STT worker stopped")
+
+
+def main():
+    run_worker(list(QUEUE_CALLBACKS))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,6 +4,8 @@ from .role import Role
 from .answer import Answer
 from .session import InterviewSession
 from .question import Question
+from .processing_job import ProcessingJob
+from .score_rollup import ScoreRollup
 
 
-__all__ = ['User', 'Role', 'Question', 'InterviewSession', 'Answer']
\ No newline at end of file
+__all__ = ['User', 'Role', 'Question', 'InterviewSession', 'Answer', 'ProcessingJob', 'ScoreRollup']
\ No newline at end of file
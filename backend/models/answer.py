@@ -5,17 +5,23 @@ from extensions import db
 
 class Answer(db.Model):
     __tablename__ = 'answers'
+    __table_args__ = (
+        # Listing riwayat: jawaban per sesi urut waktu
+        db.Index('ix_answers_session_id_created_at', 'session_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('interview_sessions.id'), nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
     audio_file_path = db.Column(db.String(255))
+    audio_sha256 = db.Column(db.String(64), index=True)  # hash konten, key cache transkrip
     transcript_text = db.Column(db.Text)
     summary = db.Column(db.Text)
     feedback = db.Column(db.Text)
     clarity_score = db.Column(db.Integer)  # 1-10
     confidence_score = db.Column(db.Integer)  # 1-10
     structure_score = db.Column(db.Integer)  # 1-10
+    keyword_score = db.Column(db.Integer)  # 1-10
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -30,5 +36,6 @@ class Answer(db.Model):
             'clarity_score': self.clarity_score,
             'confidence_score': self.confidence_score,
             'structure_score': self.structure_score,
+            'keyword_score': self.keyword_score,
             'created_at': self.created_at.isoformat()
         }
\ No newline at end of file
@@ -0,0 +1,35 @@
+from datetime import datetime
+from extensions import db
+
+
+class ProcessingJob(db.Model):
+    __tablename__ = 'processing_jobs'
+    __table_args__ = (
+        db.UniqueConstraint('answer_id', 'stage', name='uq_processing_jobs_answer_stage'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    answer_id = db.Column(db.Integer, db.ForeignKey('answers.id'), nullable=False)
+    stage = db.Column(db.String(30), nullable=False)  # stt, feedback, pipeline (mode fused)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed, dead
+    message_id = db.Column(db.String(64), index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'answer_id': self.answer_id,
+            'stage': self.stage,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_ms': self.duration_ms
+        }
@@ -0,0 +1,51 @@
+from datetime import datetime
+from extensions import db
+
+ROLLUP_SCORES = ('clarity', 'structure', 'keyword', 'confidence')
+
+
+class ScoreRollup(db.Model):
+    """Skor jawaban yang sudah dinilai, diagregasi per user, role dan hari (UTC)"""
+    __tablename__ = 'score_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'role_id', 'day', name='uq_score_rollups_user_role_day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    role_id = db.Column(db.Integer, db.ForeignKey('roles.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    answers_count = db.Column(db.Integer, nullable=False, default=0)  # jawaban yang sudah punya feedback
+    # Sesi yang dimulai hari itu dan punya jawaban ber-feedback; tiap sesi hanya masuk satu bucket
+    sessions_count = db.Column(db.Integer, nullable=False, default=0)
+    # Per skor: jumlah nilai non-NULL, total, min, max
+    clarity_count = db.Column(db.Integer, nullable=False, default=0)
+    clarity_sum = db.Column(db.Integer, nullable=False, default=0)
+    clarity_min = db.Column(db.Integer)
+    clarity_max = db.Column(db.Integer)
+    structure_count = db.Column(db.Integer, nullable=False, default=0)
+    structure_sum = db.Column(db.Integer, nullable=False, default=0)
+    structure_min = db.Column(db.Integer)
+    structure_max = db.Column(db.Integer)
+    keyword_count = db.Column(db.Integer, nullable=False, default=0)
+    keyword_sum = db.Column(db.Integer, nullable=False, default=0)
+    keyword_min = db.Column(db.Integer)
+    keyword_max = db.Column(db.Integer)
+    confidence_count = db.Column(db.Integer, nullable=False, default=0)
+    confidence_sum = db.Column(db.Integer, nullable=False, default=0)
+    confidence_min = db.Column(db.Integer)
+    confidence_max = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        data = {
+            'user_id': self.user_id,
+            'role_id': self.role_id,
+            'day': self.day.isoformat(),
+            'answers_count': self.answers_count,
+            'sessions_count': self.sessions_count,
+        }
+        for score in ROLLUP_SCORES:
+            for stat in ('count', 'sum', 'min', 'max'):
+                data[f'{score}_{stat}'] = getattr(self, f'{score}_{stat}')
+        return data
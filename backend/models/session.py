@@ -8,11 +8,12 @@ class InterviewSession(db.Model):
     __tablename__ = 'interview_sessions'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     role_id = db.Column(db.Integer, db.ForeignKey('roles.id'), nullable=False)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
     status = db.Column(db.String(20), default='active')  # active, completed, cancelled
+    feedback_summary = db.Column(db.Text)  # ringkasan performa satu sesi (FEEDBACK_BATCH_MODE=session)
     
     # Relationships
     answers = db.relationship('Answer', backref='session', lazy=True)
@@ -24,5 +25,6 @@ class InterviewSession(db.Model):
             'role_id': self.role_id,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'status': self.status
+            'status': self.status,
+            'feedback_summary': self.feedback_summary
         }
\ No newline at end of file
@@ -1,53 +1,172 @@
 # backend/routes/dashboard.py
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import and_, or_, func
+from datetime import datetime, timedelta
+import base64
 from models.answer import Answer
 from models.session import InterviewSession
 from models.question import Question
+from models.score_rollup import ScoreRollup, ROLLUP_SCORES
 from extensions import db
+from utils.queries import get_user_answer
+from utils.query_budget import query_budget
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+STATS_DEFAULT_DAYS = 30
+STATS_MAX_DAYS = 366
+
+
+def encode_cursor(created_at, answer_id):
+    raw = f"{created_at.isoformat()}|{answer_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (created_at, answer_id) from a cursor; raises ValueError if it is malformed"""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    created_at, answer_id = raw.split("|")
+    return datetime.fromisoformat(created_at), int(answer_id)
+
+
 @dashboard_bp.route("/history", methods=["GET"])
+@jwt_required()
+@query_budget(1)
 def get_answers_history():
+    user_id = get_jwt_identity()
+    limit = min(max(request.args.get("limit", HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
 
-    # query join ke session + question
-    answers = (
-        db.session.query(Answer, Question)
+    # Proyeksi kolom listing saja: transcript/feedback (TEXT) tidak ikut dibaca
+    query = (
+        db.session.query(
+            Answer.id,
+            Answer.created_at,
+            Question.question_text,
+            Answer.clarity_score,
+            Answer.structure_score,
+            Answer.keyword_score,
+            Answer.confidence_score,
+            Answer.transcript_text.isnot(None).label("has_transcript"),
+        )
         .join(InterviewSession, Answer.session_id == InterviewSession.id)
         .join(Question, Answer.question_id == Question.id)
-        .order_by(Answer.created_at.desc())
-        .all()
+        .filter(InterviewSession.user_id == user_id)
     )
 
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"msg": "Invalid cursor"}), 400
+        # Keyset: lanjut tepat setelah baris terakhir halaman sebelumnya, tanpa OFFSET
+        query = query.filter(or_(
+            Answer.created_at < cursor_created_at,
+            and_(Answer.created_at == cursor_created_at, Answer.id < cursor_id),
+        ))
+
+    # Ambil satu baris lebih untuk tahu masih ada halaman berikutnya
+    rows = query.order_by(Answer.created_at.desc(), Answer.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
     history = []
-    for ans, q in answers:
+    for row in rows:
         history.append({
-            "answer_id": ans.id,
-            "created_at": ans.created_at.isoformat(),
-            "question_text": q.question_text if q else "",
-            "clarity_score": ans.clarity_score,
-            "structure_score": ans.structure_score,
-            "confidence_score": ans.confidence_score,
-            "transcript_text": ans.transcript_text,
+            "answer_id": row.id,
+            "created_at": row.created_at.isoformat(),
+            "question_text": row.question_text or "",
+            "clarity_score": row.clarity_score,
+            "structure_score": row.structure_score,
+            "keyword_score": row.keyword_score,
+            "confidence_score": row.confidence_score,
+            "has_transcript": bool(row.has_transcript),
         })
 
-    return jsonify(history), 200
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return jsonify({"items": history, "next_cursor": next_cursor}), 200
+
+def _rollup_columns():
+    columns = [
+        func.sum(ScoreRollup.answers_count).label("answers_count"),
+        func.sum(ScoreRollup.sessions_count).label("sessions_count"),
+    ]
+    for score in ROLLUP_SCORES:
+        columns += [
+            func.sum(getattr(ScoreRollup, f"{score}_count")).label(f"{score}_count"),
+            func.sum(getattr(ScoreRollup, f"{score}_sum")).label(f"{score}_sum"),
+            func.min(getattr(ScoreRollup, f"{score}_min")).label(f"{score}_min"),
+            func.max(getattr(ScoreRollup, f"{score}_max")).label(f"{score}_max"),
+        ]
+    return columns
+
+
+def _score_stats(row):
+    """answers/sessions count plus avg/min/max/count per score from one aggregated rollup row"""
+    stats = {
+        "answers_count": int(row.answers_count or 0),
+        "sessions_count": int(row.sessions_count or 0),
+    }
+    for score in ROLLUP_SCORES:
+        count = int(getattr(row, f"{score}_count") or 0)
+        total = int(getattr(row, f"{score}_sum") or 0)
+        stats[score] = {
+            "count": count,
+            "avg": round(total / count, 2) if count else None,
+            "min": getattr(row, f"{score}_min"),
+            "max": getattr(row, f"{score}_max"),
+        }
+    return stats
+
+
+@dashboard_bp.route("/stats", methods=["GET"])
+@jwt_required()
+@query_budget(3)
+def get_stats():
+    """Score trends for the current user, read only from the daily rollups"""
+    user_id = get_jwt_identity()
+    days = min(max(request.args.get("days", STATS_DEFAULT_DAYS, type=int), 1), STATS_MAX_DAYS)
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+
+    query = db.session.query(*_rollup_columns()).filter(
+        ScoreRollup.user_id == user_id, ScoreRollup.day >= since)
+    role_id = request.args.get("role_id", type=int)
+    if role_id:
+        query = query.filter(ScoreRollup.role_id == role_id)
+
+    totals = query.one()
+    daily = query.add_columns(ScoreRollup.day).group_by(ScoreRollup.day).order_by(ScoreRollup.day).all()
+    by_role = query.add_columns(ScoreRollup.role_id).group_by(ScoreRollup.role_id).order_by(ScoreRollup.role_id).all()
+
+    return jsonify({
+        "since": since.isoformat(),
+        "days": days,
+        "totals": _score_stats(totals),
+        "daily": [{"day": row.day.isoformat(), **_score_stats(row)} for row in daily],
+        "by_role": [{"role_id": row.role_id, **_score_stats(row)} for row in by_role],
+    }), 200
+
 
 @dashboard_bp.route("/answers/<int:answer_id>", methods=["GET"])
+@jwt_required()
+@query_budget(1)
 def get_answer_details(answer_id):
-    ans = Answer.query.get(answer_id)
+    # Answer + session (cek pemilik) + question dalam satu query
+    ans = get_user_answer(answer_id, get_jwt_identity(), with_question=True)
     if not ans:
         return jsonify({"msg": "Answer not found"}), 404
 
-    question = Question.query.get(ans.question_id)
-    answer = Answer.query.get(answer_id)
+    question = ans.question
     details = {
         "answer_id": ans.id,
         "created_at": ans.created_at.isoformat(),
         "question_text": question.question_text if question else "",
         "clarity_score": ans.clarity_score,
         "structure_score": ans.structure_score,
+        "keyword_score": ans.keyword_score,
         "confidence_score": ans.confidence_score,
         "transcript_text": ans.transcript_text,
         "feedback": ans.feedback,
@@ -1,30 +1,101 @@
 from flask import Blueprint, request, jsonify
-import numpy as np
-import cv2
-import face_recognition
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from concurrent.futures import TimeoutError as FaceTimeout
 import base64
 
+from tasks.face_detection import get_face_pool, analyze_face, track_identity, FaceQueueFull, FACE_MODES
+from utils.face_store import get_face_store
+from utils.queries import get_user_session
+
+RETRY_AFTER_SECONDS = 2
+RAW_IMAGE_TYPES = ('image/jpeg', 'image/webp', 'image/png')
+
 face_bp = Blueprint('face', __name__)
 
+
+def read_frame():
+    """Return (image_bytes, mode) from the request; image_bytes is empty/None if no image was sent.
+
+    Accepts a raw image body (Content-Type image/jpeg, image/webp or image/png),
+    a multipart 'image' file, or the legacy JSON {"image": "<base64 data URL>"}.
+    """
+    if request.mimetype in RAW_IMAGE_TYPES:
+        # Body mentah langsung dari stream: tanpa parsing JSON dan base64
+        return request.get_data(cache=False), request.args.get('mode', 'full')
+
+    if request.mimetype == 'multipart/form-data':
+        file = request.files.get('image')
+        mode = request.form.get('mode') or request.args.get('mode', 'full')
+        return file.read() if file else None, mode
+
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode') or request.args.get('mode', 'full')
+    img_b64 = data.get('image')
+    if not img_b64:
+        return None, mode
+    return base64.b64decode(img_b64.split(',')[-1]), mode
+
+
+def _request_value(name):
+    """A parameter from the query string, multipart form or JSON body"""
+    if name in request.args:
+        return request.args[name]
+    if request.mimetype == 'multipart/form-data':
+        return request.form.get(name)
+    data = request.get_json(silent=True)
+    return data.get(name) if isinstance(data, dict) else None
+
+
+def _track_identity(img_bytes):
+    """mode=identity: compare the frame with the session's reference face (set from the first good frame)"""
+    user_id = get_jwt_identity()
+    if not user_id:
+        return jsonify({'error': 'Login required for identity mode'}), 401
+    try:
+        session_id = int(_request_value('session_id'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'session_id is required for identity mode'}), 400
+
+    store = get_face_store()
+    state = store.get(session_id)
+    if state is None:
+        # Cek pemilik sesi sekali saat state dibuat; setelahnya cukup dari state
+        if not get_user_session(session_id, user_id):
+            return jsonify({'error': 'Session not found'}), 404
+        state = {'user_id': str(user_id)}
+    elif state.get('user_id') != str(user_id):
+        return jsonify({'error': 'Session not found'}), 404
+
+    result, state = get_face_pool().run(track_identity, img_bytes, state)
+    store.set(session_id, state)
+    return jsonify(result)
+
+
 @face_bp.route('/detect-face', methods=['POST'])
+@jwt_required(optional=True)
 def detect_face():
     try:
-        data = request.json
-        img_b64 = data.get('image')
-        if not img_b64:
+        img_bytes, mode = read_frame()
+        if not img_bytes:
             return jsonify({'error': 'No image provided'}), 400
 
-        img_bytes = base64.b64decode(img_b64.split(',')[-1])
-        npimg = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
+        # presence = cek kehadiran saja (cepat, tanpa encoding); full = dengan encoding 128-d
+        if mode not in FACE_MODES:
+            return jsonify({'error': f"Unknown mode '{mode}'"}), 400
 
-        face_locations = face_recognition.face_locations(img)
-        face_encodings = face_recognition.face_encodings(img, face_locations)
+        if mode == 'identity':
+            return _track_identity(img_bytes)
 
-        response = {
-            'face_count': len(face_locations),
-            'encodings': [enc.tolist() for enc in face_encodings]
-        }
+        # Decode + HOG jalan di process pool; thread request hanya menunggu hasilnya
+        response = get_face_pool().run(analyze_face, img_bytes, mode)
         return jsonify(response)
+    except FaceQueueFull:
+        # Load shedding: lebih baik frame ini dilewati daripada API lain ikut lambat
+        return jsonify({'error': 'Face detection busy, try again later'}), 429, {
+            'Retry-After': str(RETRY_AFTER_SECONDS)}
+    except FaceTimeout:
+        return jsonify({'error': 'Face detection timed out'}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
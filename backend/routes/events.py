@@ -0,0 +1,103 @@
+from flask import Blueprint, Response, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+import time
+
+from config import Config
+from utils.queries import get_user_answer, get_user_session_with_answers
+from utils.query_budget import query_budget
+from utils.events import answer_channel, session_channel, answer_scores, get_event_relay, TERMINAL_EVENTS
+
+KEEPALIVE_SECONDS = 15
+# Dikirim saat relay nonaktif (EVENTS_BACKEND=none): client harus menutup stream, bukan reconnect
+UNAVAILABLE_EVENT = 'unavailable'
+
+events_bp = Blueprint('events', __name__)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _answer_snapshot(answer):
+    """Current state of an answer, sent first so a late subscriber never misses the result"""
+    if answer.feedback:
+        return 'feedback_done', {'answer_id': answer.id, **answer_scores(answer)}
+    if answer.transcript_text:
+        return 'transcript_ready', {'answer_id': answer.id}
+    return 'queued', {'answer_id': answer.id}
+
+
+def _stream(pubsub, snapshots, stop_on_terminal):
+    """Yield snapshot events, then relay pub/sub messages until done or timed out.
+
+    Runs after the request context is gone, so it must not touch the database.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        for event, data in snapshots:
+            yield _sse(event, data)
+        if pubsub is None:
+            last_event = snapshots[-1][0] if snapshots else None
+            if not (stop_on_terminal and last_event in TERMINAL_EVENTS):
+                yield _sse(UNAVAILABLE_EVENT, {})
+            return
+
+        deadline = time.monotonic() + Config.EVENTS_STREAM_TIMEOUT
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=KEEPALIVE_SECONDS)
+            if message is None:
+                # Komentar SSE: menjaga koneksi tetap hidup dan mendeteksi client yang sudah pergi
+                yield ": keepalive\n\n"
+                continue
+            data = json.loads(message['data'])
+            yield _sse(data['event'], data)
+            if stop_on_terminal and data['event'] in TERMINAL_EVENTS:
+                break
+    finally:
+        if pubsub is not None:
+            pubsub.close()
+
+
+def _sse_response(stream):
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # nginx: jangan buffer stream
+    })
+
+
+# EventSource tidak bisa mengirim header Authorization, jadi token juga boleh lewat ?jwt=
+@events_bp.route('/answers/<int:answer_id>', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+@query_budget(1)
+def answer_events(answer_id):
+    # Subscribe sebelum load jawaban: event yang terbit di antaranya tidak hilang
+    pubsub = get_event_relay().subscribe([answer_channel(answer_id)])
+    answer = get_user_answer(answer_id, get_jwt_identity())
+    if not answer or answer.feedback:
+        # Tidak ada yang perlu ditunggu: 404, atau snapshot sudah feedback_done
+        if pubsub is not None:
+            pubsub.close()
+            pubsub = None
+        if not answer:
+            return jsonify({'message': 'Answer not found'}), 404
+
+    event, data = _answer_snapshot(answer)
+    return _sse_response(_stream(pubsub, [(event, data)], stop_on_terminal=True))
+
+
+@events_bp.route('/sessions/<int:session_id>', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+@query_budget(2)
+def session_events(session_id):
+    # Subscribe sebelum load jawaban: event yang terbit di antaranya tidak hilang
+    pubsub = get_event_relay().subscribe([session_channel(session_id)])
+    session = get_user_session_with_answers(session_id, get_jwt_identity())
+    if not session:
+        if pubsub is not None:
+            pubsub.close()
+        return jsonify({'message': 'Session not found'}), 404
+
+    answers = sorted(session.answers, key=lambda answer: answer.id)
+    snapshots = [_answer_snapshot(answer) for answer in answers]
+    return _sse_response(_stream(pubsub, snapshots, stop_on_terminal=False))
@@ -5,21 +5,45 @@ import os
 import uuid
 import json
 import time
+from datetime import datetime
 
+from config import Config
 from extensions import db
 from models.users import User
 from models.role import Role
 from models.question import Question
 from models.session import InterviewSession
 from models.answer import Answer
-from utils.rabbitmq_handler import rabbitmq_handler
+from utils.rabbitmq_handler import rabbitmq_handler, publish_session_feedback, MessageUnconfirmed
+from tasks.incremental_stt import init_partial, partial_lock, upload_lock
+from utils.audio import save_stream_with_hash, file_sha256
+from utils.catalog_cache import get_catalog_cache, questions_key, ROLES_KEY
+from utils.queries import get_user_session, get_user_answer
+from utils.face_store import get_face_store
+from utils.query_budget import query_budget
+
+UPLOAD_BLOCK_SIZE = 64 * 1024
 
 interview_bp = Blueprint('interview', __name__)
 
+def _catalog_response(body, etag):
+    """JSON response from the catalog cache, or 304 if the client already has this version"""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'  # selalu revalidasi via ETag
+    return response
+
+def _load_roles():
+    return [role.to_dict() for role in Role.query.order_by(Role.id).all()]
+
 @interview_bp.route('/roles', methods=['GET'])
+@query_budget(1)
 def get_roles():
-    roles = Role.query.all()
-    return jsonify([role.to_dict() for role in roles]), 200
+    body, etag = get_catalog_cache().get_or_load(ROLES_KEY, _load_roles)
+    return _catalog_response(body, etag)
 
 @interview_bp.route('/start-session', methods=['POST'])
 @jwt_required()
@@ -51,18 +75,26 @@ def start_session():
 
 @interview_bp.route('/questions/<int:session_id>', methods=['GET'])
 @jwt_required()
+@query_budget(2)
 def get_questions(session_id):
     user_id = get_jwt_identity()
     
     # Verify session belongs to user
-    session = InterviewSession.query.filter_by(id=session_id, user_id=user_id).first()
-    if not session:
+    role_id = get_catalog_cache().session_role(session_id, user_id, lambda: _get_session_role(session_id, user_id))
+    if role_id is None:
         return jsonify({'message': 'Session not found'}), 404
     
     # Get questions for the role
-    questions = Question.query.filter_by(role_id=session.role_id).all()
-    
-    return jsonify([q.to_dict() for q in questions]), 200
+    body, etag = get_catalog_cache().get_or_load(questions_key(role_id), lambda: _load_questions(role_id))
+    return _catalog_response(body, etag)
+
+def _get_session_role(session_id, user_id):
+    session = get_user_session(session_id, user_id)
+    return session.role_id if session else None
+
+def _load_questions(role_id):
+    questions = Question.query.filter_by(role_id=role_id).order_by(Question.id).all()
+    return [q.to_dict() for q in questions]
 
 @interview_bp.route('/upload-answer', methods=['POST'])
 @jwt_required()
@@ -80,7 +112,7 @@ def upload_answer():
         return jsonify({'message': 'Session ID and Question ID are required'}), 400
     
     # Verify session belongs to user
-    session = InterviewSession.query.filter_by(id=session_id, user_id=user_id).first()
+    session = get_user_session(session_id, user_id)
     if not session:
         return jsonify({'message': 'Invalid session'}), 400
     
@@ -88,12 +120,14 @@ def upload_answer():
 
     filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
     file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
+    # Hash dihitung sambil menulis file, dipakai sebagai key cache transkrip
+    audio_sha256 = save_stream_with_hash(file.stream, file_path)
     
     answer = Answer(
         session_id=session_id,
         question_id=question_id,
-        audio_file_path=file_path
+        audio_file_path=file_path,
+        audio_sha256=audio_sha256
     )
     print (answer)
     db.session.add(answer)
@@ -106,9 +140,18 @@ def upload_answer():
             'timestamp': int(time.time())
         }
         
-        rabbitmq_handler.publish_message('stt_processing', message)
+        # Tunggu confirm broker: pesan yang tidak sampai harus tetap dibalas 500
+        rabbitmq_handler.publish_message('stt_processing', message, wait_for_confirm=True,
+                                         timeout=Config.RABBITMQ_CONFIRM_TIMEOUT)
         print(f"STT processing triggered for answer {answer.id}")
         
+    except MessageUnconfirmed as e:
+        # Pesan sudah sampai ke broker tapi belum di-confirm: jangan minta client upload ulang
+        print(f"STT processing pending for answer {answer.id}: {e}")
+        return jsonify({
+            'answer_id': answer.id,
+            'message': 'Audio uploaded. Processing is pending.'
+        }), 202
     except Exception as e:
         print(f"Error triggering STT processing: {e}")
         return jsonify({'message': 'Failed to trigger processing'}), 500
@@ -119,17 +162,174 @@ def upload_answer():
     }), 201
 
 
+@interview_bp.route('/upload/start', methods=['POST'])
+@jwt_required()
+def start_chunked_upload():
+    """Create the answer row and an empty media file that chunks are appended to"""
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+
+    session_id = data.get('session_id')
+    question_id = data.get('question_id')
+    if not session_id or not question_id:
+        return jsonify({'message': 'Session ID and Question ID are required'}), 400
+
+    session = get_user_session(session_id, user_id)
+    if not session:
+        return jsonify({'message': 'Invalid session'}), 400
+
+    filename = f"{uuid.uuid4()}_{secure_filename(data.get('filename') or 'recording.webm')}"
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    open(file_path, 'wb').close()
+    init_partial(file_path)
+
+    answer = Answer(
+        session_id=session_id,
+        question_id=question_id,
+        audio_file_path=file_path
+    )
+    db.session.add(answer)
+    db.session.commit()
+
+    return jsonify({'answer_id': answer.id, 'offset': 0}), 201
+
+def _upload_finished(answer):
+    # audio_sha256 baru diisi saat upload selesai (single-shot atau /finish)
+    return answer.audio_sha256 is not None or answer.transcript_text is not None
+
+@interview_bp.route('/upload/<int:answer_id>/chunk', methods=['POST'])
+@jwt_required()
+def append_upload_chunk(answer_id):
+    """Append one chunk (raw body or multipart 'chunk') at the given byte offset"""
+    user_id = get_jwt_identity()
+    answer = get_user_answer(answer_id, user_id)
+    if not answer:
+        return jsonify({'message': 'Answer not found'}), 404
+
+    file_path = answer.audio_file_path
+    # Cek offset + tulis di bawah lock: dua request dengan offset sama tidak boleh menulis bersamaan
+    with upload_lock(file_path):
+        # Dibaca ulang di dalam lock: finish bisa saja commit setelah answer dimuat
+        db.session.refresh(answer)
+        if _upload_finished(answer):
+            return jsonify({'message': 'Upload already finished'}), 409
+
+        current_size = os.path.getsize(file_path)
+        offset = request.args.get('offset', type=int)
+        if offset == 0 and current_size:
+            # Client mengirim ulang rekaman dari awal (chunk sebelumnya gagal): file dan transkripsi bertahap dimulai ulang
+            with partial_lock(file_path):
+                open(file_path, 'wb').close()
+                init_partial(file_path)
+            current_size = 0
+        elif offset is not None and offset != current_size:
+            # Chunk duplikat / hilang: client harus lanjut dari offset yang benar
+            return jsonify({'message': 'Offset mismatch', 'offset': current_size}), 409
+
+        max_size = current_app.config['MAX_CONTENT_LENGTH']
+        if current_size + (request.content_length or 0) > max_size:
+            return jsonify({'message': 'Recording too large', 'offset': current_size}), 413
+
+        chunk = request.files.get('chunk')
+        stream = chunk.stream if chunk else request.stream
+        written = 0
+        with open(file_path, 'ab') as f:
+            while True:
+                block = stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                f.write(block)
+                written += len(block)
+        new_size = current_size + written
+
+    # Transkripsi bertahap tiap kali file melewati kelipatan STT_INCREMENTAL_STEP_BYTES
+    step = current_app.config['STT_INCREMENTAL_STEP_BYTES']
+    if written and new_size // step > current_size // step:
+        try:
+            rabbitmq_handler.publish_message('stt_incremental', {
+                'answer_id': answer.id,
+                'size': new_size,
+                'timestamp': int(time.time())
+            })
+        except Exception as e:
+            print(f"Error triggering incremental STT: {e}")
+
+    return jsonify({'answer_id': answer.id, 'offset': new_size}), 200
+
+@interview_bp.route('/upload/<int:answer_id>/finish', methods=['POST'])
+@jwt_required()
+def finish_chunked_upload(answer_id):
+    user_id = get_jwt_identity()
+    answer = get_user_answer(answer_id, user_id)
+    if not answer:
+        return jsonify({'message': 'Answer not found'}), 404
+
+    with upload_lock(answer.audio_file_path):
+        db.session.refresh(answer)
+        if _upload_finished(answer):
+            # Job STT untuk answer ini sudah ada; finish kedua tidak akan ditranskrip lagi
+            return jsonify({'message': 'Upload already finished'}), 409
+
+        if os.path.getsize(answer.audio_file_path) == 0:
+            return jsonify({'message': 'No media uploaded'}), 400
+
+        # Chunk datang di request terpisah, jadi hash dihitung sekali saat finish (sekaligus menandai selesai)
+        answer.audio_sha256 = file_sha256(answer.audio_file_path)
+        db.session.commit()
+
+    try:
+        message = {
+            'answer_id': answer.id,
+            'timestamp': int(time.time())
+        }
+        # Tunggu confirm broker: pesan yang tidak sampai harus tetap dibalas 500
+        rabbitmq_handler.publish_message('stt_processing', message, wait_for_confirm=True,
+                                         timeout=Config.RABBITMQ_CONFIRM_TIMEOUT)
+        print(f"STT processing triggered for answer {answer.id}")
+    except MessageUnconfirmed as e:
+        print(f"STT processing pending for answer {answer.id}: {e}")
+        return jsonify({
+            'answer_id': answer.id,
+            'message': 'Upload finished. Processing is pending.'
+        }), 202
+    except Exception as e:
+        print(f"Error triggering STT processing: {e}")
+        # Pesan pasti tidak terkirim: buka lagi status upload supaya client bisa mengulang finish
+        answer.audio_sha256 = None
+        db.session.commit()
+        return jsonify({'message': 'Failed to trigger processing'}), 500
+
+    return jsonify({
+        'answer_id': answer.id,
+        'message': 'Upload finished. Processing started.'
+    }), 200
+
+
 @interview_bp.route('/session-complete',methods =['DELETE'])
 @jwt_required()
 def complete_session():
     user_id = get_jwt_identity()
     data = request.get_json()
     session_id = data.get('session_id')
-    delete_session = InterviewSession.query.filter_by(id=session_id,user_id=user_id).first()
-    if not delete_session:
+    session = get_user_session(session_id, user_id)
+    if not session:
         return jsonify({'message': 'Session not found'}), 404
 
-    db.session.delete(delete_session)
+    # Sesi ditandai selesai (bukan dihapus) supaya jawaban + feedback-nya tetap ada
+    session.status = 'completed'
+    session.completed_at = datetime.utcnow()
     db.session.commit()
 
+    try:
+        get_face_store().delete(session.id)
+    except Exception as e:
+        print(f"Error clearing face reference: {e}")
+
+    if Config.FEEDBACK_BATCH_MODE == 'session':
+        try:
+            publish_session_feedback(session.id, force=True, timeout=Config.RABBITMQ_CONFIRM_TIMEOUT)
+            print(f"Session feedback triggered for session {session.id}")
+        except Exception as e:
+            print(f"Error triggering session feedback: {e}")
+
     return jsonify({'message': 'Session completed successfully'}), 200
@@ -0,0 +1,187 @@
+"""Supervisor untuk worker pool consumer.
+
+Menjalankan N proses STT (masing-masing dengan koneksi RabbitMQ dan model
+Whisper sendiri) dan M proses feedback_analysis yang terpisah, me-restart
+proses yang crash, dan mematikan semuanya dengan rapi saat SIGTERM/SIGINT.
+
+    python supervisor.py --stt-workers 16 --feedback-workers 2
+
+Worker feedback default-nya async_consumer (feedback_analysis + session_feedback,
+banyak completion in-flight per proses); --feedback-mode sync memakai
+consumer.run_worker seperti sebelumnya.
+
+Untuk deployment kecil, --pipeline fused membuat worker STT langsung
+menjalankan polish + feedback tanpa lewat queue feedback_analysis:
+
+    python supervisor.py --stt-workers 2 --feedback-workers 0 --pipeline fused
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+
+from config import Config
+
+RESTART_BACKOFF_MIN = 1
+RESTART_BACKOFF_MAX = 60
+SHUTDOWN_TIMEOUT = 120  # detik; transkripsi yang sedang jalan diberi waktu selesai
+
+
+def _worker_entry(queues, torch_threads, batch_size=1, batch_wait_ms=None):
+    # Import di dalam proses anak supaya torch/whisper tidak di-load di supervisor
+    import consumer
+    if batch_size > 1 and 'stt_processing' in queues:
+        consumer.run_batch_stt_worker(batch_size, batch_wait_ms, torch_threads=torch_threads)
+    else:
+        consumer.run_worker(queues, torch_threads=torch_threads)
+
+
+def _async_feedback_entry(concurrency):
+    import asyncio
+    import async_consumer
+    asyncio.run(async_consumer.main_async(concurrency))
+
+
+class WorkerSlot:
+    """One supervised worker process and its restart state"""
+
+    def __init__(self, name, queues, torch_threads=None, batch_size=1, batch_wait_ms=None,
+                 async_concurrency=None):
+        self.name = name
+        self.queues = queues
+        self.async_concurrency = async_concurrency
+        self.torch_threads = torch_threads
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self.process = None
+        self.backoff = RESTART_BACKOFF_MIN
+        self.next_start_at = 0
+        self.started_at = 0
+
+    def start(self, ctx):
+        if self.async_concurrency:
+            target, args = _async_feedback_entry, (self.async_concurrency,)
+        else:
+            target, args = _worker_entry, (self.queues, self.torch_threads, self.batch_size, self.batch_wait_ms)
+        self.process = ctx.Process(target=target, args=args, name=self.name)
+        self.process.start()
+        self.started_at = time.monotonic()
+        print(f"🚀 Started {self.name} (pid {self.process.pid}) on {', '.join(self.queues)}")
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class Supervisor:
+    def __init__(self, stt_workers, feedback_workers, torch_threads=None,
+                 batch_size=1, batch_wait_ms=None, feedback_mode='async', feedback_concurrency=None):
+        # spawn, bukan fork: torch tidak aman di-fork setelah thread pool-nya aktif
+        self.ctx = multiprocessing.get_context('spawn')
+        self.shutting_down = False
+        cores = os.cpu_count() or 1
+        if stt_workers and not torch_threads:
+            torch_threads = max(1, cores // stt_workers)
+
+        self.slots = []
+        for i in range(stt_workers):
+            self.slots.append(WorkerSlot(f"stt-{i}", ['stt_processing', 'stt_incremental'],
+                                         torch_threads, batch_size, batch_wait_ms))
+        if feedback_mode == 'async':
+            feedback_concurrency = feedback_concurrency or Config.FEEDBACK_CONCURRENCY
+        else:
+            feedback_concurrency = None
+        for i in range(feedback_workers):
+            self.slots.append(WorkerSlot(f"feedback-{i}", ['feedback_analysis', 'session_feedback'],
+                                         async_concurrency=feedback_concurrency))
+
+        print(f"🧮 {cores} cores: {stt_workers} STT worker(s) x {torch_threads} torch thread(s), "
+              f"{feedback_workers} {feedback_mode} feedback worker(s), STT batch size {batch_size}, "
+              f"pipeline mode {os.getenv('PIPELINE_MODE', Config.PIPELINE_MODE)}")
+
+    def _handle_signal(self, signum, frame):
+        print(f"🛑 Supervisor received signal {signum}, shutting down workers...")
+        self.shutting_down = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        for slot in self.slots:
+            slot.start(self.ctx)
+
+        while not self.shutting_down:
+            self._check_workers()
+            time.sleep(1)
+
+        self.shutdown()
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for slot in self.slots:
+            if slot.is_alive():
+                # Jalan stabil cukup lama -> reset backoff
+                if now - slot.started_at > RESTART_BACKOFF_MAX:
+                    slot.backoff = RESTART_BACKOFF_MIN
+                continue
+
+            if slot.process is not None:
+                print(f"💥 {slot.name} (pid {slot.process.pid}) exited with code "
+                      f"{slot.process.exitcode}, restarting in {slot.backoff}s")
+                slot.process.join()
+                slot.process = None
+                slot.next_start_at = now + slot.backoff
+                slot.backoff = min(slot.backoff * 2, RESTART_BACKOFF_MAX)
+
+            if now >= slot.next_start_at:
+                slot.start(self.ctx)
+
+    def shutdown(self):
+        for slot in self.slots:
+            if slot.is_alive():
+                slot.process.terminate()  # SIGTERM -> worker selesai pesan aktif lalu berhenti
+
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for slot in self.slots:
+            if slot.process is None:
+                continue
+            slot.process.join(max(0, deadline - time.monotonic()))
+            if slot.process.is_alive():
+                print(f"⚠️ {slot.name} did not stop in time, killing")
+                slot.process.kill()
+                slot.process.join()
+        print("👋 All workers stopped")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run STT and feedback consumer pools")
+    parser.add_argument('--stt-workers', type=int, default=Config.STT_WORKERS,
+                        help="number of STT processes (default: STT_WORKERS or CPU count)")
+    parser.add_argument('--feedback-workers', type=int, default=Config.FEEDBACK_WORKERS,
+                        help="number of feedback_analysis processes")
+    parser.add_argument('--feedback-mode', choices=('async', 'sync'), default=Config.FEEDBACK_WORKER_MODE,
+                        help="async: asyncio consumer with many completions in flight per process")
+    parser.add_argument('--feedback-concurrency', type=int, default=Config.FEEDBACK_CONCURRENCY,
+                        help="completions in flight per async feedback process")
+    parser.add_argument('--torch-threads', type=int, default=Config.STT_TORCH_THREADS,
+                        help="torch threads per STT process (default: cores / stt-workers)")
+    parser.add_argument('--stt-batch-size', type=int, default=Config.STT_BATCH_SIZE,
+                        help="answers per Whisper pass; >1 enables batching mode")
+    parser.add_argument('--stt-batch-wait-ms', type=int, default=Config.STT_BATCH_WAIT_MS,
+                        help="max time to wait for a batch to fill")
+    parser.add_argument('--pipeline', choices=('queued', 'fused'), default=Config.PIPELINE_MODE,
+                        help="fused: STT workers also run polish + feedback in-process")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Proses anak (spawn) membaca Config dari environment
+    os.environ['PIPELINE_MODE'] = args.pipeline
+    Supervisor(args.stt_workers, args.feedback_workers, args.torch_threads,
+               args.stt_batch_size, args.stt_batch_wait_ms,
+               args.feedback_mode, args.feedback_concurrency).run()
+
+
+if __name__ == '__main__':
+    main()
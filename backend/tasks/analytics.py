@@ -0,0 +1,214 @@
+"""Rollup skor per user, role dan hari untuk /api/dashboard/stats.
+
+Setiap kali feedback tersimpan, bucket (user, role, hari) milik jawaban itu
+dihitung ulang dari jawaban di bucket tersebut saja (paling banyak jawaban
+satu user dalam sehari). Jumlah sesi dihitung di bucket hari sesi dimulai,
+jadi sesi yang jawabannya tersebar di beberapa hari tetap terhitung sekali. Dihitung ulang, bukan ditambah, supaya update-nya
+idempoten: pesan yang di-redeliver atau feedback yang dinilai ulang tidak
+terhitung dua kali, dan min/max tetap benar.
+
+Backfill untuk jawaban yang sudah ada:
+    python -m tasks.analytics backfill [--since 2026-01-01]
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.answer import Answer
+from models.session import InterviewSession
+from models.score_rollup import ScoreRollup, ROLLUP_SCORES
+
+BACKFILL_COMMIT_EVERY = 500
+
+
+def _aggregate_columns():
+    columns = [func.count(Answer.id).label('answers_count')]
+    for score in ROLLUP_SCORES:
+        column = getattr(Answer, f'{score}_score')
+        columns += [
+            func.count(column).label(f'{score}_count'),
+            func.coalesce(func.sum(column), 0).label(f'{score}_sum'),
+            func.min(column).label(f'{score}_min'),
+            func.max(column).label(f'{score}_max'),
+        ]
+    return columns
+
+
+def _session_columns():
+    return [func.count(func.distinct(InterviewSession.id)).label('sessions_count')]
+
+
+def _scored_answers(*columns):
+    return (
+        db.session.query(*columns)
+        .select_from(Answer)
+        .join(InterviewSession, Answer.session_id == InterviewSession.id)
+        .filter(Answer.feedback.isnot(None))
+    )
+
+
+def _apply_aggregate(rollup, row):
+    for key, value in row._mapping.items():
+        if key in ('user_id', 'role_id', 'day'):
+            continue
+        # SUM di MySQL mengembalikan Decimal
+        setattr(rollup, key, int(value) if value is not None else None)
+
+
+def _empty_rollup(user_id, role_id, day):
+    rollup = ScoreRollup(user_id=user_id, role_id=role_id, day=day, answers_count=0, sessions_count=0)
+    for score in ROLLUP_SCORES:
+        setattr(rollup, f'{score}_count', 0)
+        setattr(rollup, f'{score}_sum', 0)
+    return rollup
+
+
+def _lock_bucket(user_id, role_id, day):
+    """Return the bucket row, created if missing, locked until commit"""
+    query = ScoreRollup.query.filter_by(user_id=user_id, role_id=role_id, day=day).with_for_update()
+    rollup = query.first()
+    if rollup is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(_empty_rollup(user_id, role_id, day))
+        except IntegrityError:
+            pass  # dibuat worker lain di saat yang sama
+        rollup = query.first()
+    return rollup
+
+
+def _refresh_bucket(user_id, role_id, day):
+    # Lock dulu baru agregasi: worker lain yang mengubah bucket yang sama menunggu,
+    # dan snapshot agregasi diambil setelah commit mereka
+    rollup = _lock_bucket(user_id, role_id, day)
+    start = datetime.combine(day, datetime.min.time())
+    row = (
+        _scored_answers(*_aggregate_columns())
+        .filter(InterviewSession.user_id == user_id,
+                InterviewSession.role_id == role_id,
+                Answer.created_at >= start,
+                Answer.created_at < start + timedelta(days=1))
+        .one()
+    )
+    _apply_aggregate(rollup, row)
+    sessions = (
+        _scored_answers(*_session_columns())
+        .filter(InterviewSession.user_id == user_id,
+                InterviewSession.role_id == role_id,
+                InterviewSession.started_at >= start,
+                InterviewSession.started_at < start + timedelta(days=1))
+        .one()
+    )
+    _apply_aggregate(rollup, sessions)
+
+
+def update_score_rollups(answer_ids):
+    """Recompute the rollup buckets of answers whose feedback was just committed.
+
+    Runs in its own transaction; a failure is logged, never raised, because
+    the rollups can always be rebuilt with the backfill command.
+    """
+    try:
+        rows = (
+            db.session.query(InterviewSession.user_id, InterviewSession.role_id,
+                             Answer.created_at, InterviewSession.started_at)
+            .join(Answer, Answer.session_id == InterviewSession.id)
+            .filter(Answer.id.in_(list(answer_ids)))
+            .all()
+        )
+        # Bucket hari jawaban (skor) dan bucket hari sesi dimulai (jumlah sesi)
+        buckets = set()
+        for user_id, role_id, created_at, started_at in rows:
+            buckets.add((user_id, role_id, created_at.date()))
+            if started_at is not None:
+                buckets.add((user_id, role_id, started_at.date()))
+        # Urutan lock tetap supaya dua worker tidak saling deadlock
+        for user_id, role_id, day in sorted(buckets):
+            _refresh_bucket(user_id, role_id, day)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Score rollup update failed for answers {list(answer_ids)}: {e}")
+
+
+def _grouped_by_day(day_source, columns, since=None):
+    day_column = func.date(day_source)
+    query = (
+        _scored_answers(InterviewSession.user_id, InterviewSession.role_id, day_column.label('day'), *columns)
+        .group_by(InterviewSession.user_id, InterviewSession.role_id, day_column)
+    )
+    if since:
+        query = query.filter(day_source >= datetime.combine(since, datetime.min.time()))
+    return query
+
+
+def _reset_rollup(rollup):
+    rollup.answers_count = 0
+    rollup.sessions_count = 0
+    for score in ROLLUP_SCORES:
+        setattr(rollup, f'{score}_count', 0)
+        setattr(rollup, f'{score}_sum', 0)
+        setattr(rollup, f'{score}_min', None)
+        setattr(rollup, f'{score}_max', None)
+
+
+def backfill_rollups(since=None):
+    """Rebuild all rollups (or those from since onwards) from the answers table"""
+    # Skor per hari jawaban, jumlah sesi per hari sesi dimulai
+    queries = (
+        _grouped_by_day(Answer.created_at, _aggregate_columns(), since),
+        _grouped_by_day(InterviewSession.started_at, _session_columns(), since),
+    )
+    existing = ScoreRollup.query
+    if since:
+        existing = existing.filter(ScoreRollup.day >= since)
+    existing = {(rollup.user_id, rollup.role_id, rollup.day): rollup for rollup in existing.all()}
+
+    rebuilt = {}
+    rows = 0
+    for query in queries:
+        for row in query.all():
+            # SQLite mengembalikan DATE() sebagai string
+            day = row.day if isinstance(row.day, date) else date.fromisoformat(row.day)
+            key = (row.user_id, row.role_id, day)
+            rollup = rebuilt.get(key)
+            if rollup is None:
+                rollup = existing.pop(key, None)
+                if rollup is None:
+                    rollup = _empty_rollup(*key)
+                    db.session.add(rollup)
+                # Bucket lama dikosongkan dulu: nilai yang tidak ada di hasil query tidak boleh tersisa
+                _reset_rollup(rollup)
+                rebuilt[key] = rollup
+            _apply_aggregate(rollup, row)
+            rows += 1
+            if rows % BACKFILL_COMMIT_EVERY == 0:
+                db.session.commit()
+                print(f"📊 Backfilled {len(rebuilt)} rollup bucket(s)...")
+
+    # Bucket yang jawabannya sudah tidak punya feedback lagi
+    for rollup in existing.values():
+        db.session.delete(rollup)
+    db.session.commit()
+    print(f"✅ Backfilled {len(rebuilt)} rollup bucket(s), removed {len(existing)} stale bucket(s)")
+    return len(rebuilt)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score rollup maintenance")
+    commands = parser.add_subparsers(dest='command', required=True)
+    backfill = commands.add_parser('backfill', help="rebuild rollups from existing answers")
+    backfill.add_argument('--since', type=date.fromisoformat,
+                          help="only rebuild days from this date (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    from app import get_worker_app
+    with get_worker_app().app_context():
+        backfill_rollups(args.since)
+
+
+if __name__ == '__main__':
+    main()
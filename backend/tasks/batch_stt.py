@@ -0,0 +1,66 @@
+"""Inferensi Whisper batch untuk beberapa jawaban sekaligus.
+
+Setiap audio (sudah di-preprocess ke 16 kHz) dipotong menjadi window 30 detik,
+semua window dari semua jawaban digabung menjadi satu batch mel-spectrogram,
+lalu encoder + decoder dijalankan sekali per batch (whisper.decode menerima
+tensor [N, n_mels, 3000]). Teks tiap window dikembalikan ke jawaban asalnya
+sesuai urutan.
+
+Catatan: window 30 detik dipotong tetap (tanpa seek berbasis timestamp seperti
+model.transcribe), jadi kata yang jatuh tepat di batas window bisa terpotong.
+"""
+import numpy as np
+
+from utils.audio import SAMPLE_RATE
+from utils.metrics import metrics
+
+WINDOW_SECONDS = 30
+WINDOW_SAMPLES = WINDOW_SECONDS * SAMPLE_RATE
+
+
+def split_windows(audio):
+    return [audio[i:i + WINDOW_SAMPLES] for i in range(0, len(audio), WINDOW_SAMPLES)]
+
+
+def transcribe_batch(model, audios, language, max_batch_windows=16):
+    """Transcribe several 16 kHz float32 arrays; returns one text per input, in order"""
+    import torch
+    import whisper
+
+    windows = []
+    owners = []
+    for idx, audio in enumerate(audios):
+        for window in split_windows(audio):
+            windows.append(window)
+            owners.append(idx)
+
+    texts = [[] for _ in audios]
+    if not windows:
+        return ['' for _ in audios]
+
+    options = whisper.DecodingOptions(
+        language=language,
+        fp16=False,
+        temperature=0,
+        without_timestamps=True,
+    )
+    n_mels = model.dims.n_mels
+
+    for start in range(0, len(windows), max_batch_windows):
+        chunk = windows[start:start + max_batch_windows]
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(torch.from_numpy(np.ascontiguousarray(window))),
+                n_mels=n_mels,
+            )
+            for window in chunk
+        ]).to(model.device)
+
+        with metrics.timer('whisper.batch_decode_seconds'):
+            results = whisper.decode(model, mel, options)
+        metrics.increment('whisper.batch_windows', len(chunk))
+
+        for owner, result in zip(owners[start:start + max_batch_windows], results):
+            texts[owner].append(result.text.strip())
+
+    return [' '.join(t for t in parts if t) for parts in texts]
@@ -0,0 +1,218 @@
+"""Analisis wajah di process pool, terpisah dari thread request Flask.
+
+HOG face_recognition memakai CPU penuh untuk setiap frame. Kalau dijalankan
+di thread request, beberapa interview yang polling bersamaan membuat upload
+dan login ikut tertahan. Di sini model dlib dimuat sekali per proses worker
+(initializer), dan jumlah frame yang dikerjakan + mengantri dibatasi: kalau
+penuh, FacePool.run() melempar FaceQueueFull supaya route membalas 429
+alih-alih menumpuk request.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+from config import Config
+from utils.metrics import metrics
+
+WARMUP_SHAPE = (64, 64, 3)
+FACE_MODES = ('presence', 'full', 'identity')
+# Mode presence: decode JPEG langsung di resolusi 1/n (libjpeg men-skip DCT), grayscale cukup untuk HOG
+REDUCED_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+class FaceQueueFull(Exception):
+    pass
+
+
+# --- proses worker ---
+
+_face_recognition = None
+
+
+def _init_worker():
+    """Pool initializer: load the dlib models once per worker process"""
+    global _face_recognition
+    import face_recognition
+    _face_recognition = face_recognition
+    # Panggilan pertama HOG lebih lambat, jangan sampai kena ke request pertama
+    _face_recognition.face_locations(np.zeros(WARMUP_SHAPE, np.uint8))
+
+
+def decode_image(image_bytes):
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Invalid image")
+    # cv2 membaca BGR, face_recognition butuh RGB
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def detect_presence(image_bytes):
+    """Runs in a pool process: face count only, from a downscaled grayscale decode"""
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8),
+                       REDUCED_GRAYSCALE_FLAGS[Config.FACE_PRESENCE_REDUCTION])
+    if img is None:
+        raise ValueError("Invalid image")
+    face_locations = _face_recognition.face_locations(
+        img, number_of_times_to_upsample=Config.FACE_PRESENCE_UPSAMPLE)
+    return {'face_count': len(face_locations)}
+
+
+def _iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    height = min(a[2], b[2]) - max(a[0], b[0])
+    width = min(a[1], b[1]) - max(a[3], b[3])
+    if height <= 0 or width <= 0:
+        return 0.0
+    inter = height * width
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / (area_a + area_b - inter)
+
+
+def track_identity(image_bytes, state):
+    """Runs in a pool process: presence check plus identity match against the session reference.
+
+    The face is only encoded when the cheap detector shows a change (no
+    reference yet, the box moved, or the last check was not a match).
+    Returns (result, new_state); state is the JSON dict kept by utils.face_store.
+    """
+    reduction = Config.FACE_PRESENCE_REDUCTION
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), REDUCED_GRAYSCALE_FLAGS[reduction])
+    if gray is None:
+        raise ValueError("Invalid image")
+    boxes = _face_recognition.face_locations(gray, number_of_times_to_upsample=Config.FACE_PRESENCE_UPSAMPLE)
+
+    state = dict(state)
+    references = list(state.get('references', []))
+    result = {'face_count': len(boxes), 'match': None, 'reference_set': bool(references)}
+    if len(boxes) != 1:
+        # Tidak ada / lebih dari satu wajah: tidak bisa dibandingkan, dan tidak dipakai sebagai referensi
+        state['last_box'] = None
+        return result, state
+
+    box = boxes[0]
+    last_box = state.get('last_box')
+    if references and last_box and state.get('last_match') and _iou(box, last_box) >= Config.FACE_TRACK_IOU:
+        state['last_box'] = list(box)
+        result['match'] = True
+        return result, state
+
+    # Encoding butuh frame warna resolusi penuh; kotak dari frame kecil diskalakan balik
+    img = decode_image(image_bytes)
+    top, right, bottom, left = (value * reduction for value in box)
+    location = (max(top, 0), min(right, img.shape[1]), min(bottom, img.shape[0]), max(left, 0))
+    encoding = _face_recognition.face_encodings(img, [location])[0]
+
+    if not references:
+        references.append(encoding.tolist())
+        result.update(match=True, reference_set=True)
+    else:
+        distance = float(np.linalg.norm(np.asarray(references) - encoding, axis=1).min())
+        result['match'] = distance <= Config.FACE_MATCH_TOLERANCE
+        result['distance'] = round(distance, 3)
+        # Beberapa sampel yang cocok (pose/cahaya berbeda) membuat referensi lebih tahan perubahan
+        if result['match'] and len(references) < Config.FACE_REFERENCE_SAMPLES:
+            references.append(encoding.tolist())
+
+    state.update(references=references, last_box=list(box), last_match=result['match'])
+    return result, state
+
+
+def analyze_face(image_bytes, mode='full'):
+    """Runs in a pool process: face count, plus 128-d encodings in full mode"""
+    if mode == 'presence':
+        return detect_presence(image_bytes)
+    img = decode_image(image_bytes)
+    face_locations = _face_recognition.face_locations(img)
+    face_encodings = _face_recognition.face_encodings(img, face_locations)
+    return {
+        'face_count': len(face_locations),
+        'encodings': [enc.tolist() for enc in face_encodings],
+    }
+
+
+# --- proses web ---
+
+class FacePool:
+    """Process pool with a bounded number of in-flight frames (running + queued)"""
+
+    def __init__(self, workers=None, queue_size=None):
+        self.workers = workers or Config.FACE_WORKERS
+        queue_size = Config.FACE_QUEUE_SIZE if queue_size is None else queue_size
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # spawn: proses web sudah punya banyak thread, fork tidak aman
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+                print(f"🙂 Face pool started with {self.workers} worker(s)")
+            return self._executor
+
+    def _restart(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        """Submit to the current executor, retrying once on a fresh one if it is broken"""
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # Worker mati di antara dua request: pool ini tidak bisa dipakai lagi
+            print("⚠️ Face pool broken on submit, restarting pool")
+            self._restart(executor)
+        executor = self._get_executor()
+        return executor, executor.submit(fn, *args)
+
+    def run(self, fn, *args, timeout=None):
+        """Run fn(*args) in the pool and wait for it; raises FaceQueueFull when at capacity"""
+        if not self._slots.acquire(blocking=False):
+            metrics.increment('face.shed')
+            raise FaceQueueFull()
+
+        try:
+            executor, future = self._submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # Slot baru dilepas saat worker selesai, jadi frame yang timeout tetap dihitung
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            with metrics.timer('face.analyze_seconds'):
+                return future.result(timeout=timeout or Config.FACE_TIMEOUT)
+        except BrokenProcessPool:
+            print("⚠️ Face worker died, restarting pool")
+            self._restart(executor)
+            raise
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_face_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = FacePool()
+    return _pool
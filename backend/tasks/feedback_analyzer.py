@@ -1,12 +1,327 @@
 import openai
 import json
+import re
 import time
 import threading
 from config import Config
 from extensions import db
 from models.answer import Answer
 from models.question import Question
+from tasks.analytics import update_score_rollups
 import pika
+from utils.llm import chat_completion
+from utils.metrics import metrics
+from utils.prompt_budget import (
+    count_tokens, count_message_tokens, input_budget, output_limit, fit_transcript, log_token_usage,
+)
+
+FEEDBACK_MODEL = "gpt-3.5-turbo"
+FEEDBACK_MAX_TOKENS = 500
+FEEDBACK_TEMPERATURE = 0.3
+# JSON mode: model dipaksa mengeluarkan satu objek JSON
+FEEDBACK_RESPONSE_FORMAT = {"type": "json_object"}
+FEEDBACK_SYSTEM_PROMPT = ("Anda adalah asisten yang memberikan feedback untuk interview. "
+                          "Jawab hanya dengan satu objek JSON yang valid.")
+FEEDBACK_SCHEMA = """{
+  "summary": "<ringkasan singkat jawaban>",
+  "clarity": <1-10>,
+  "structure": <1-10>,
+  "keyword": <1-10>,
+  "confidence": <1-10>,
+  "suggestions": ["<saran perbaikan singkat>", "..."]
+}"""
+REPAIR_MAX_TOKENS = 400
+# Mode batch per sesi: satu completion untuk semua jawaban dalam satu sesi
+SESSION_FEEDBACK_SCHEMA = """{
+  "answers": [
+    {
+      "answer_id": <id jawaban>,
+      "summary": "<ringkasan singkat jawaban>",
+      "clarity": <1-10>,
+      "structure": <1-10>,
+      "keyword": <1-10>,
+      "confidence": <1-10>,
+      "suggestions": ["<saran perbaikan singkat>", "..."]
+    }
+  ],
+  "session_summary": "<ringkasan performa kandidat di seluruh sesi>"
+}"""
+SESSION_TOKENS_PER_ANSWER = 250
+SESSION_SUMMARY_TOKENS = 300
+SCORE_FIELDS = ('clarity', 'structure', 'keyword', 'confidence')
+
+# Model kadang membungkus JSON dengan ```json ... ``` atau teks pembuka
+JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
+class FeedbackParseError(ValueError):
+    pass
+
+
+def _feedback_prompt(question_text, transcript_text):
+    return f"""
+            Berikut adalah jawaban dari kandidat terhadap pertanyaan interview:
+
+            "Pertanyaan: {question_text}"
+
+            "Jawaban: {transcript_text}"
+
+            Tolong berikan ringkasan jawaban tersebut, skor 1-10 untuk kejelasan (clarity),
+            struktur (structure), penggunaan kata kunci (keyword) dan keyakinan (confidence),
+            serta saran perbaikan singkat, dalam format JSON berikut:
+            {FEEDBACK_SCHEMA}
+            """
+
+
+def build_feedback_messages(question_text, transcript_text):
+    """Build the chat messages for the feedback completion within the input token budget"""
+    budget = input_budget(FEEDBACK_MODEL, Config.FEEDBACK_MAX_INPUT_TOKENS, FEEDBACK_MAX_TOKENS)
+    overhead = count_message_tokens([
+        {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT},
+        {"role": "user", "content": _feedback_prompt(question_text, '')},
+    ], FEEDBACK_MODEL)
+    # Transkrip panjang dikompres / dipotong supaya prompt tetap di dalam budget
+    transcript_text = fit_transcript(transcript_text, FEEDBACK_MODEL, max(budget - overhead, 1))
+    return [
+        {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT},
+        {"role": "user", "content": _feedback_prompt(question_text, transcript_text)}
+    ]
+
+
+def log_feedback_tokens(answer_id, messages, feedback_text):
+    log_token_usage('feedback', f"answer {answer_id}", FEEDBACK_MODEL,
+                    count_message_tokens(messages, FEEDBACK_MODEL),
+                    count_tokens(feedback_text, FEEDBACK_MODEL))
+
+
+def build_repair_messages(feedback_text, error):
+    """Messages for the one-shot repair call: only the broken output, not the transcript"""
+    prompt = f"""
+            Output berikut seharusnya berupa JSON dengan skema:
+            {FEEDBACK_SCHEMA}
+
+            Masalah: {error}
+
+            Output:
+            {feedback_text}
+
+            Perbaiki menjadi satu objek JSON valid sesuai skema tanpa mengubah isi penilaiannya.
+            """
+    return [
+        {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _decode_json_object(text):
+    match = JSON_OBJECT_RE.search(text or '')
+    if not match:
+        raise FeedbackParseError("no JSON object found")
+    try:
+        return json.loads(match.group(0))
+    except ValueError as e:
+        raise FeedbackParseError(f"invalid JSON: {e}")
+
+
+def parse_feedback(feedback_text):
+    """Parse and validate the feedback JSON. Raises FeedbackParseError"""
+    return validate_feedback(_decode_json_object(feedback_text))
+
+
+def validate_feedback(data):
+    """Validate one feedback object (already decoded). Raises FeedbackParseError"""
+    if not isinstance(data, dict):
+        raise FeedbackParseError("feedback is not an object")
+
+    summary = data.get('summary')
+    if not isinstance(summary, str) or not summary.strip():
+        raise FeedbackParseError("'summary' must be a non-empty string")
+    result = {'summary': summary.strip()}
+
+    for field in SCORE_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value.strip())
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 1 <= value <= 10:
+            raise FeedbackParseError(f"'{field}' must be a number between 1 and 10")
+        result[field] = int(round(value))
+
+    suggestions = data.get('suggestions', [])
+    if isinstance(suggestions, str):
+        suggestions = [suggestions]
+    if not isinstance(suggestions, list) or not all(isinstance(item, str) for item in suggestions):
+        raise FeedbackParseError("'suggestions' must be a list of strings")
+    result['suggestions'] = [item.strip() for item in suggestions if item.strip()]
+    return result
+
+
+def _parse_timed(feedback_text):
+    start = time.perf_counter()
+    try:
+        data = parse_feedback(feedback_text)
+        metrics.increment('feedback.parse_ok')
+        return data, None
+    except FeedbackParseError as e:
+        print(f"⚠️ Feedback is not valid JSON ({e}), requesting repair...")
+        metrics.increment('feedback.parse_repairs')
+        return None, e
+    finally:
+        metrics.record_timing('feedback.parse_seconds', time.perf_counter() - start)
+
+
+def _parse_repaired(repaired_text):
+    try:
+        data = parse_feedback(repaired_text)
+    except FeedbackParseError as e:
+        print(f"❌ Feedback repair failed: {e}")
+        metrics.increment('feedback.parse_failed')
+        return None
+    metrics.increment('feedback.parse_repaired')
+    return data
+
+
+def parse_feedback_with_repair(feedback_text, repair):
+    """Parse feedback; on failure call repair(messages) once and parse its output.
+
+    Returns the validated dict, or None when the repaired output is still invalid.
+    """
+    data, error = _parse_timed(feedback_text)
+    if data is not None:
+        return data
+    try:
+        repaired_text = repair(build_repair_messages(feedback_text, error))
+    except Exception as e:
+        print(f"❌ Feedback repair call failed: {e}")
+        metrics.increment('feedback.parse_failed')
+        return None
+    return _parse_repaired(repaired_text)
+
+
+async def parse_feedback_with_repair_async(feedback_text, repair):
+    """Async variant of parse_feedback_with_repair; repair is a coroutine function"""
+    data, error = _parse_timed(feedback_text)
+    if data is not None:
+        return data
+    try:
+        repaired_text = await repair(build_repair_messages(feedback_text, error))
+    except Exception as e:
+        print(f"❌ Feedback repair call failed: {e}")
+        metrics.increment('feedback.parse_failed')
+        return None
+    return _parse_repaired(repaired_text)
+
+
+def format_feedback(data):
+    """Readable feedback text stored in answers.feedback (shown as-is in the UI)"""
+    lines = [
+        f"- Ringkasan: {data['summary']}",
+        "- Evaluasi:",
+        f"  - Kejelasan: {data['clarity']}",
+        f"  - Struktur: {data['structure']}",
+        f"  - Kata kunci: {data['keyword']}",
+        f"  - Keyakinan: {data['confidence']}",
+    ]
+    if data['suggestions']:
+        lines.append("- Saran:")
+        lines.extend(f"  - {item}" for item in data['suggestions'])
+    return '\n'.join(lines)
+
+
+def apply_feedback_to_answer(answer, feedback_text, data):
+    """Store validated feedback on the answer.
+
+    When data is None (unparseable even after repair) only the raw text is kept
+    and the scores stay empty instead of being filled with made-up values.
+    """
+    if data is None:
+        answer.feedback = feedback_text
+        return answer
+    answer.feedback = format_feedback(data)
+    answer.summary = data['summary']
+    answer.clarity_score = data['clarity']
+    answer.structure_score = data['structure']
+    answer.keyword_score = data['keyword']
+    answer.confidence_score = data['confidence']
+    return answer
+
+
+def repair_feedback(messages):
+    return chat_completion(FEEDBACK_MODEL, messages, max_tokens=REPAIR_MAX_TOKENS,
+                           temperature=0, response_format=FEEDBACK_RESPONSE_FORMAT)
+
+
+def _session_prompt(items):
+    blocks = '\n'.join(
+        f"""
+            [answer_id: {answer_id}]
+            "Pertanyaan: {question_text}"
+            "Jawaban: {transcript_text}"
+            """
+        for answer_id, question_text, transcript_text in items)
+    return f"""
+            Berikut adalah jawaban kandidat untuk beberapa pertanyaan dalam satu sesi interview:
+            {blocks}
+            Untuk setiap jawaban, berikan ringkasan, skor 1-10 untuk kejelasan (clarity),
+            struktur (structure), penggunaan kata kunci (keyword) dan keyakinan (confidence),
+            serta saran perbaikan singkat. Tambahkan juga ringkasan performa untuk seluruh sesi.
+            Jawab dalam format JSON berikut:
+            {SESSION_FEEDBACK_SCHEMA}
+            """
+
+
+def build_session_feedback_messages(items):
+    """Messages for one completion covering all (answer_id, question_text, transcript_text) items.
+
+    Returns (messages, max_tokens). The input budget is shared equally between
+    the transcripts; each one is compressed / truncated to its share.
+    """
+    max_tokens = min(output_limit(FEEDBACK_MODEL),
+                     SESSION_TOKENS_PER_ANSWER * len(items) + SESSION_SUMMARY_TOKENS)
+    budget = input_budget(FEEDBACK_MODEL, Config.FEEDBACK_SESSION_MAX_INPUT_TOKENS, max_tokens)
+    overhead = count_message_tokens([
+        {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT},
+        {"role": "user", "content": _session_prompt([(a, q, '') for a, q, _ in items])},
+    ], FEEDBACK_MODEL)
+    share = max((budget - overhead) // len(items), 1)
+    items = [(a, q, fit_transcript(t, FEEDBACK_MODEL, share)) for a, q, t in items]
+    messages = [
+        {"role": "system", "content": FEEDBACK_SYSTEM_PROMPT},
+        {"role": "user", "content": _session_prompt(items)}
+    ]
+    return messages, max_tokens
+
+
+def parse_session_feedback(feedback_text, answer_ids):
+    """Parse the session completion into ({answer_id: feedback dict}, session_summary).
+
+    Answers that are missing or invalid in the response are left out, so the
+    caller can fall back to per-answer analysis for them. Raises
+    FeedbackParseError when the response as a whole is unusable.
+    """
+    start = time.perf_counter()
+    try:
+        data = _decode_json_object(feedback_text)
+        items = data.get('answers') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            raise FeedbackParseError("'answers' must be a list")
+
+        wanted = set(answer_ids)
+        results = {}
+        for item in items:
+            try:
+                answer_id = int(item.get('answer_id'))
+                if answer_id in wanted:
+                    results[answer_id] = validate_feedback(item)
+            except (FeedbackParseError, AttributeError, TypeError, ValueError) as e:
+                print(f"⚠️ Skipping invalid session feedback item: {e}")
+        metrics.increment('feedback.session_answers_parsed', len(results))
+        metrics.increment('feedback.session_answers_missing', len(wanted) - len(results))
+
+        summary = data.get('session_summary')
+        return results, summary.strip() if isinstance(summary, str) else None
+    finally:
+        metrics.record_timing('feedback.parse_seconds', time.perf_counter() - start)
+
 
 def analyze_answer_feedback(answer_id):
     """Analyze answer transcript and generate feedback using LLM"""
@@ -14,8 +329,8 @@ def analyze_answer_feedback(answer_id):
         print(f"🔍 Starting feedback analysis for answer {answer_id}")
         
         # Import app inside function to avoid circular imports
-        from app import create_app
-        app = create_app()
+        from app import get_worker_app
+        app = get_worker_app()
         
         with app.app_context():
             answer = Answer.query.get(answer_id)
@@ -33,50 +348,24 @@ def analyze_answer_feedback(answer_id):
             print(f"❓ Question: {question.question_text}")
             print(f"💬 Transcript: {answer.transcript_text[:100]}...")
             
-            # Create prompt for LLM
-            prompt = f"""
-            Berikut adalah jawaban dari kandidat terhadap pertanyaan interview:
-            
-            "Pertanyaan: {question.question_text}"
-            
-            "Jawaban: {answer.transcript_text}"
-            
-            Tolong berikan ringkasan jawaban tersebut dan evaluasi sederhana dalam format berikut:
-            - Ringkasan: [ringkasan singkat]
-            - Evaluasi:
-              - Kejelasan: [1-10]
-              - Struktur: [1-10]
-              - Kata kunci: [1-10]
-            - Saran: [saran perbaikan singkat]
-            """
-            
-            # Use OpenAI GPT API
-            openai.api_key = Config.OPENAI_API_KEY
-            
             print(f"🔄 Sending to OpenAI GPT API...")
             
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Anda adalah asisten yang memberikan feedback untuk interview."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
+            messages = build_feedback_messages(question.question_text, answer.transcript_text)
+            feedback_text = chat_completion(
+                FEEDBACK_MODEL,
+                messages,
+                max_tokens=FEEDBACK_MAX_TOKENS,
+                temperature=FEEDBACK_TEMPERATURE,
+                response_format=FEEDBACK_RESPONSE_FORMAT
             )
-            
-            feedback_text = response.choices[0].message.content
-            
-            # Parse feedback to extract scores (simplified)
-            answer.feedback = feedback_text
-            answer.summary = "Ringkasan jawaban..."  # Extract from feedback
-            answer.clarity_score = 7  # Extract from feedback
-            answer.confidence_score = 6  # Extract from feedback
-            answer.structure_score = 8  # Extract from feedback
+            log_feedback_tokens(answer_id, messages, feedback_text)
+            data = parse_feedback_with_repair(feedback_text, repair_feedback)
+            apply_feedback_to_answer(answer, feedback_text, data)
             
             # Try to commit and handle errors
             try:
                 db.session.commit()
+                update_score_rollups([answer_id])
                 print(f"✅ Feedback saved to database for answer {answer_id}")
                 return True
                 
@@ -0,0 +1,132 @@
+"""Transkripsi bertahap untuk upload chunked.
+
+Setiap kali chunk baru masuk, worker men-decode file mulai dari detik
+terakhir yang sudah "committed" (ffmpeg seek, bagian awal tidak di-decode
+ulang), lalu mentranskrip audio baru tersebut. Segmen yang berakhir
+terlalu dekat dengan ujung file (TAIL_MARGIN_SECONDS) belum di-commit
+karena kalimatnya mungkin masih terpotong. Saat upload selesai,
+hanya sisa ekor audio yang perlu ditranskrip.
+
+State disimpan di sidecar JSON di sebelah file upload supaya bisa dibaca
+oleh worker mana pun (termasuk setelah crash). Modul ini tidak meng-import
+whisper karena juga dipakai route upload di proses web.
+"""
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from utils.audio import SAMPLE_RATE, decode_audio, preprocess_audio, trim_silence
+from utils.metrics import metrics
+
+TAIL_MARGIN_SECONDS = 5.0
+MIN_NEW_AUDIO_SECONDS = 10.0
+
+
+def partial_path(audio_path):
+    return f"{audio_path}.partial.json"
+
+
+@contextmanager
+def _file_lock(lock_path):
+    with open(lock_path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def partial_lock(audio_path):
+    """Exclusive lock so incremental and final passes never run concurrently on one file"""
+    return _file_lock(f"{audio_path}.lock")
+
+
+def upload_lock(audio_path):
+    """Exclusive lock for appending chunks and finishing an upload.
+
+    Separate from partial_lock so a chunk never waits for a running transcription.
+    """
+    return _file_lock(f"{audio_path}.upload.lock")
+
+
+def load_partial(audio_path):
+    try:
+        with open(partial_path(audio_path)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_partial(audio_path, state):
+    tmp_path = f"{partial_path(audio_path)}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, partial_path(audio_path))
+
+
+def init_partial(audio_path):
+    """Mark an upload as chunked so the final pass knows to reuse partial results"""
+    save_partial(audio_path, {'committed_seconds': 0.0, 'texts': [], 'bytes_seen': 0})
+
+
+def cleanup_partial(audio_path):
+    for path in (partial_path(audio_path), f"{audio_path}.lock", f"{audio_path}.upload.lock"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def transcribe_incremental(backend, audio_path):
+    """Transcribe newly arrived audio of an in-progress upload.
+
+    Returns True when new text was committed.
+    """
+    with partial_lock(audio_path):
+        state = load_partial(audio_path)
+        if state is None:
+            return False  # upload sudah selesai diproses final
+
+        size = os.path.getsize(audio_path)
+        if size <= state['bytes_seen']:
+            return False
+
+        start = time.perf_counter()
+        # Hanya audio setelah committed_seconds yang di-decode, bukan seluruh file yang terus membesar
+        audio = decode_audio(audio_path, start_seconds=state['committed_seconds'])
+        new_seconds = len(audio) / SAMPLE_RATE
+        if new_seconds < MIN_NEW_AUDIO_SECONDS + TAIL_MARGIN_SECONDS:
+            # Belum cukup audio baru; tunggu chunk berikutnya
+            return False
+        state['bytes_seen'] = size
+
+        segments = backend.transcribe(audio)['segments']
+        safe_end = new_seconds - TAIL_MARGIN_SECONDS
+        committed = [seg for seg in segments if seg['end'] <= safe_end]
+        if committed:
+            state['texts'].extend(seg['text'] for seg in committed)
+            state['committed_seconds'] += committed[-1]['end']
+        save_partial(audio_path, state)
+        metrics.record_timing('stt.incremental_seconds', time.perf_counter() - start)
+        return bool(committed)
+
+
+def transcribe_final(backend, audio_path):
+    """Finish a transcript, reusing committed partial text when the upload was chunked"""
+    with partial_lock(audio_path):
+        state = load_partial(audio_path)
+        if state is None:
+            # Upload biasa: decode + trim hening sekali, hasilnya di-cache sebagai .npy
+            audio = preprocess_audio(audio_path)
+            if len(audio) == 0:
+                return ''
+            return backend.transcribe(audio)['text']
+
+        # Cukup ekor setelah committed_seconds; hening di ujung rekaman tetap dibuang
+        audio = trim_silence(decode_audio(audio_path, start_seconds=state['committed_seconds']))
+        metrics.increment('stt.incremental_seconds_reused', state['committed_seconds'])
+        segments = backend.transcribe(audio)['segments'] if len(audio) else []
+        texts = state['texts'] + [seg['text'] for seg in segments]
+        return ''.join(texts).strip()
@@ -0,0 +1,130 @@
+"""State job pemrosesan per (answer, stage) dan routing retry / dead-letter.
+
+Alur per pesan:
+1. begin_job(): satu lookup lewat unique index (answer_id, stage). Kalau stage
+   sudah 'done', pesan cukup di-ack (redelivery setelah crash tidak menjalankan
+   Whisper / GPT lagi). Kalau job sedang 'running' oleh pesan lain (message_id
+   berbeda) dan belum kedaluwarsa, pesan duplikat juga di-skip.
+2. complete_job() / fail_job() mencatat status, jumlah attempt, durasi dan
+   error terakhir.
+3. Pesan yang gagal dipublish ulang ke delay queue `<queue>.retry.<n>`
+   (TTL eksponensial, lalu di-dead-letter kembali ke queue asal). Setelah
+   JOB_MAX_ATTEMPTS, pesan masuk `<queue>.dead` dan job ditandai 'dead'.
+"""
+from datetime import datetime, timedelta
+
+import pika
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from extensions import db
+from models.processing_job import ProcessingJob
+from utils.metrics import metrics
+
+MAX_ERROR_LENGTH = 2000
+
+
+def retry_queue_name(queue, attempt):
+    return f"{queue}.retry.{attempt}"
+
+
+def dead_letter_queue_name(queue):
+    return f"{queue}.dead"
+
+
+def retry_delay_ms(attempt):
+    return min(Config.JOB_RETRY_BASE_MS * 2 ** (attempt - 1), Config.JOB_RETRY_MAX_MS)
+
+
+def retry_queue_arguments(queue, attempt):
+    return {
+        'x-message-ttl': retry_delay_ms(attempt),
+        'x-dead-letter-exchange': '',
+        'x-dead-letter-routing-key': queue,
+    }
+
+
+def declare_job_queues(channel, queue):
+    """Declare a work queue with its delay queues and dead-letter queue (pika BlockingChannel)"""
+    channel.queue_declare(queue=queue, durable=True)
+    for attempt in range(1, Config.JOB_MAX_ATTEMPTS):
+        channel.queue_declare(queue=retry_queue_name(queue, attempt), durable=True,
+                              arguments=retry_queue_arguments(queue, attempt))
+    channel.queue_declare(queue=dead_letter_queue_name(queue), durable=True)
+
+
+def begin_job(answer_id, stage, message_id=None):
+    """Mark a job as running. Returns the attempt number, or None when the message must be skipped.
+
+    Must be called inside an app context.
+    """
+    job = ProcessingJob.query.filter_by(answer_id=answer_id, stage=stage).first()
+    now = datetime.utcnow()
+
+    if job is None:
+        job = ProcessingJob(answer_id=answer_id, stage=stage, attempts=0)
+        db.session.add(job)
+    elif job.status == 'done':
+        metrics.increment(f'jobs.{stage}.skipped_done')
+        return None
+    elif (job.status == 'running' and message_id and job.message_id
+          and job.message_id != message_id
+          and job.started_at and now - job.started_at < timedelta(seconds=Config.JOB_RUNNING_TIMEOUT)):
+        # Pesan duplikat untuk pekerjaan yang sedang dikerjakan worker lain
+        metrics.increment(f'jobs.{stage}.skipped_duplicate')
+        return None
+
+    job.status = 'running'
+    job.message_id = message_id
+    job.attempts += 1
+    job.started_at = now
+    job.finished_at = None
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Worker lain membuat baris job yang sama di saat bersamaan
+        db.session.rollback()
+        return begin_job(answer_id, stage, message_id)
+    return job.attempts
+
+
+def complete_job(answer_id, stage):
+    job = ProcessingJob.query.filter_by(answer_id=answer_id, stage=stage).first()
+    if job is None:
+        return
+    job.status = 'done'
+    job.finished_at = datetime.utcnow()
+    if job.started_at:
+        job.duration_ms = int((job.finished_at - job.started_at).total_seconds() * 1000)
+    job.last_error = None
+    db.session.commit()
+    metrics.increment(f'jobs.{stage}.done')
+
+
+def fail_job(answer_id, stage, error, dead=False):
+    job = ProcessingJob.query.filter_by(answer_id=answer_id, stage=stage).first()
+    if job is None:
+        return
+    job.status = 'dead' if dead else 'failed'
+    job.finished_at = datetime.utcnow()
+    job.last_error = str(error)[:MAX_ERROR_LENGTH]
+    db.session.commit()
+    metrics.increment(f'jobs.{stage}.{job.status}')
+
+
+def retry_or_dead_letter(channel, queue, body, message_id, attempt):
+    """Route a failed message to the next delay queue, or to the DLQ when attempts are exhausted.
+
+    Returns True when the message was dead-lettered. The caller acks the original delivery.
+    """
+    properties = pika.BasicProperties(delivery_mode=2, message_id=message_id)
+    if attempt is not None and attempt < Config.JOB_MAX_ATTEMPTS:
+        print(f"🔁 Retrying {queue} message in {retry_delay_ms(attempt) / 1000:.0f}s (attempt {attempt})")
+        channel.basic_publish(exchange='', routing_key=retry_queue_name(queue, attempt),
+                              body=body, properties=properties)
+        return False
+
+    print(f"☠️ Moving {queue} message to {dead_letter_queue_name(queue)}")
+    channel.basic_publish(exchange='', routing_key=dead_letter_queue_name(queue),
+                          body=body, properties=properties)
+    return True
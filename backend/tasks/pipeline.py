@@ -0,0 +1,40 @@
+"""Checkpoint untuk mode pipeline fused (PIPELINE_MODE=fused).
+
+Di mode fused satu worker STT menjalankan STT -> polish -> feedback tanpa
+lewat queue feedback_analysis. Hasil tiap stage ditulis ke sidecar JSON di
+sebelah file upload, jadi kalau worker crash, redelivery pesan melanjutkan
+dari stage terakhir yang selesai (tanpa transkripsi / completion ulang).
+Database hanya ditulis sekali di akhir pipeline.
+"""
+import json
+import os
+
+
+def checkpoint_path(audio_path):
+    return f"{audio_path}.pipeline.json"
+
+
+def load_checkpoint(audio_path):
+    """Return the saved stage outputs, or {} when missing, corrupt or older than the audio"""
+    path = checkpoint_path(audio_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(audio_path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(audio_path, state):
+    tmp_path = f"{checkpoint_path(audio_path)}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, checkpoint_path(audio_path))
+
+
+def clear_checkpoint(audio_path):
+    try:
+        os.remove(checkpoint_path(audio_path))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,216 @@
+"""Backend STT yang bisa dipilih lewat config (STT_BACKEND).
+
+Semua backend menerima path file atau array float32 16 kHz mono dan
+mengembalikan bentuk hasil yang sama:
+
+    {
+        'text': str,
+        'segments': [{'start': float, 'end': float, 'text': str}, ...],
+        'timings': {'transcribe_seconds': float, ...},
+        'backend': str,
+        'model': str,
+    }
+
+Backend yang tersedia:
+- 'whisper'         : openai-whisper lokal (PyTorch)
+- 'faster-whisper'  : CTranslate2, default int8 di CPU (beberapa kali lebih cepat)
+- 'openai'          : API remote whisper-1
+"""
+import abc
+import io
+import threading
+import time
+import wave
+
+import numpy as np
+
+from config import Config
+from utils.audio import SAMPLE_RATE
+from utils.metrics import metrics
+
+
+def _result(text, segments, transcribe_seconds, backend, model):
+    return {
+        'text': text.strip(),
+        'segments': segments,
+        'timings': {'transcribe_seconds': transcribe_seconds},
+        'backend': backend,
+        'model': model,
+    }
+
+
+class STTBackend(abc.ABC):
+    """Common interface for speech-to-text engines"""
+
+    name = None
+
+    def __init__(self, model_name=None, language=None, num_threads=None):
+        self.model_name = model_name or Config.WHISPER_MODEL
+        self.language = language or Config.WHISPER_LANGUAGE
+        # 0 = biarkan engine memilih sendiri
+        self.num_threads = num_threads or Config.STT_TORCH_THREADS
+        self.load_seconds = None
+
+    def load(self):
+        """Load model weights; called once per process"""
+        start = time.perf_counter()
+        self._load()
+        self.load_seconds = time.perf_counter() - start
+        metrics.record_timing('stt.load_seconds', self.load_seconds)
+        print(f"✅ STT backend '{self.name}' ({self.model_name}) loaded in {self.load_seconds:.2f}s")
+        return self
+
+    def _load(self):
+        pass
+
+    def warm_up(self):
+        """Run one second of silence through the model so the first real answer is not slower"""
+        with metrics.timer('stt.warmup_seconds'):
+            self.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+        print(f"🔥 STT backend '{self.name}' warmed up")
+
+    def transcribe(self, audio):
+        start = time.perf_counter()
+        text, segments = self._transcribe(audio)
+        elapsed = time.perf_counter() - start
+        metrics.record_timing('stt.transcribe_seconds', elapsed)
+        return _result(text, segments, elapsed, self.name, self.model_name)
+
+    @abc.abstractmethod
+    def _transcribe(self, audio):
+        """Return (text, segments) for one audio file path or array"""
+
+    def transcribe_batch(self, audios):
+        """Transcribe several arrays; engines without real batching just loop"""
+        return [self.transcribe(audio) for audio in audios]
+
+
+class WhisperBackend(STTBackend):
+    name = 'whisper'
+
+    def _load(self):
+        import whisper
+        self.model = whisper.load_model(self.model_name)
+
+    def _transcribe(self, audio):
+        result = self.model.transcribe(audio, fp16=False, language=self.language, temperature=0)
+        segments = [
+            {'start': seg['start'], 'end': seg['end'], 'text': seg['text']}
+            for seg in result.get('segments', [])
+        ]
+        return result['text'], segments
+
+    def transcribe_batch(self, audios):
+        from tasks.batch_stt import transcribe_batch
+
+        start = time.perf_counter()
+        texts = transcribe_batch(self.model, audios, self.language, Config.STT_BATCH_MAX_WINDOWS)
+        elapsed = time.perf_counter() - start
+        metrics.record_timing('stt.batch_transcribe_seconds', elapsed)
+        # Mode batch tanpa timestamp: satu segmen per jawaban
+        return [
+            _result(text, [{'start': 0.0, 'end': len(audio) / SAMPLE_RATE, 'text': text}],
+                    elapsed / len(audios), self.name, self.model_name)
+            for text, audio in zip(texts, audios)
+        ]
+
+
+class FasterWhisperBackend(STTBackend):
+    name = 'faster-whisper'
+
+    def _load(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(
+            self.model_name,
+            device=Config.STT_DEVICE,
+            compute_type=Config.STT_COMPUTE_TYPE,
+            cpu_threads=self.num_threads,
+        )
+
+    def _transcribe(self, audio):
+        segments_iter, info = self.model.transcribe(
+            audio, language=self.language, temperature=0, beam_size=1)
+        segments = [
+            {'start': seg.start, 'end': seg.end, 'text': seg.text}
+            for seg in segments_iter  # generator: decoding terjadi di sini
+        ]
+        return ''.join(seg['text'] for seg in segments), segments
+
+
+class OpenAIAPIBackend(STTBackend):
+    name = 'openai'
+
+    def __init__(self, model_name=None, language=None, num_threads=None):
+        super().__init__(model_name or 'whisper-1', language, num_threads)
+
+    def _load(self):
+        import openai
+        openai.api_key = Config.OPENAI_API_KEY
+        self.openai = openai
+
+    def warm_up(self):
+        pass  # remote API, tidak ada model lokal yang perlu dipanaskan
+
+    def _transcribe(self, audio):
+        if isinstance(audio, str):
+            with open(audio, 'rb') as audio_file:
+                result = self._request(audio_file)
+        else:
+            result = self._request(_to_wav(audio))
+        segments = [
+            {'start': seg['start'], 'end': seg['end'], 'text': seg['text']}
+            for seg in result.get('segments', [])
+        ]
+        return result['text'], segments
+
+    def _request(self, audio_file):
+        return self.openai.Audio.transcribe(
+            self.model_name, audio_file,
+            language=self.language, response_format='verbose_json', temperature=0,
+        )
+
+
+def _to_wav(audio):
+    """Encode float32 PCM as an in-memory 16-bit WAV file for upload"""
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+    buf.seek(0)
+    buf.name = 'audio.wav'
+    return buf
+
+
+STT_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+    OpenAIAPIBackend.name: OpenAIAPIBackend,
+}
+
+# Registry per proses: satu instance (model ter-load) per backend
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_stt_backend(name=None, num_threads=None):
+    """Return the process-wide backend configured by STT_BACKEND, loading it on first use.
+
+    num_threads only applies to that first load (the worker's share of the CPU cores).
+    """
+    name = name or Config.STT_BACKEND
+    backend = _backends.get(name)
+    if backend is not None:
+        return backend
+
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            if name not in STT_BACKENDS:
+                raise ValueError(f"Unknown STT backend '{name}', expected one of {sorted(STT_BACKENDS)}")
+            print(f"🔄 Loading STT backend '{name}'...")
+            backend = STT_BACKENDS[name](num_threads=num_threads).load()
+            _backends[name] = backend
+    return backend
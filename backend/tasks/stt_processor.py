@@ -7,6 +7,7 @@ from config import Config
 from extensions import db
 from models.answer import Answer
 from utils.rabbitmq_handler import rabbitmq_handler
+from tasks.stt_backends import get_stt_backend
 import pika
 
 def process_audio_to_text(answer_id):
@@ -15,8 +16,8 @@ def process_audio_to_text(answer_id):
         print(f"🔍 Starting STT processing for answer {answer_id}")
         
         # Import app inside function to avoid circular imports
-        from app import create_app
-        app = create_app()
+        from app import get_worker_app
+        app = get_worker_app()
         
         with app.app_context():
             print(f"🔎 Querying Answer with id: {answer_id}")
@@ -41,17 +42,15 @@ def process_audio_to_text(answer_id):
                 print(f"❌ Audio file is empty")
                 return False
             
-            # Use OpenAI Whisper API
-            openai.api_key = Config.OPENAI_API_KEY
+            # Backend STT dipilih lewat config (STT_BACKEND)
+            backend = get_stt_backend()
             
-            print(f"🔄 Sending to OpenAI Whisper API...")
+            print(f"🔄 Sending to '{backend.name}' STT backend...")
             
-            with open(answer.audio_file_path, "rb") as audio_file:
-                transcript = openai.Audio.transcribe("whisper-1", audio_file)
+            result = backend.transcribe(answer.audio_file_path)
             
-            print(f"📝 OpenAI Whisper API response: {transcript}")
             # Update answer with transcript
-            answer.transcript_text = transcript['text']
+            answer.transcript_text = result['text']
             print(f"📝 Transcript: {answer.transcript_text[:100]}...")
             
             # Try to commit and handle errors
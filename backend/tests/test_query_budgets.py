@@ -0,0 +1,104 @@
+"""Budget query per endpoint baca, dijalankan di SQLite in-memory dengan QUERY_BUDGET_STRICT.
+
+Kalau sebuah endpoint melewati budget-nya (mis. N+1 lewat lazy load),
+@query_budget melempar QueryBudgetExceeded dan test gagal. Data dibuat
+dengan beberapa jawaban supaya lazy load per baris benar-benar terlihat.
+"""
+import pytest
+from flask_jwt_extended import create_access_token
+
+from config import Config
+from extensions import db
+from models.users import User
+from models.role import Role
+from models.question import Question
+from models.session import InterviewSession
+from models.answer import Answer
+from utils.catalog_cache import get_catalog_cache
+from utils.query_budget import count_queries
+
+ANSWERS_PER_SESSION = 3
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    patch = pytest.MonkeyPatch()
+    patch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    patch.setattr(Config, 'SQLALCHEMY_ENGINE_OPTIONS', {})
+    patch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path_factory.mktemp('uploads')))
+    patch.setattr(Config, 'QUERY_BUDGET_STRICT', True)
+    patch.setattr(Config, 'CATALOG_CACHE_REDIS', False)
+    patch.setattr(Config, 'EVENTS_BACKEND', 'none')
+
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    patch.undo()
+
+
+@pytest.fixture(scope='module')
+def data(app):
+    from tasks.analytics import update_score_rollups
+
+    user = User(email='budget@example.com', password_hash='x', full_name='Budget Test')
+    role = Role(name='Backend Engineer')
+    db.session.add_all([user, role])
+    db.session.commit()
+
+    questions = [Question(role_id=role.id, question_text=f"Question {i}") for i in range(ANSWERS_PER_SESSION)]
+    session = InterviewSession(user_id=user.id, role_id=role.id)
+    db.session.add_all(questions + [session])
+    db.session.commit()
+
+    answers = [
+        Answer(session_id=session.id, question_id=question.id, transcript_text='jawaban',
+               feedback='feedback', clarity_score=7, confidence_score=6, structure_score=8, keyword_score=5)
+        for question in questions
+    ]
+    db.session.add_all(answers)
+    db.session.commit()
+    update_score_rollups([answer.id for answer in answers])
+
+    return {
+        'headers': {'Authorization': f"Bearer {create_access_token(identity=str(user.id))}"},
+        'session_id': session.id,
+        'answer_id': answers[0].id,
+    }
+
+
+@pytest.fixture
+def client(app):
+    # Mulai dari cache kosong supaya yang diukur adalah jalur miss
+    get_catalog_cache().invalidate()
+    return app.test_client()
+
+
+@pytest.mark.parametrize('path, budget', [
+    ('/api/interview/roles', 1),
+    ('/api/interview/questions/{session_id}', 2),
+    ('/api/dashboard/history', 1),
+    ('/api/dashboard/stats', 3),
+    ('/api/dashboard/answers/{answer_id}', 1),
+])
+def test_read_endpoint_budget(client, data, path, budget):
+    with count_queries() as counter:
+        response = client.get(path.format(**data), headers=data['headers'])
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert counter.count <= budget
+
+
+def test_catalog_served_from_cache(client, data):
+    path = f"/api/interview/questions/{data['session_id']}"
+    client.get(path, headers=data['headers'])
+
+    with count_queries() as counter:
+        response = client.get(path, headers=data['headers'])
+
+    assert response.status_code == 200
+    assert counter.count == 0
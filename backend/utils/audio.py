@@ -0,0 +1,116 @@
+"""Preprocessing audio untuk STT.
+
+Decode sekali (ffmpeg) ke 16 kHz mono float32, buang hening di awal/akhir
+rekaman dengan threshold energi, lalu simpan hasilnya sebagai .npy di
+sebelah file upload. Retry dan transkripsi ulang cukup memuat .npy
+(memory-mapped) tanpa spawn ffmpeg lagi.
+"""
+import hashlib
+import os
+import subprocess
+import time
+
+import numpy as np
+
+from config import Config
+from utils.metrics import metrics
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+PAD_MS = 300
+HASH_BLOCK_SIZE = 64 * 1024
+
+
+def cache_path(audio_path):
+    return f"{audio_path}.16k.npy"
+
+
+def save_stream_with_hash(stream, path):
+    """Write an upload stream to disk and return its sha256, hashing in the same pass"""
+    digest = hashlib.sha256()
+    with open(path, 'wb') as f:
+        while True:
+            block = stream.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            f.write(block)
+    return digest.hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def decode_audio(audio_path, sample_rate=SAMPLE_RATE, start_seconds=0.0):
+    """Decode any container ffmpeg understands to mono float32 PCM in [-1, 1].
+
+    start_seconds skips the beginning: the demuxer seeks there, so only the rest is decoded.
+    """
+    seek = ['-ss', f"{start_seconds:.3f}"] if start_seconds > 0 else []
+    cmd = [
+        'ffmpeg', '-nostdin', '-threads', '0', *seek, '-i', audio_path,
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), '-',
+    ]
+    start = time.perf_counter()
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    audio = np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+    metrics.record_timing('audio.decode_seconds', time.perf_counter() - start)
+    return audio
+
+
+def trim_silence(audio, threshold_db=None, sample_rate=SAMPLE_RATE):
+    """Cut leading/trailing frames whose RMS energy is below threshold_db (dBFS)"""
+    threshold_db = Config.STT_SILENCE_THRESHOLD_DB if threshold_db is None else threshold_db
+    frame_len = int(sample_rate * FRAME_MS / 1000)
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return audio
+
+    start = time.perf_counter()
+    frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    voiced = np.flatnonzero(20 * np.log10(rms) > threshold_db)
+    if len(voiced) == 0:
+        trimmed = audio[:0]
+    else:
+        pad = int(sample_rate * PAD_MS / 1000)
+        begin = max(0, voiced[0] * frame_len - pad)
+        end = min(len(audio), (voiced[-1] + 1) * frame_len + pad)
+        trimmed = audio[begin:end]
+
+    metrics.record_timing('audio.trim_seconds', time.perf_counter() - start)
+    metrics.increment('audio.silence_trimmed_seconds', (len(audio) - len(trimmed)) / sample_rate)
+    return trimmed
+
+
+def preprocess_audio(audio_path, use_cache=True):
+    """Return 16 kHz mono float32 audio with silence trimmed, cached as .npy"""
+    npy_path = cache_path(audio_path)
+    if use_cache and os.path.exists(npy_path) \
+            and os.path.getmtime(npy_path) >= os.path.getmtime(audio_path):
+        metrics.increment('audio.cache_hits')
+        # Copy-on-write mmap: tanpa copy ke RAM, tapi tetap writable untuk torch.from_numpy
+        return np.load(npy_path, mmap_mode='c')
+
+    metrics.increment('audio.cache_misses')
+    audio = trim_silence(decode_audio(audio_path))
+    if use_cache:
+        tmp_path = f"{npy_path}.tmp.npy"
+        np.save(tmp_path, audio)
+        os.replace(tmp_path, npy_path)
+    return audio
+
+
+def remove_cache(audio_path):
+    try:
+        os.remove(cache_path(audio_path))
+    except FileNotFoundError:
+        pass
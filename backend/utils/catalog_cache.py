@@ -0,0 +1,178 @@
+"""Cache read-through untuk katalog role dan pertanyaan.
+
+Katalog jarang berubah tapi dibaca setiap kali kandidat memulai interview.
+Response JSON disimpan sudah ter-serialize beserta ETag-nya, jadi request
+berikutnya dilayani dari memori tanpa query ke MySQL.
+
+Tier cache:
+- in-memory per proses dengan TTL (CATALOG_CACHE_TTL) sebagai jaring pengaman
+- Redis (opsional, CATALOG_CACHE_REDIS=true): payload dipakai bersama antar
+  proses, dan counter versi `catalog:version` membuat invalidasi di satu
+  proses langsung terlihat di proses lain
+
+Invalidasi otomatis lewat event SQLAlchemy: commit yang menyentuh Role atau
+Question (termasuk bulk update/delete) mengosongkan cache.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import Config
+from models.role import Role
+from models.question import Question
+from utils.metrics import metrics
+
+CATALOG_MODELS = (Role, Question)
+ROLES_KEY = 'roles'
+VERSION_KEY = 'catalog:version'
+SESSION_ROLE_MAX_ENTRIES = 10000
+
+
+def questions_key(role_id):
+    return f"questions:{role_id}"
+
+
+class CatalogCache:
+    """Thread-safe cache of serialized catalog responses, keyed by name"""
+
+    def __init__(self, ttl=None, redis_client=None):
+        self.ttl = Config.CATALOG_CACHE_TTL if ttl is None else ttl
+        self.redis = redis_client
+        self._entries = {}  # key -> (expires_at, version, body, etag)
+        self._generation = 0
+        self._lock = threading.Lock()
+        # role_id sebuah sesi tidak pernah berubah, jadi aman di-cache tanpa invalidasi
+        self._session_roles = OrderedDict()  # (session_id, user_id) -> role_id
+
+    def _shared_version(self):
+        if self.redis is None:
+            return None
+        try:
+            return int(self.redis.get(VERSION_KEY) or 0)
+        except Exception as e:
+            print(f"⚠️ Catalog cache Redis unavailable: {e}")
+            return None
+
+    def get_or_load(self, key, loader):
+        """Return (body, etag) for key; loader() builds the JSON data and only runs on a miss"""
+        version = self._shared_version()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+        if entry is not None and entry[0] > now and entry[1] == version:
+            metrics.increment('catalog_cache.hits')
+            return entry[2], entry[3]
+
+        body = None
+        if version is not None:
+            try:
+                body = self.redis.get(f"catalog:{version}:{key}")
+            except Exception as e:
+                print(f"⚠️ Catalog cache Redis unavailable: {e}")
+        if body is None:
+            metrics.increment('catalog_cache.misses')
+            body = json.dumps(loader(), ensure_ascii=False).encode('utf-8')
+            if version is not None:
+                try:
+                    self.redis.set(f"catalog:{version}:{key}", body, ex=self.ttl)
+                except Exception as e:
+                    print(f"⚠️ Catalog cache Redis unavailable: {e}")
+
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            # Hasil load yang bersamaan dengan invalidasi bisa sudah basi, jangan disimpan
+            if self._generation == generation:
+                self._entries[key] = (now + self.ttl, version, body, etag)
+        return body, etag
+
+    def session_role(self, session_id, user_id, loader):
+        """role_id of a session owned by user_id, or None; loader() queries it on a miss"""
+        cache_key = (session_id, str(user_id))
+        with self._lock:
+            role_id = self._session_roles.get(cache_key)
+            if role_id is not None:
+                self._session_roles.move_to_end(cache_key)
+                return role_id
+        role_id = loader()
+        if role_id is not None:
+            with self._lock:
+                self._session_roles[cache_key] = role_id
+                while len(self._session_roles) > SESSION_ROLE_MAX_ENTRIES:
+                    self._session_roles.popitem(last=False)
+        return role_id
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+        if self.redis is not None:
+            try:
+                self.redis.incr(VERSION_KEY)
+            except Exception as e:
+                print(f"⚠️ Catalog cache Redis unavailable: {e}")
+        metrics.increment('catalog_cache.invalidations')
+        print("🗂️ Catalog cache invalidated")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_catalog_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                redis_client = None
+                if Config.CATALOG_CACHE_REDIS:
+                    import redis
+                    redis_client = redis.Redis.from_url(Config.REDIS_URL)
+                _cache = CatalogCache(redis_client=redis_client)
+    return _cache
+
+
+def _is_catalog_mapper(mapper):
+    return mapper is not None and issubclass(mapper.class_, CATALOG_MODELS)
+
+
+def _mark_catalog_changes(session, flush_context):
+    # Setelah flush, new/dirty/deleted masih berisi state sebelum flush
+    if any(isinstance(obj, CATALOG_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['catalog_dirty'] = True
+
+
+def _mark_bulk_catalog_changes(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            _is_catalog_mapper(orm_execute_state.bind_mapper):
+        orm_execute_state.session.info['catalog_dirty'] = True
+
+
+def _invalidate_after_commit(session):
+    if session.info.pop('catalog_dirty', False):
+        get_catalog_cache().invalidate()
+
+
+def _forget_after_rollback(session):
+    session.info.pop('catalog_dirty', None)
+
+
+_installed = False
+
+
+def install_catalog_invalidation():
+    """Register the SQLAlchemy session listeners that clear the catalog cache (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Session, 'after_flush', _mark_catalog_changes)
+    event.listen(Session, 'do_orm_execute', _mark_bulk_catalog_changes)
+    event.listen(Session, 'after_commit', _invalidate_after_commit)
+    event.listen(Session, 'after_rollback', _forget_after_rollback)
+    _installed = True
@@ -0,0 +1,115 @@
+"""Relay event progres pemrosesan (worker -> web) lewat Redis pub/sub.
+
+Worker mem-publish transisi stage (stt_started, transcript_ready,
+feedback_started, feedback_token, feedback_done, failed) ke channel per
+jawaban dan per sesi. Endpoint SSE di proses web subscribe ke channel itu,
+jadi client tidak perlu polling dashboard/answers/<id>.
+
+Event bersifat best-effort: kalau Redis tidak tersedia, pemrosesan tetap
+jalan dan client bisa fallback ke GET biasa.
+"""
+import json
+import threading
+import time
+
+from config import Config
+from utils.metrics import metrics
+
+TERMINAL_EVENTS = ('feedback_done', 'failed')
+
+
+def answer_scores(answer):
+    """Feedback fields sent with feedback_done (works for Answer or any object with the same fields)"""
+    return {
+        'summary': answer.summary,
+        'clarity_score': answer.clarity_score,
+        'structure_score': answer.structure_score,
+        'keyword_score': answer.keyword_score,
+        'confidence_score': answer.confidence_score,
+    }
+
+
+def answer_channel(answer_id):
+    return f"events:answer:{answer_id}"
+
+
+def session_channel(session_id):
+    return f"events:session:{session_id}"
+
+
+class RedisEventRelay:
+    def __init__(self, url=None):
+        import redis
+        self.client = redis.Redis.from_url(url or Config.REDIS_URL)
+        self._warned_at = 0
+
+    def publish(self, answer_id, session_id, event, **data):
+        payload = json.dumps({'event': event, 'answer_id': answer_id, 'session_id': session_id, **data},
+                             ensure_ascii=False)
+        try:
+            self.client.publish(answer_channel(answer_id), payload)
+            if session_id:
+                self.client.publish(session_channel(session_id), payload)
+            metrics.increment('events.published')
+        except Exception as e:
+            # Jangan spam log tiap token kalau Redis mati
+            if time.time() - self._warned_at > 60:
+                print(f"⚠️ Event relay unavailable: {e}")
+                self._warned_at = time.time()
+
+    def subscribe(self, channels):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*channels)
+        return pubsub
+
+
+class NullEventRelay:
+    def publish(self, answer_id, session_id, event, **data):
+        pass
+
+    def subscribe(self, channels):
+        return None
+
+
+class TokenStreamer:
+    """Collects completion deltas and publishes them as feedback_token events.
+
+    Deltas are coalesced and flushed at most every EVENTS_TOKEN_FLUSH_MS so a
+    long completion does not turn into hundreds of tiny pub/sub messages.
+    """
+
+    def __init__(self, answer_id, session_id, relay=None):
+        self.answer_id = answer_id
+        self.session_id = session_id
+        self.relay = relay or get_event_relay()
+        self.interval = Config.EVENTS_TOKEN_FLUSH_MS / 1000
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def __call__(self, delta):
+        self._buffer.append(delta)
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.relay.publish(self.answer_id, self.session_id, 'feedback_token', text=''.join(self._buffer))
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+
+_relay = None
+_relay_lock = threading.Lock()
+
+
+def get_event_relay():
+    global _relay
+    if _relay is None:
+        with _relay_lock:
+            if _relay is None:
+                _relay = RedisEventRelay() if Config.EVENTS_BACKEND == 'redis' else NullEventRelay()
+    return _relay
+
+
+def publish_event(answer_id, session_id, event, **data):
+    get_event_relay().publish(answer_id, session_id, event, **data)
@@ -0,0 +1,81 @@
+"""Penyimpanan state identitas wajah per sesi interview.
+
+State berisi encoding referensi (dari frame bagus pertama, ditambah beberapa
+frame yang cocok), kotak wajah dan hasil match terakhir. Disimpan sebagai
+dict JSON-serializable supaya backend memory dan Redis isinya sama.
+
+Backend (FACE_STORE_BACKEND):
+- memory: LRU per proses web, dibatasi FACE_STORE_MAX_SESSIONS
+- redis: dipakai bersama antar proses web
+Keduanya memakai TTL FACE_STORE_TTL, diperpanjang setiap kali state ditulis.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+
+def _key(session_id):
+    return f"face:session:{session_id}"
+
+
+class MemoryFaceStore:
+    def __init__(self, max_sessions=None, ttl=None):
+        self.max_sessions = max_sessions or Config.FACE_STORE_MAX_SESSIONS
+        self.ttl = ttl or Config.FACE_STORE_TTL
+        self._entries = OrderedDict()  # session_id -> (expires_at, state)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[1]
+
+    def set(self, session_id, state):
+        with self._lock:
+            self._entries[session_id] = (time.time() + self.ttl, state)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+class RedisFaceStore:
+    def __init__(self, url=None, ttl=None):
+        import redis
+        self.client = redis.Redis.from_url(url or Config.REDIS_URL)
+        self.ttl = ttl or Config.FACE_STORE_TTL
+
+    def get(self, session_id):
+        value = self.client.get(_key(session_id))
+        return json.loads(value) if value is not None else None
+
+    def set(self, session_id, state):
+        self.client.set(_key(session_id), json.dumps(state), ex=self.ttl)
+
+    def delete(self, session_id):
+        self.client.delete(_key(session_id))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_face_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RedisFaceStore() if Config.FACE_STORE_BACKEND == 'redis' else MemoryFaceStore()
+    return _store
@@ -0,0 +1,209 @@
+"""Helper chat completion dengan cache + single-flight.
+
+Key cache = hash dari model, messages dan parameter (max_tokens,
+temperature, ...). Pesan yang di-redeliver atau transkrip yang identik
+langsung dapat jawaban dari cache, dan request identik yang berjalan
+bersamaan hanya memicu satu panggilan upstream (yang lain menunggu hasilnya).
+
+Tier cache:
+- in-memory LRU + TTL per proses (selalu aktif kecuali LLM_CACHE_TTL=0)
+- Redis (opsional, LLM_CACHE_REDIS=true) supaya dipakai bersama antar worker
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import openai
+
+from config import Config
+from utils.metrics import metrics
+
+
+def completion_cache_key(model, messages, **params):
+    payload = json.dumps({'model': model, 'messages': messages, 'params': params},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CompletionCache:
+    """Thread-safe LRU cache with per-entry TTL and single-flight deduplication"""
+
+    def __init__(self, max_entries=None, ttl=None, redis_client=None):
+        self.max_entries = max_entries or Config.LLM_CACHE_MAX_ENTRIES
+        self.ttl = Config.LLM_CACHE_TTL if ttl is None else ttl
+        self.redis = redis_client
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> concurrent Future
+        self._in_flight_async = {}  # key -> asyncio Future (per event loop thread)
+        self.stats = {'hits': 0, 'misses': 0, 'shared': 0, 'evictions': 0}
+
+    def _count(self, name):
+        # Dipanggil dengan self._lock dipegang: stats dipakai bersama thread worker dan executor async
+        self.stats[name] += 1
+        metrics.increment(f'llm_cache.{name}')
+
+    def get(self, key):
+        if not self.ttl:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self._count('hits')
+                    return value
+                del self._entries[key]
+        if self.redis is not None:
+            try:
+                value = self.redis.get(f"llm:{key}")
+            except Exception as e:
+                print(f"⚠️ LLM cache Redis unavailable: {e}")
+                value = None
+            if value is not None:
+                value = value.decode('utf-8')
+                self._set_local(key, value, count='hits')
+                return value
+        return None
+
+    def _set_local(self, key, value, count=None):
+        with self._lock:
+            if count:
+                self._count(count)
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count('evictions')
+
+    def set(self, key, value):
+        if not self.ttl:
+            return
+        self._set_local(key, value)
+        if self.redis is not None:
+            try:
+                self.redis.set(f"llm:{key}", value, ex=self.ttl)
+            except Exception as e:
+                print(f"⚠️ LLM cache Redis unavailable: {e}")
+
+    def get_or_create(self, key, create):
+        """Return the cached value or call create() once, sharing it with concurrent callers"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            self._count('misses' if owner else 'shared')
+        if not owner:
+            return future.result()
+
+        try:
+            value = create()
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    async def get_or_create_async(self, key, create):
+        """Async variant of get_or_create; create is a coroutine function"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        future = self._in_flight_async.get(key)
+        if future is not None:
+            with self._lock:
+                self._count('shared')
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight_async[key] = future
+        with self._lock:
+            self._count('misses')
+        try:
+            value = await create()
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # tandai sudah diambil kalau tidak ada yang menunggu
+            raise
+        finally:
+            self._in_flight_async.pop(key, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                redis_client = None
+                if Config.LLM_CACHE_REDIS:
+                    import redis
+                    redis_client = redis.Redis.from_url(Config.REDIS_URL)
+                _cache = CompletionCache(redis_client=redis_client)
+    return _cache
+
+
+def chat_completion(model, messages, **params):
+    """Cached, deduplicated openai.ChatCompletion.create; returns the message content"""
+    key = completion_cache_key(model, messages, **params)
+
+    def create():
+        openai.api_key = Config.OPENAI_API_KEY
+        with metrics.timer('llm.completion_seconds'):
+            response = openai.ChatCompletion.create(model=model, messages=messages, **params)
+        return response.choices[0].message.content
+
+    return get_completion_cache().get_or_create(key, create)
+
+
+def stream_chat_completion(model, messages, on_delta, **params):
+    """chat_completion that passes content deltas to on_delta while they are generated.
+
+    Cache hits and results shared from an identical in-flight request arrive
+    as a single delta with the whole content.
+    """
+    key = completion_cache_key(model, messages, **params)
+    streamed = []
+
+    def create():
+        openai.api_key = Config.OPENAI_API_KEY
+        parts = []
+        start = time.perf_counter()
+        with metrics.timer('llm.completion_seconds'):
+            for chunk in openai.ChatCompletion.create(model=model, messages=messages, stream=True, **params):
+                delta = chunk['choices'][0]['delta'].get('content')
+                if not delta:
+                    continue
+                if not parts:
+                    metrics.record_timing('llm.first_token_seconds', time.perf_counter() - start)
+                parts.append(delta)
+                on_delta(delta)
+        streamed.append(True)
+        return ''.join(parts)
+
+    content = get_completion_cache().get_or_create(key, create)
+    if not streamed:
+        on_delta(content)
+    return content
@@ -0,0 +1,54 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Metrics sederhana in-process (counter + timing) untuk worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.timings = {}
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_timing(self, name, seconds):
+        with self._lock:
+            stat = self.timings.setdefault(name, {
+                'count': 0, 'total': 0.0, 'min': None, 'max': 0.0, 'last': 0.0
+            })
+            stat['count'] += 1
+            stat['total'] += seconds
+            stat['last'] = seconds
+            stat['max'] = max(stat['max'], seconds)
+            stat['min'] = seconds if stat['min'] is None else min(stat['min'], seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_timing(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            timings = {}
+            for name, stat in self.timings.items():
+                timings[name] = dict(stat, avg=stat['total'] / stat['count'])
+            return {'counters': dict(self.counters), 'timings': timings}
+
+    def log_summary(self, prefix=""):
+        snap = self.snapshot()
+        for name, stat in sorted(snap['timings'].items()):
+            print(f"📊 {prefix}{name}: count={stat['count']} avg={stat['avg']:.3f}s "
+                  f"last={stat['last']:.3f}s max={stat['max']:.3f}s")
+        for name, value in sorted(snap['counters'].items()):
+            print(f"📊 {prefix}{name}: {value}")
+
+
+# Global instance
+metrics = Metrics()
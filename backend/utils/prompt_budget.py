@@ -0,0 +1,160 @@
+"""Budget token untuk prompt LLM.
+
+Token dihitung lokal dengan tiktoken (sudah ikut terinstall bersama
+openai-whisper); kalau tidak tersedia dipakai estimasi ~4 karakter/token.
+Transkrip panjang dikompres dulu (buang filler, kata/kalimat yang diulang)
+sebelum dipotong, dan jumlah token masuk/keluar per jawaban dicatat untuk
+capacity planning.
+"""
+import re
+import threading
+
+from utils.metrics import metrics
+
+# (context window, max output tokens) per model
+MODEL_LIMITS = {
+    'gpt-3.5-turbo': (16385, 4096),
+    'gpt-4o': (128000, 16384),
+}
+DEFAULT_LIMITS = (8192, 4096)
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " [...] "
+
+# Filler / disfluency umum di jawaban lisan (ID + EN)
+FILLER_RE = re.compile(
+    r"\b(?:e+h+m*|e+m+|h+m+|u+h+m*|u+m+|e+r+m+|anu|apa namanya|apa ya)\b[,.]?\s*",
+    re.IGNORECASE)
+REPEATED_WORD_RE = re.compile(r"\b(\w+)(?:\s+\1\b)+", re.IGNORECASE)
+# Menutupi seluruh teks (termasuk tanda baca di awal), jadi memecah per kalimat tidak membuang apa pun
+SENTENCE_RE = re.compile(r"[^.!?]*[.!?]+|[^.!?]+")
+WHITESPACE_RE = re.compile(r"\s+")
+NORMALIZE_RE = re.compile(r"[^\w\s]")
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def _get_encoder(model):
+    with _encoders_lock:
+        if model not in _encoders:
+            try:
+                import tiktoken
+                try:
+                    _encoders[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encoders[model] = tiktoken.get_encoding('cl100k_base')
+            except ImportError:
+                print("⚠️ tiktoken not installed, estimating tokens from characters")
+                _encoders[model] = None
+        return _encoders[model]
+
+
+def count_tokens(text, model):
+    encoder = _get_encoder(model)
+    if encoder is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoder.encode(text))
+
+
+def count_message_tokens(messages, model):
+    # ~4 token overhead per pesan untuk role/format chat
+    return sum(count_tokens(message['content'], model) + 4 for message in messages) + 2
+
+
+def output_limit(model):
+    return MODEL_LIMITS.get(model, DEFAULT_LIMITS)[1]
+
+
+def input_budget(model, configured, max_output):
+    """Configured input budget, capped so prompt + completion fit the model context"""
+    context = MODEL_LIMITS.get(model, DEFAULT_LIMITS)[0]
+    return min(configured, context - max_output)
+
+
+def compress_transcript(text):
+    """Remove fillers, stuttered words and repeated sentences without rewording anything"""
+    text = FILLER_RE.sub('', text)
+    text = REPEATED_WORD_RE.sub(r'\1', text)
+
+    seen = set()
+    sentences = []
+    for sentence in SENTENCE_RE.findall(text):
+        sentence = sentence.strip()
+        key = WHITESPACE_RE.sub(' ', NORMALIZE_RE.sub('', sentence.lower())).strip()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        sentences.append(sentence)
+    return WHITESPACE_RE.sub(' ', ' '.join(sentences)).strip()
+
+
+def truncate_to_tokens(text, max_tokens, model):
+    """Keep the start and the end of text (2/3 head, 1/3 tail) within max_tokens"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    marker_tokens = count_tokens(TRUNCATION_MARKER, model)
+    head_tokens = max(1, (max_tokens - marker_tokens) * 2 // 3)
+    tail_tokens = max(1, max_tokens - marker_tokens - head_tokens)
+
+    encoder = _get_encoder(model)
+    if encoder is None:
+        head = text[:head_tokens * CHARS_PER_TOKEN]
+        tail = text[-tail_tokens * CHARS_PER_TOKEN:]
+    else:
+        tokens = encoder.encode(text)
+        head = encoder.decode(tokens[:head_tokens])
+        tail = encoder.decode(tokens[-tail_tokens:])
+    return head + TRUNCATION_MARKER + tail
+
+
+def fit_transcript(text, model, max_tokens):
+    """Compress, then truncate if needed, so the transcript fits max_tokens"""
+    before = count_tokens(text, model)
+    if before <= max_tokens:
+        return text
+    compressed = compress_transcript(text)
+    after = count_tokens(compressed, model)
+    metrics.increment('llm.tokens_saved_by_compression', before - after)
+    if after > max_tokens:
+        metrics.increment('llm.transcripts_truncated')
+        compressed = truncate_to_tokens(compressed, max_tokens, model)
+    return compressed
+
+
+def _split_by_tokens(text, max_tokens, model):
+    encoder = _get_encoder(model)
+    if encoder is None:
+        size = max_tokens * CHARS_PER_TOKEN
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    tokens = encoder.encode(text)
+    return [encoder.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def split_to_token_chunks(text, model, max_tokens):
+    """Split text at sentence boundaries into chunks of at most max_tokens (nothing is dropped)"""
+    chunks = []
+    current, current_tokens = [], 0
+    for sentence in SENTENCE_RE.findall(text):
+        tokens = count_tokens(sentence, model)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(''.join(current).strip())
+            current, current_tokens = [], 0
+        if tokens > max_tokens:
+            # Kalimat tanpa tanda baca yang lebih panjang dari budget dipecah per token
+            chunks.extend(_split_by_tokens(sentence, max_tokens, model))
+            continue
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append(''.join(current).strip())
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def log_token_usage(stage, subject, model, tokens_in, tokens_out):
+    """Count and print token usage; subject is e.g. 'answer 12' or 'session 3'"""
+    metrics.increment('llm.tokens_in', tokens_in)
+    metrics.increment('llm.tokens_out', tokens_out)
+    metrics.increment(f'llm.{stage}.tokens_in', tokens_in)
+    metrics.increment(f'llm.{stage}.tokens_out', tokens_out)
+    print(f"📏 [{stage}] {subject} ({model}): {tokens_in} tokens in, {tokens_out} tokens out")
+
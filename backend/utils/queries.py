@@ -0,0 +1,62 @@
+"""Query layer untuk endpoint API.
+
+Relationship di model dibiarkan lazy=True; endpoint mengambil data lewat
+fungsi di sini yang menuliskan strategi loading-nya secara eksplisit
+(joinedload untuk many-to-one, selectinload untuk koleksi), supaya jumlah
+query per request tetap dan tidak ikut bertambah dengan jumlah baris.
+
+Lookup berdasarkan primary key memakai Session.get: objek yang sudah
+dimuat di request yang sama diambil dari identity map tanpa query baru.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+
+from extensions import db
+from models.answer import Answer
+from models.session import InterviewSession
+
+
+def _owned_by(session, user_id):
+    # Identity JWT berupa string, kolom user_id integer
+    return session is not None and str(session.user_id) == str(user_id)
+
+
+def _to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_user_session(session_id, user_id):
+    """Session by id if it belongs to user_id, else None (identity map first)"""
+    session_id = _to_id(session_id)
+    if session_id is None:
+        return None
+    session = db.session.get(InterviewSession, session_id)
+    return session if _owned_by(session, user_id) else None
+
+
+def get_user_session_with_answers(session_id, user_id):
+    """Session plus its answers in two queries (selectinload), or None"""
+    session_id = _to_id(session_id)
+    if session_id is None:
+        return None
+    session = db.session.get(InterviewSession, session_id,
+                             options=[selectinload(InterviewSession.answers)])
+    return session if _owned_by(session, user_id) else None
+
+
+def get_user_answer(answer_id, user_id, with_question=False):
+    """Answer by id if its session belongs to user_id, else None.
+
+    The session (and the question when asked for) are joined into the same
+    query, so the ownership check and serialization need no extra round trip.
+    """
+    answer_id = _to_id(answer_id)
+    if answer_id is None:
+        return None
+    options = [joinedload(Answer.session)]
+    if with_question:
+        options.append(joinedload(Answer.question))
+    answer = db.session.get(Answer, answer_id, options=options)
+    return answer if answer is not None and _owned_by(answer.session, user_id) else None
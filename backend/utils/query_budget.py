@@ -0,0 +1,81 @@
+"""Hitung query SQL per request dan batasi jumlahnya per endpoint.
+
+install_query_counter() memasang listener engine yang menghitung query di
+app context yang sedang aktif. Endpoint dengan @query_budget(n) dicek setelah
+view selesai: normalnya pelanggaran hanya dicatat (log + metric), dengan
+QUERY_BUDGET_STRICT=true melempar QueryBudgetExceeded supaya test suite
+langsung gagal. Untuk test juga ada context manager count_queries().
+"""
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+from utils.metrics import metrics
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+_installed = False
+
+
+def install_query_counter():
+    """Register the engine listener that counts queries per app context (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _count_query)
+    _installed = True
+
+
+def queries_so_far():
+    return g.get('query_count', 0)
+
+
+def query_budget(max_queries):
+    """Fail (strict mode) or warn when the view runs more than max_queries queries"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            start = queries_so_far()
+            result = view(*args, **kwargs)
+            used = queries_so_far() - start
+            if used > max_queries:
+                message = f"{request.endpoint} ran {used} queries (budget {max_queries})"
+                metrics.increment('db.query_budget_exceeded')
+                if Config.QUERY_BUDGET_STRICT:
+                    raise QueryBudgetExceeded(message)
+                print(f"⚠️ {message}")
+            return result
+        return wrapper
+    return decorator
+
+
+class QueryCount:
+    def __init__(self):
+        self.count = 0
+
+
+@contextmanager
+def count_queries():
+    """Count queries run inside the block, e.g. `with count_queries() as c: client.get(...)`"""
+    counter = QueryCount()
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter.count += 1
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
@@ -1,80 +1,260 @@
 import pika
 import json
 import threading
+import uuid
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from config import Config
 import time
 import os
 import dotenv
+
+SESSION_FEEDBACK_DEBOUNCE_QUEUE = 'session_feedback.debounce'
+QUEUES = ('stt_processing', 'stt_incremental', 'feedback_analysis',
+          'session_feedback', SESSION_FEEDBACK_DEBOUNCE_QUEUE)
+# Pesan di debounce queue kedaluwarsa setelah window debounce lalu di-dead-letter
+# ke session_feedback. Argumen queue harus sama di publisher dan consumer; kalau
+# FEEDBACK_SESSION_DEBOUNCE_SECONDS diubah, queue lama harus dihapus dulu.
+QUEUE_ARGUMENTS = {
+    SESSION_FEEDBACK_DEBOUNCE_QUEUE: {
+        'x-message-ttl': Config.FEEDBACK_SESSION_DEBOUNCE_SECONDS * 1000,
+        'x-dead-letter-exchange': '',
+        'x-dead-letter-routing-key': 'session_feedback',
+    },
+}
+RECONNECT_BACKOFF_MIN = 1
+RECONNECT_BACKOFF_MAX = 30
+
+
+class MessageUnconfirmed(Exception):
+    """Sent to the broker but not confirmed in time; the message may still be delivered"""
+    pass
+
+
 class RabbitMQHandler:
-    def __init__(self):
+    """Publisher RabbitMQ dengan satu thread I/O khusus.
+
+    pika tidak thread-safe, jadi hanya thread publisher yang menyentuh
+    connection/channel. Thread lain (request Flask, callback consumer) cukup
+    menaruh pesan di antrian dan membangunkan ioloop, sehingga publish tidak
+    perlu handshake koneksi. Channel memakai publisher confirms; broker
+    mengirim confirm per batch (multiple=True) saat beban tinggi.
+    """
+
+    def __init__(self, url=None):
+        self.url = url
         self.connection = None
         self.channel = None
-        self.connect()
-    
-    def connect(self):
-        
-        try:
-            url = LOADOTENV_RABBITMQ_URL = os.getenv('RABBITMQ_URL')
-            print("Connecting with URL:", url)
+        self._pending = deque()
+        self._unconfirmed = {}
+        self._delivery_tag = 0
+        self._ready = False
+        self._was_ready = False
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
 
-            parameters = pika.URLParameters(url)
-            print(parameters)
-            parameters.heartbeat = 600
-            parameters.blocked_connection_timeout = 300
+    # --- API publik ---
 
-            self.connection = pika.BlockingConnection(parameters)
-            self.channel = self.connection.channel()
+    def publish_message(self, queue_name, message, wait_for_confirm=False, timeout=10):
+        """Publish message to queue.
 
-            # Declare queues
-            self.channel.queue_declare(queue='stt_processing', durable=True)
-            self.channel.queue_declare(queue='feedback_analysis', durable=True)
+        Returns a Future that resolves once the broker confirms the message.
+        With wait_for_confirm=True the call blocks until then (or raises).
+        On timeout a message that was not sent yet is cancelled and a
+        TimeoutError is raised; one already sent raises MessageUnconfirmed.
+        """
+        self._ensure_started()
+        future = Future()
+        # message_id dibuat sekali di sini, jadi publish ulang setelah reconnect tetap bisa di-dedup consumer
+        self._pending.append((queue_name, json.dumps(message), uuid.uuid4().hex, future))
+        self._wake()
+        if wait_for_confirm:
+            try:
+                future.result(timeout=timeout)
+            except FutureTimeout:
+                # Masih di _pending: dibatalkan supaya tidak ikut terkirim setelah reconnect
+                if future.cancel():
+                    raise
+                raise MessageUnconfirmed(f"Message to {queue_name} sent but not confirmed") from None
+        return future
 
-            print("RabbitMQ connection established")
-        except Exception as e:
-            print(f"Failed to connect to RabbitMQ: {e}")
-            raise
+    def close_connection(self):
+        """Flush pending messages and close RabbitMQ connection"""
+        self._stopping = True
+        connection = self.connection
+        if connection is not None and connection.is_open and self._thread.is_alive():
+            try:
+                connection.ioloop.add_callback_threadsafe(self._close)
+            except Exception as e:
+                print(f"Error closing connection: {e}")
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+        print("RabbitMQ connection closed")
 
-    
-    def publish_message(self, queue_name, message):
-        """Publish message to queue"""
-        try:
-            if not self.connection or self.connection.is_closed:
-                self.connect()
-            
-            self.channel.basic_publish(
-                exchange='',
-                routing_key=queue_name,
-                body=json.dumps(message),
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # make message persistent
+    # --- thread publisher ---
+
+    def _ensure_started(self):
+        # Setelah fork (gunicorn, multiprocessing) thread milik parent tidak ikut,
+        # jadi tiap proses menjalankan thread publisher-nya sendiri.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._pending.clear()
+                self._unconfirmed = {}
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='rabbitmq-publisher', daemon=True)
+            self._thread.start()
+
+    def _parameters(self):
+        url = self.url or os.getenv('RABBITMQ_URL')
+        parameters = pika.URLParameters(url)
+        parameters.heartbeat = 600
+        parameters.blocked_connection_timeout = 300
+        return parameters
+
+    def _run(self):
+        backoff = RECONNECT_BACKOFF_MIN
+        while not self._stopping:
+            self._was_ready = False
+            try:
+                self.connection = pika.SelectConnection(
+                    self._parameters(),
+                    on_open_callback=self._on_connection_open,
+                    on_open_error_callback=self._on_connection_error,
+                    on_close_callback=self._on_connection_closed,
                 )
-            )
-            print(f"Message published to {queue_name}")
-            
-        except Exception as e:
-            print(f"Failed to publish message: {e}")
-            # Try to reconnect and retry
+                self.connection.ioloop.start()
+            except Exception as e:
+                print(f"Failed to connect to RabbitMQ: {e}")
+
+            if self._was_ready:
+                backoff = RECONNECT_BACKOFF_MIN
+            if self._stopping:
+                break
+            print(f"RabbitMQ publisher reconnecting in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error):
+        print(f"Failed to connect to RabbitMQ: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        self._ready = False
+        self.channel = None
+        # Pesan yang belum di-confirm dikirim ulang setelah reconnect (at-least-once)
+        for tag in sorted(self._unconfirmed, reverse=True):
+            self._pending.appendleft(self._unconfirmed[tag])
+        self._unconfirmed = {}
+        if not self._stopping:
+            print(f"RabbitMQ connection closed: {reason}")
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        self.channel = channel
+        self._delivery_tag = 0
+        self._declare_queues(list(QUEUES))
+
+    def _declare_queues(self, queues):
+        if not queues:
+            self.channel.confirm_delivery(ack_nack_callback=self._on_confirm,
+                                          callback=self._on_confirm_mode)
+            return
+        queue = queues.pop(0)
+        self.channel.queue_declare(queue=queue, durable=True, arguments=QUEUE_ARGUMENTS.get(queue),
+                                   callback=lambda frame: self._declare_queues(queues))
+
+    def _on_confirm_mode(self, frame):
+        self._ready = True
+        self._was_ready = True
+        print("RabbitMQ connection established")
+        self._drain()
+
+    def _wake(self):
+        connection = self.connection
+        if connection is None or not self._ready:
+            return  # akan di-drain saat channel siap
+        try:
+            connection.ioloop.add_callback_threadsafe(self._drain)
+        except Exception:
+            pass  # koneksi sedang reconnect; pesan tetap di _pending
+
+    def _drain(self):
+        while self._ready and self._pending:
+            queue_name, body, message_id, future = self._pending.popleft()
+            # Future RUNNING = sudah pernah dikirim (publish ulang setelah reconnect); setelah ini tidak bisa dibatalkan
+            if not future.running() and not future.set_running_or_notify_cancel():
+                continue  # dibatalkan oleh publisher yang timeout
             try:
-                self.connect()
                 self.channel.basic_publish(
                     exchange='',
                     routing_key=queue_name,
-                    body=json.dumps(message),
+                    body=body,
                     properties=pika.BasicProperties(
-                        delivery_mode=2,
+                        delivery_mode=2,  # make message persistent
+                        message_id=message_id,
                     )
                 )
-            except Exception as retry_error:
-                print(f"Retry failed: {retry_error}")
-    
-    def close_connection(self):
-        """Close RabbitMQ connection"""
-        try:
-            if self.connection and not self.connection.is_closed:
-                self.connection.close()
-                print("RabbitMQ connection closed")
-        except Exception as e:
-            print(f"Error closing connection: {e}")
-
-# Global instance
-rabbitmq_handler = RabbitMQHandler()
\ No newline at end of file
+            except Exception as e:
+                print(f"Failed to publish message: {e}")
+                self._pending.appendleft((queue_name, body, message_id, future))
+                return
+            self._delivery_tag += 1
+            self._unconfirmed[self._delivery_tag] = (queue_name, body, message_id, future)
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        if method.multiple:
+            tags = [tag for tag in self._unconfirmed if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+
+        for tag in tags:
+            item = self._unconfirmed.pop(tag, None)
+            if item is None:
+                continue
+            queue_name, body, message_id, future = item
+            if acked:
+                future.set_result(True)
+            else:
+                print(f"Broker rejected message to {queue_name}")
+                future.set_exception(RuntimeError(f"Message to {queue_name} was nacked by broker"))
+
+    def _close(self, deadline=None):
+        # Tunggu pesan yang tersisa ter-confirm sebelum menutup koneksi
+        deadline = deadline or time.monotonic() + 5
+        self._drain()
+        if (self._pending or self._unconfirmed) and time.monotonic() < deadline:
+            self.connection.ioloop.call_later(0.05, lambda: self._close(deadline))
+            return
+        if self.connection is not None and self.connection.is_open:
+            self.connection.close()
+
+
+# Global instance (koneksi dibuka saat publish pertama)
+rabbitmq_handler = RabbitMQHandler()
+
+
+def publish_session_feedback(session_id, force=False, timeout=10):
+    """Queue batch feedback for a session and wait for the broker confirm.
+
+    force=False goes through the debounce queue; force=True (session
+    completed) goes straight to session_feedback.
+    """
+    message = {
+        'session_id': session_id,
+        'force': force,
+        'timestamp': time.time()
+    }
+    queue = 'session_feedback' if force else SESSION_FEEDBACK_DEBOUNCE_QUEUE
+    rabbitmq_handler.publish_message(queue, message, wait_for_confirm=True, timeout=timeout)
@@ -0,0 +1,90 @@
+"""Stub server OpenAI-compatible /v1/chat/completions untuk testing lokal.
+
+Membalas feedback JSON dengan skema yang sama seperti GPT setelah delay tertentu,
+sehingga throughput async consumer bisa diukur tanpa memanggil API asli.
+
+    python utils/stub_completion_server.py --port 8089 --delay 2
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+STUB_FEEDBACK = json.dumps({
+    'summary': "Kandidat menjelaskan pengalamannya dengan cukup runtut.",
+    'clarity': 8,
+    'structure': 7,
+    'keyword': 6,
+    'confidence': 7,
+    'suggestions': ["Tambahkan contoh konkret dan hasil yang terukur."],
+}, ensure_ascii=False)
+STREAM_PIECE_CHARS = 12
+
+
+def create_stub_app(delay=1.0, content=STUB_FEEDBACK):
+    stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    async def stream_completion(request, body):
+        # Format stream OpenAI: potongan konten dibagi rata sepanjang delay
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        pieces = [content[i:i + STREAM_PIECE_CHARS] for i in range(0, len(content), STREAM_PIECE_CHARS)]
+        for piece in pieces:
+            await asyncio.sleep(delay / max(len(pieces), 1))
+            chunk = {
+                'id': f"stub-{stats['requests']}",
+                'object': 'chat.completion.chunk',
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def chat_completions(request):
+        body = await request.json()
+        stats['requests'] += 1
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+        try:
+            if body.get('stream'):
+                return await stream_completion(request, body)
+            await asyncio.sleep(delay)
+        finally:
+            stats['in_flight'] -= 1
+        return web.json_response({
+            'id': f"stub-{stats['requests']}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        })
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post('/v1/chat/completions', chat_completions)
+    app.router.add_get('/stats', get_stats)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stub chat completion server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--delay', type=float, default=1.0, help="seconds per completion")
+    args = parser.parse_args(argv)
+    web.run_app(create_stub_app(args.delay), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
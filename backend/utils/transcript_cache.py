@@ -0,0 +1,117 @@
+"""Cache transkrip berbasis hash konten audio.
+
+Key = sha256 file upload + backend + model + bahasa, jadi upload ulang,
+pesan yang di-requeue dan replay test dengan audio yang sama persis tidak
+perlu menjalankan Whisper + GPT polish lagi.
+
+Backend (TRANSCRIPT_CACHE_BACKEND):
+- 'sqlite' : file lokal, dibatasi ukuran total dengan eviction LRU
+- 'redis'  : REDIS_URL, dengan TTL (eviction diserahkan ke maxmemory-policy)
+- 'none'   : nonaktif
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import Config
+from utils.metrics import metrics
+
+
+def transcript_cache_key(audio_sha256, backend, model, language):
+    return f"{audio_sha256}:{backend}:{model}:{language}"
+
+
+class SQLiteTranscriptCache:
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path or Config.TRANSCRIPT_CACHE_PATH
+        self.max_bytes = max_bytes or Config.TRANSCRIPT_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Dipakai bersama oleh beberapa proses worker -> WAL + busy timeout
+        self.conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS transcripts ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' last_access REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS ix_transcripts_last_access ON transcripts (last_access)')
+        self.conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute('SELECT value FROM transcripts WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute('UPDATE transcripts SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        data = json.dumps(value)
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO transcripts (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+                (key, data, len(data), time.time()))
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM transcripts').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Hapus entri yang paling lama tidak diakses sampai di bawah batas
+        freed = 0
+        rows = self.conn.execute('SELECT key, size FROM transcripts ORDER BY last_access').fetchall()
+        for key, size in rows:
+            if total - freed <= self.max_bytes:
+                break
+            self.conn.execute('DELETE FROM transcripts WHERE key = ?', (key,))
+            freed += size
+            metrics.increment('stt.cache_evictions')
+
+
+class RedisTranscriptCache:
+    def __init__(self, url=None, ttl=None):
+        import redis
+        self.client = redis.Redis.from_url(url or Config.REDIS_URL)
+        self.ttl = ttl or Config.TRANSCRIPT_CACHE_TTL
+
+    def get(self, key):
+        value = self.client.get(f"transcript:{key}")
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(f"transcript:{key}", json.dumps(value), ex=self.ttl)
+
+
+class NullTranscriptCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_transcript_cache():
+    """Return the per-process transcript cache selected by TRANSCRIPT_CACHE_BACKEND"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = Config.TRANSCRIPT_CACHE_BACKEND
+                if backend == 'redis':
+                    _cache = RedisTranscriptCache()
+                elif backend == 'sqlite':
+                    _cache = SQLiteTranscriptCache()
+                else:
+                    _cache = NullTranscriptCache()
+    return _cache
@@ -1,22 +1,47 @@
 
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { interviewAPI } from '../services/api';
+import { interviewAPI, eventsAPI } from '../services/api';
 
 const AnswerDetail = () => {
   const { id } = useParams();
   const [answer, setAnswer] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [streamedFeedback, setStreamedFeedback] = useState('');
   const navigate = useNavigate();
 
   useEffect(() => {
     loadAnswerDetail();
   }, [id]);
 
+  const feedbackReady = !!answer?.feedback;
+
+  // Selama feedback belum ada, dengarkan progres dari server alih-alih polling
+  useEffect(() => {
+    if (!answer || feedbackReady) return undefined;
+
+    const source = eventsAPI.answerEvents(id);
+    source.addEventListener('transcript_ready', () => loadAnswerDetail());
+    source.addEventListener('feedback_token', (e) => {
+      const data = JSON.parse(e.data);
+      setStreamedFeedback((prev) => prev + data.text);
+    });
+    source.addEventListener('feedback_done', () => {
+      source.close();
+      setStreamedFeedback('');
+      loadAnswerDetail();
+    });
+    source.addEventListener('failed', () => source.close());
+    // Server tanpa relay event: tidak ada update live, jangan reconnect terus-menerus
+    source.addEventListener('unavailable', () => source.close());
+
+    return () => source.close();
+  }, [id, !!answer, feedbackReady]);
+
   const loadAnswerDetail = async () => {
     try {
-      setLoading(true);
+      setLoading(!answer);
       const response = await interviewAPI.getAnswerDetail(id);
       setAnswer(response.data);
       setLoading(false);
@@ -118,6 +143,8 @@ const AnswerDetail = () => {
             <div className="card-body">
               {answer.feedback ? (
                 <pre className="mb-0" style={{whiteSpace: 'pre-wrap'}}>{answer.feedback}</pre>
+              ) : streamedFeedback ? (
+                <pre className="mb-0 text-muted" style={{whiteSpace: 'pre-wrap'}}>{streamedFeedback}</pre>
               ) : (
                 <p className="text-muted">Feedback belum tersedia. Proses sedang berjalan...</p>
               )}
@@ -153,6 +180,17 @@ const AnswerDetail = () => {
                 )}
               </div>
               
+              <div className="d-flex justify-content-between align-items-center mb-3">
+                <span>Kata Kunci:</span>
+                {answer.keyword_score ? (
+                  <span className={`score-badge ${getScoreBadgeClass(answer.keyword_score)}`}>
+                    {answer.keyword_score}/10
+                  </span>
+                ) : (
+                  <span className="badge bg-secondary">Processing</span>
+                )}
+              </div>
+
               <div className="d-flex justify-content-between align-items-center">
                 <span>Keyakinan:</span>
                 {answer.confidence_score ? (
@@ -4,6 +4,9 @@ import { dashboardAPI, interviewAPI } from '../services/api';
 
 const Dashboard = () => {
   const [history, setHistory] = useState([]);
+  const [stats, setStats] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -14,8 +17,13 @@ const Dashboard = () => {
   const loadDashboardData = async () => {
     try {
       setLoading(true);
-      const response = await dashboardAPI.getAnswersHistory();
-      setHistory(response.data);
+      const [response, statsResponse] = await Promise.all([
+        dashboardAPI.getAnswersHistory(),
+        dashboardAPI.getStats(),
+      ]);
+      setHistory(response.data.items);
+      setNextCursor(response.data.next_cursor);
+      setStats(statsResponse.data.totals);
       setLoading(false);
     } catch (err) {
       setError('Gagal memuat data dashboard: ' + (err.response?.data?.message || err.message));
@@ -23,6 +31,19 @@ const Dashboard = () => {
     }
   };
 
+  const loadMoreHistory = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await dashboardAPI.getAnswersHistory(nextCursor);
+      setHistory((prev) => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      setError('Gagal memuat riwayat: ' + (err.response?.data?.message || err.message));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getScoreBadgeClass = (score) => {
     if (score >= 8) return 'score-high';
     if (score >= 6) return 'score-medium';
@@ -69,7 +90,7 @@ const Dashboard = () => {
           <div className="card bg-primary text-white">
             <div className="card-body">
               <h6 className="card-title">Total Sesi</h6>
-              <h3 className="mb-0">{history.length}</h3>
+              <h3 className="mb-0">{stats ? stats.sessions_count : 0}</h3>
             </div>
           </div>
         </div>
@@ -79,8 +100,8 @@ const Dashboard = () => {
             <div className="card-body">
               <h6 className="card-title">Rata-rata Skor</h6>
               <h3 className="mb-0">
-                {history.length > 0 
-                  ? (history.reduce((sum, item) => sum + (item.clarity_score || 0), 0) / history.length).toFixed(1)
+                {stats?.clarity.avg != null
+                  ? stats.clarity.avg.toFixed(1)
                   : '0.0'}
               </h3>
             </div>
@@ -91,7 +112,7 @@ const Dashboard = () => {
           <div className="card bg-info text-white">
             <div className="card-body">
               <h6 className="card-title">Pertanyaan Dijawab</h6>
-              <h3 className="mb-0">{history.length}</h3>
+              <h3 className="mb-0">{stats ? stats.answers_count : 0}</h3>
             </div>
           </div>
         </div>
@@ -168,7 +189,7 @@ const Dashboard = () => {
                         )}
                       </td>
                       <td>
-                        {item.transcript_text ? (
+                        {item.has_transcript ? (
                           <span className="badge bg-success">Selesai</span>
                         ) : (
                           <span className="badge bg-warning">Processing</span>
@@ -186,6 +207,17 @@ const Dashboard = () => {
                   ))}
                 </tbody>
               </table>
+              {nextCursor && (
+                <div className="text-center">
+                  <button
+                    className="btn btn-outline-secondary"
+                    onClick={loadMoreHistory}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? 'Memuat...' : 'Muat lebih banyak'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
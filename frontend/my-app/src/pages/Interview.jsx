@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
 import { interviewAPI } from "../services/api";
+import { getToken } from "../utils/auth";
 
 const Interview = () => {
   const [sessionId, setSessionId] = useState(null);
@@ -18,6 +19,7 @@ const Interview = () => {
   const timerRef = useRef(null);
   const streamRef = useRef(null);
   const webcamRef = useRef(null);
+  const chunkUploadRef = useRef(null);
 
   const navigate = useNavigate();
 
@@ -106,15 +108,17 @@ const Interview = () => {
       videoChunksRef.current = [];
       const mimeType = getSupportedMimeType();
       mediaRecorderRef.current = new MediaRecorder(stream, { mimeType });
+      await startChunkUpload();
 
       mediaRecorderRef.current.ondataavailable = (event) => {
         if (event.data.size > 0) {
           videoChunksRef.current.push(event.data);
+          sendChunk(event.data);
         }
       };
 
       mediaRecorderRef.current.onstop = () => {
-        uploadRecording();
+        finishChunkUpload();
       };
 
       mediaRecorderRef.current.start(1000);
@@ -138,11 +142,8 @@ const Interview = () => {
   };
 
   // --- Face capture ---
-  const captureFace = async () => {
-    if (!webcamRef.current) {
-      alert("Webcam belum siap");
-      return;
-    }
+  // Frame dikirim sebagai JPEG mentah (bukan base64 di JSON): ~33% lebih kecil, tanpa decode base64 di server
+  const postFaceFrame = async (params = { mode: "presence" }) => {
     const video = webcamRef.current;
     const width = video.videoWidth || 640;
     const height = video.videoHeight || 480;
@@ -153,18 +154,27 @@ const Interview = () => {
     const ctx = canvas.getContext("2d");
     ctx.drawImage(video, 0, 0, width, height);
 
-    const imgBase64 = canvas.toDataURL("image/jpeg", 0.9);
+    const blob = await new Promise((resolve) => canvas.toBlob(resolve, "image/jpeg", 0.9));
+    const query = new URLSearchParams(params).toString();
+    return fetch(`http://localhost:5000/api/face/detect-face?${query}`, {
+      method: "POST",
+      headers: { "Content-Type": "image/jpeg", Authorization: `Bearer ${getToken()}` },
+      body: blob,
+    });
+  };
 
+  const captureFace = async () => {
+    if (!webcamRef.current) {
+      alert("Webcam belum siap");
+      return;
+    }
     try {
-      const response = await fetch(
-        "http://localhost:5000/api/face/detect-face",
-        {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ image: imgBase64 }),
-        }
-      );
+      const response = await postFaceFrame();
 
+      if (response.status === 429) {
+        alert("⏳ Server sedang sibuk, coba lagi sebentar.");
+        return;
+      }
       const data = await response.json();
       if (data.face_count > 0) {
         alert(`✅ Wajah terdeteksi: ${data.face_count}`);
@@ -185,6 +195,65 @@ const Interview = () => {
     }, 1000);
   };
 
+  // --- Chunked upload (server mulai transkripsi selagi merekam) ---
+  const startChunkUpload = async () => {
+    chunkUploadRef.current = null;
+    try {
+      const response = await interviewAPI.startUpload({
+        session_id: sessionId,
+        question_id: questions[currentQuestionIndex].id,
+        filename: "recording.webm",
+      });
+      chunkUploadRef.current = {
+        answerId: response.data.answer_id,
+        offset: 0,
+        queue: Promise.resolve(),
+        failed: false,
+      };
+    } catch (err) {
+      console.error("Chunked upload unavailable, falling back:", err);
+    }
+  };
+
+  const sendChunk = (blob) => {
+    const upload = chunkUploadRef.current;
+    if (!upload || upload.failed) return;
+    // Chunk dikirim berurutan supaya offset selalu cocok
+    upload.queue = upload.queue.then(async () => {
+      if (upload.failed) return;
+      try {
+        const response = await interviewAPI.uploadChunk(upload.answerId, upload.offset, blob);
+        upload.offset = response.data.offset;
+      } catch (err) {
+        console.error("Chunk upload error:", err);
+        upload.failed = true;
+      }
+    });
+  };
+
+  const finishChunkUpload = async () => {
+    const upload = chunkUploadRef.current;
+    if (!upload) {
+      uploadRecording();
+      return;
+    }
+    await upload.queue;
+    try {
+      if (upload.failed) {
+        // Kirim ulang seluruh rekaman ke answer yang sama dari offset 0, jangan buat answer baru
+        const videoBlob = new Blob(videoChunksRef.current, { type: "video/webm" });
+        await interviewAPI.uploadChunk(upload.answerId, 0, videoBlob);
+      }
+      await interviewAPI.finishUpload(upload.answerId);
+      alert("Jawaban berhasil disimpan!");
+    } catch (err) {
+      setError(
+        "Gagal mengunggah jawaban: " +
+          (err.response?.data?.message || err.message)
+      );
+    }
+  };
+
   // --- Upload video ---
   const uploadRecording = async () => {
     if (videoChunksRef.current.length === 0) {
@@ -237,30 +306,21 @@ const Interview = () => {
   // --- Face check loop ---
   const captureAndCheckFaces = async () => {
     if (!webcamRef.current) return;
-    const video = webcamRef.current;
-    const width = video.videoWidth || 640;
-    const height = video.videoHeight || 480;
-    const canvas = document.createElement("canvas");
-    canvas.width = width;
-    canvas.height = height;
-    const ctx = canvas.getContext("2d");
-    ctx.drawImage(video, 0, 0, width, height);
-    const imgBase64 = canvas.toDataURL("image/jpeg", 0.9);
 
     try {
-      const response = await fetch(
-        "http://localhost:5000/api/face/detect-face",
-        {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ image: imgBase64 }),
-        }
+      // Mode identity: server membandingkan wajah dengan wajah pertama di sesi ini
+      const response = await postFaceFrame(
+        sessionId ? { mode: "identity", session_id: sessionId } : { mode: "presence" }
       );
+      // 429 = server sedang penuh; lewati frame ini, cek berikutnya jalan sesuai interval
+      if (!response.ok) return;
       const data = await response.json();
       if (data.face_count > 1) {
         setFaceWarning(
           `⚠️ Terdeteksi ${data.face_count} wajah! Pastikan mengerjakan tes ini sendiri.`
         );
+      } else if (data.match === false) {
+        setFaceWarning("⚠️ Wajah berbeda dari awal sesi terdeteksi! Pastikan mengerjakan tes ini sendiri.");
       } else {
         setFaceWarning("");
       }
@@ -279,7 +339,7 @@ const Interview = () => {
     return () => {
       if (intervalId) clearInterval(intervalId);
     };
-  }, [cameraStarted]);
+  }, [cameraStarted, sessionId]);
 
   // --- Helpers ---
   const getSupportedMimeType = () => {
@@ -53,10 +53,28 @@ export const interviewAPI = {
     },
   }),
   getAnswerDetail: (answerId) => api.get(`dashboard/answers/${answerId}`),
+  // Chunked upload: start -> chunk (berulang) -> finish
+  startUpload: (data) => api.post('/interview/upload/start', data),
+  uploadChunk: (answerId, offset, blob) => api.post(`/interview/upload/${answerId}/chunk`, blob, {
+    params: { offset },
+    headers: {
+      'Content-Type': 'application/octet-stream',
+    },
+  }),
+  finishUpload: (answerId) => api.post(`/interview/upload/${answerId}/finish`),
 };
 
 export const dashboardAPI = {
-  getAnswersHistory: () => api.get('/dashboard/history'),
+  getAnswersHistory: (cursor) => api.get('/dashboard/history', { params: cursor ? { cursor } : {} }),
+  getStats: (days = 30) => api.get('/dashboard/stats', { params: { days } }),
+};
+
+// Progres pemrosesan via SSE; EventSource tidak bisa set header, jadi token lewat query
+export const eventsAPI = {
+  answerEvents: (answerId) =>
+    new EventSource(`${API_BASE_URL}/events/answers/${answerId}?jwt=${encodeURIComponent(getToken())}`),
+  sessionEvents: (sessionId) =>
+    new EventSource(`${API_BASE_URL}/events/sessions/${sessionId}?jwt=${encodeURIComponent(getToken())}`),
 };
 
 export default api;
\ No newline at end of file